@@ -0,0 +1,221 @@
+import os
+import json
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from dotenv import load_dotenv
+from app.db.initdb import engine
+from app.admin.models import JOB_CANCELLED, JOB_FAILED, JOB_SUCCEEDED
+
+load_dotenv()
+# Running jobs write progress and read cancellation requests this often
+ADMIN_JOB_HEARTBEAT_SECONDS = float(os.getenv("ADMIN_JOB_HEARTBEAT_SECONDS", "5"))
+# A running job without a heartbeat for this long belonged to a replica that died
+ADMIN_JOB_STALE_SECONDS = float(os.getenv("ADMIN_JOB_STALE_SECONDS", "60"))
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+logger = logging.getLogger(__name__)
+
+
+class JobConflictError(Exception):
+    """A job of the same kind is already running."""
+
+
+class JobContext:
+    """Handle passed to a running job for progress reporting and cancellation."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.progress: Dict[str, Any] = {}
+        self.cancel_requested = False
+        self._cancel_hooks: List[Callable[[], None]] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def update(self, progress: Dict[str, Any]):
+        """Record the latest progress; persisted with the next heartbeat."""
+        self.progress = {**self.progress, **progress}
+
+    def on_cancel(self, hook: Callable[[], None]):
+        """Register a cooperative stop hook; jobs without one are cancelled outright."""
+        self._cancel_hooks.append(hook)
+
+    def cancel(self):
+        if self.cancel_requested:
+            return
+        self.cancel_requested = True
+        if self._cancel_hooks:
+            for hook in self._cancel_hooks:
+                hook()
+        elif self.task is not None:
+            self.task.cancel()
+
+
+JobRunner = Callable[[JobContext], Awaitable[Optional[Dict[str, Any]]]]
+
+class JobManager:
+    """Runs admin jobs as background tasks with their state in ``admin_jobs``.
+
+    The job row is the source of truth shared by all replicas: any replica can
+    report on or request cancellation of a job, while the replica running it
+    heartbeats progress and picks the request up on its next heartbeat.
+    """
+
+    def __init__(self):
+        self._running: Dict[int, JobContext] = {}
+
+    async def start(self, kind: str, params: Dict[str, Any], runner: JobRunner) -> int:
+        """Persist a running job of ``kind`` and start it; raises JobConflictError if one is running."""
+        try:
+            async with engine.begin() as conn:
+                await self._expire_stale(conn, kind)
+                result = await conn.execute(
+                    text("""
+                        INSERT INTO admin_jobs (kind, status, params, owner)
+                        VALUES (:kind, 'running', CAST(:params AS jsonb), :owner)
+                        RETURNING id
+                    """),
+                    {"kind": kind, "params": json.dumps(params), "owner": OWNER}
+                )
+                job_id = result.scalar_one()
+        except IntegrityError:
+            raise JobConflictError(f"A {kind} job is already running")
+
+        ctx = JobContext(job_id)
+        self._running[job_id] = ctx
+        ctx.task = asyncio.create_task(self._execute(ctx, runner))
+        logger.info(f"Started {kind} job {job_id}")
+        return job_id
+
+    async def cancel(self, job_id: int) -> bool:
+        """Request cooperative cancellation; returns False if the job is not running."""
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text("UPDATE admin_jobs SET cancel_requested = true WHERE id = :id AND status = 'running' RETURNING id"),
+                {"id": job_id}
+            )
+            found = result.scalar() is not None
+        ctx = self._running.get(job_id)
+        if found and ctx is not None:
+            ctx.cancel()
+        return found
+
+    async def shutdown(self):
+        """Cancel this replica's jobs and record them as cancelled.
+
+        Jobs get one heartbeat interval to stop cooperatively. Rows of jobs
+        still finishing after that are marked cancelled here, so the
+        one-running-job-per-kind guard does not block new jobs until the
+        stale expiry.
+        """
+        for ctx in list(self._running.values()):
+            ctx.cancel()
+        tasks = [ctx.task for ctx in self._running.values() if ctx.task is not None]
+        if tasks:
+            await asyncio.wait(tasks, timeout=ADMIN_JOB_HEARTBEAT_SECONDS)
+        unfinished = list(self._running.values())
+        if not unfinished:
+            return
+        for ctx in unfinished:
+            if ctx.task is not None:
+                ctx.task.cancel()
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("""
+                        UPDATE admin_jobs
+                        SET status = :status, error = 'replica shut down',
+                            finished_at = now(), heartbeat_at = now()
+                        WHERE id = ANY(:ids) AND status = 'running'
+                    """),
+                    {"status": JOB_CANCELLED, "ids": [ctx.job_id for ctx in unfinished]}
+                )
+        except Exception as e:
+            logger.error(f"Could not record admin jobs {[ctx.job_id for ctx in unfinished]} as cancelled: {str(e)}")
+
+    async def _execute(self, ctx: JobContext, runner: JobRunner):
+        heartbeat = asyncio.create_task(self._heartbeat(ctx))
+        status, error = JOB_SUCCEEDED, None
+        try:
+            result = await runner(ctx)
+            if result:
+                ctx.update(result)
+            if ctx.cancel_requested:
+                status = JOB_CANCELLED
+        except asyncio.CancelledError:
+            status = JOB_CANCELLED
+        except Exception as e:
+            status, error = JOB_FAILED, str(e)
+            logger.error(f"Admin job {ctx.job_id} failed: {error}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(ctx.job_id, None)
+
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("""
+                        UPDATE admin_jobs
+                        SET status = :status, error = :error, progress = CAST(:progress AS jsonb),
+                            finished_at = now(), heartbeat_at = now()
+                        WHERE id = :id
+                    """),
+                    {"id": ctx.job_id, "status": status, "error": error, "progress": json.dumps(ctx.progress)}
+                )
+        except Exception as e:
+            # The row stays 'running' until its heartbeat goes stale
+            logger.error(f"Could not record the outcome of admin job {ctx.job_id}: {str(e)}")
+        logger.info(f"Admin job {ctx.job_id} {status}")
+
+    async def _heartbeat(self, ctx: JobContext):
+        while True:
+            await asyncio.sleep(ADMIN_JOB_HEARTBEAT_SECONDS)
+            try:
+                async with engine.begin() as conn:
+                    result = await conn.execute(
+                        text("""
+                            UPDATE admin_jobs SET progress = CAST(:progress AS jsonb), heartbeat_at = now()
+                            WHERE id = :id
+                            RETURNING cancel_requested
+                        """),
+                        {"id": ctx.job_id, "progress": json.dumps(ctx.progress)}
+                    )
+                    if result.scalar():
+                        ctx.cancel()
+            except Exception as e:
+                logger.warning(f"Heartbeat for admin job {ctx.job_id} failed: {str(e)}")
+
+    @staticmethod
+    async def _expire_stale(conn: AsyncConnection, kind: str):
+        """Fail running jobs whose replica stopped heartbeating, releasing the guard."""
+        await conn.execute(
+            text("""
+                UPDATE admin_jobs
+                SET status = 'failed', error = 'abandoned: no heartbeat', finished_at = now()
+                WHERE kind = :kind AND status = 'running'
+                  AND heartbeat_at < now() - make_interval(secs => :stale)
+            """),
+            {"kind": kind, "stale": ADMIN_JOB_STALE_SECONDS}
+        )
+
+
+async def get_job(conn: AsyncConnection, job_id: int) -> Optional[Dict[str, Any]]:
+    result = await conn.execute(text(f"SELECT {_JOB_COLUMNS} FROM admin_jobs WHERE id = :id"), {"id": job_id})
+    row = result.first()
+    return dict(row._mapping) if row is not None else None
+
+async def list_jobs(conn: AsyncConnection, kind: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    where = "WHERE kind = :kind" if kind else ""
+    result = await conn.execute(
+        text(f"SELECT {_JOB_COLUMNS} FROM admin_jobs {where} ORDER BY id DESC LIMIT :limit"),
+        {"kind": kind, "limit": limit}
+    )
+    return [dict(row._mapping) for row in result.fetchall()]
+
+_JOB_COLUMNS = "id, kind, status, params, progress, error, cancel_requested, owner, created_at, heartbeat_at, finished_at"
+
+job_manager = JobManager()
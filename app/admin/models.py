@@ -0,0 +1,30 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.initdb import Base
+
+# admin_jobs.status lifecycle
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+class AdminJob(Base):
+    """Persisted state of a background admin operation (backfill, index rebuild, re-embed)."""
+    __tablename__ = "admin_jobs"
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False, server_default=JOB_RUNNING)
+    params = Column(JSONB, nullable=True)
+    progress = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, server_default="false")
+    # host:pid of the replica running the job
+    owner = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    heartbeat_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Concurrency guard across replicas: at most one running job per kind
+        Index("ux_admin_jobs_running_kind", "kind", unique=True, postgresql_where=text("status = 'running'")),
+    )
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Security
 from fastapi.security.api_key import APIKeyHeader
-from typing import Optional
+from typing import Any, Dict, List, Optional, Literal
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 import os
 from app.db.initdb import engine
-from app.utils.backfill import update_document_embeddings
+from app.db.vector_index import VECTOR_INDEX_TYPE, rebuild_vector_index, vector_index_status
+from app.utils.backfill import BACKFILL_BATCH_SIZE, BackfillEngine
+from app.utils.work_queue import requeue_documents
+from app.utils.audit import find_audit_logs
+from app.admin.jobs import JobConflictError, JobContext, JobRunner, get_job, job_manager, list_jobs
+from app.admin.models import JOB_RUNNING
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -27,41 +33,218 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
         )
     return api_key_header
 
-class BackfillResponse(BaseModel):
-    """Response model for backfill operation."""
-    success_count: int
-    failed_ids: list[int]
-    message: str
+class JobResponse(BaseModel):
+    """State of a background admin job."""
+    id: int
+    kind: str
+    status: str
+    params: Optional[Dict[str, Any]] = None
+    # Job-specific progress, e.g. processed/total, docs_per_second, eta_seconds, failed
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    owner: Optional[str] = None
+    created_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
-@router.post("/fill-embeddings", response_model=BackfillResponse)
+class IndexBuildProgress(BaseModel):
+    """Progress of an in-flight index build (pg_stat_progress_create_index)."""
+    phase: str
+    blocks_done: int
+    blocks_total: int
+    tuples_done: int
+    tuples_total: int
+    percent: Optional[float] = None
+
+class IndexStatusResponse(BaseModel):
+    """Response model for vector index status."""
+    name: str
+    configured_type: str
+    exists: bool
+    valid: bool
+    size_bytes: int
+    definition: Optional[str] = None
+    build_in_progress: Optional[IndexBuildProgress] = None
+    rebuild_running: bool = False
+    last_rebuild_error: Optional[str] = None
+    last_rebuild_job_id: Optional[int] = None
+
+class AuditLogEntry(BaseModel):
+    """One audit record of a user."""
+    id: int
+    action: str
+    metadata: Optional[Dict[str, Any]] = None
+    timestamp: datetime
+
+async def _start_job(kind: str, params: Dict[str, Any], runner: JobRunner) -> JobResponse:
+    try:
+        job_id = await job_manager.start(kind, params, runner)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    async with engine.connect() as conn:
+        return JobResponse(**await get_job(conn, job_id))
+
+@router.post("/fill-embeddings", response_model=JobResponse, status_code=202)
 async def fill_embeddings(
     limit: Optional[int] = None,
-    batch_size: Optional[int] = 10,
+    batch_size: Optional[int] = BACKFILL_BATCH_SIZE,
+    resume: bool = False,
     api_key: str = Depends(get_api_key)
 ):
-    """Fill missing embeddings for documents.
+    """Fill missing embeddings for documents as a background job.
     
     Args:
         limit: Optional maximum number of documents to process
         batch_size: How many documents to process per batch
+        resume: Continue after the last backfill checkpoint
     
     Returns:
-        BackfillResponse with success count and any failed document IDs
+        JobResponse; poll GET /admin/jobs/{id} for progress and failures
     """
-    async with engine.begin() as conn:
-        success_count, failed_ids = await update_document_embeddings(
-            conn=conn,
-            batch_size=batch_size,
-            limit=limit
-        )
+    async def run(ctx: JobContext):
+        backfill = BackfillEngine(batch_size=batch_size, limit=limit, on_progress=ctx.update)
+        ctx.on_cancel(backfill.stop)
+        success_count, failed_ids = await backfill.run(resume=resume)
+        # Bounded so a bad run cannot bloat the job row
+        return {"succeeded": success_count, "failed": len(failed_ids), "failed_ids": failed_ids[:100]}
+
+    return await _start_job("backfill", {"limit": limit, "batch_size": batch_size, "resume": resume}, run)
+
+@router.post("/reembed", response_model=JobResponse, status_code=202)
+async def reembed(
+    source: Optional[str] = None,
+    batch_size: Optional[int] = BACKFILL_BATCH_SIZE,
+    api_key: str = Depends(get_api_key)
+):
+    """Recompute embeddings (e.g. after changing EMBEDDING_MODEL) as a background job.
     
-    message = f"Processed {success_count + len(failed_ids)} documents. "
-    message += f"{success_count} succeeded, {len(failed_ids)} failed."
-    if failed_ids:
-        message += f" Failed IDs: {failed_ids}"
+    Documents are requeued in id order and re-embedded through the work
+    queue; old embeddings stay searchable until replaced.
     
-    return BackfillResponse(
-        success_count=success_count,
-        failed_ids=failed_ids,
-        message=message
-    )
\ No newline at end of file
+    Args:
+        source: Only re-embed documents from this source
+        batch_size: How many documents to process per batch
+    """
+    async def run(ctx: JobContext):
+        backfill = BackfillEngine(batch_size=batch_size, checkpoint="reembed", on_progress=ctx.update)
+        stopping = False
+
+        def stop():
+            nonlocal stopping
+            stopping = True
+            backfill.stop()
+
+        ctx.on_cancel(stop)
+        after_id, requeued = 0, 0
+        while not stopping:
+            async with engine.begin() as conn:
+                count, last_id = await requeue_documents(conn, after_id, source=source)
+            if last_id is None:
+                break
+            after_id, requeued = last_id, requeued + count
+            ctx.update({"phase": "requeue", "requeued": requeued, "last_id": last_id})
+        if not stopping:
+            ctx.update({"phase": "embed"})
+            await backfill.run()
+        return {"requeued": requeued}
+
+    return await _start_job("reembed", {"source": source, "batch_size": batch_size}, run)
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def get_jobs(
+    kind: Optional[str] = None,
+    limit: int = 20,
+    api_key: str = Depends(get_api_key)
+):
+    """List recent admin jobs, newest first."""
+    async with engine.connect() as conn:
+        return [JobResponse(**job) for job in await list_jobs(conn, kind, min(limit, 100))]
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: int, api_key: str = Depends(get_api_key)):
+    """Report a job's status, progress, throughput and failures."""
+    async with engine.connect() as conn:
+        job = await get_job(conn, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job)
+
+@router.delete("/jobs/{job_id}", response_model=JobResponse, status_code=202)
+async def cancel_job(job_id: int, api_key: str = Depends(get_api_key)):
+    """Request cooperative cancellation of a running job.
+
+    The replica running the job stops it at its next heartbeat; backfills
+    finish and checkpoint their in-flight batches first.
+    """
+    if not await job_manager.cancel(job_id):
+        async with engine.connect() as conn:
+            job = await get_job(conn, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+    async with engine.connect() as conn:
+        return JobResponse(**await get_job(conn, job_id))
+
+@router.get("/index", response_model=IndexStatusResponse)
+async def index_status(api_key: str = Depends(get_api_key)):
+    """Report the vector index definition, size and build progress."""
+    async with engine.connect() as conn:
+        status = await vector_index_status(conn)
+        jobs = await list_jobs(conn, "index_rebuild", 1)
+    last = jobs[0] if jobs else None
+    return IndexStatusResponse(
+        **status,
+        rebuild_running=last is not None and last["status"] == JOB_RUNNING,
+        last_rebuild_error=last["error"] if last else None,
+        last_rebuild_job_id=last["id"] if last else None
+    )
+
+@router.post("/index/rebuild", response_model=JobResponse, status_code=202)
+async def rebuild_index(
+    index_type: Optional[Literal["hnsw", "ivfflat"]] = None,
+    api_key: str = Depends(get_api_key)
+):
+    """Rebuild the vector index concurrently as a background job.
+
+    Cancelling the job aborts the build; the leftover invalid index is
+    dropped by the next rebuild.
+
+    Args:
+        index_type: Optional index type to switch to (defaults to VECTOR_INDEX_TYPE)
+
+    Returns:
+        JobResponse; GET /admin/index shows the build phase and percentage
+    """
+    index_type = index_type or VECTOR_INDEX_TYPE
+    if index_type not in ("hnsw", "ivfflat"):
+        raise HTTPException(status_code=400, detail=f"Unsupported index type: {index_type}")
+
+    async def run(ctx: JobContext):
+        await rebuild_vector_index(index_type)
+
+    return await _start_job("index_rebuild", {"index_type": index_type}, run)
+
+@router.get("/audit", response_model=List[AuditLogEntry])
+async def user_audit_logs(
+    user_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    api_key: str = Depends(get_api_key)
+):
+    """List a user's audit records (e.g. for a GDPR access request).
+
+    Args:
+        user_id: Plain user id; it is hashed the same way as when recorded
+        since: Window start (defaults to 30 days before ``until``)
+        until: Window end (defaults to now)
+        limit: Maximum records returned, newest first
+    """
+    until = until or datetime.now(timezone.utc)
+    since = since or until - timedelta(days=30)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    async with engine.connect() as conn:
+        rows = await find_audit_logs(conn, user_id, since, until, min(limit, 1000))
+    return [AuditLogEntry(**row) for row in rows]
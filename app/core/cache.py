@@ -1,6 +1,234 @@
-from functools import lru_cache
-from app.utils.embeddings import get_embedding
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from app.core.metrics import CACHE_HITS, CACHE_MISSES, observe_stage
+from app.core.redis import get_redis
+from app.utils.embeddings import EMBEDDING_IDENTITY, get_embedding, get_embeddings
 
-@lru_cache(maxsize=1000)
-async def get_cached_embedding(text: str) -> list:
-    return await get_embedding(text)
\ No newline at end of file
+load_dotenv()
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+EMBEDDING_CACHE_REDIS_TTL = int(os.getenv("EMBEDDING_CACHE_REDIS_TTL", "86400"))
+EMBEDDING_CACHE_REDIS = os.getenv("EMBEDDING_CACHE_REDIS", "true").lower() == "true"
+# After a Redis error, skip the shared tier for this long instead of paying a timeout per query
+REDIS_RETRY_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode and whitespace so trivially different queries share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def cache_key(text: str, identity: str = EMBEDDING_IDENTITY) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode()).hexdigest()
+    return f"emb:{identity}:{digest}"
+
+
+class LocalEmbeddingCache:
+    """Bounded in-process LRU with TTL, storing vectors as float32 arrays."""
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE, ttl: float = EMBEDDING_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, np.ndarray]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return vector
+
+    def set(self, key: str, vector: np.ndarray):
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, vector)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisEmbeddingCache:
+    """Shared Redis tier so every API replica benefits from each computed vector."""
+
+    def __init__(self, ttl: int = EMBEDDING_CACHE_REDIS_TTL):
+        self.ttl = ttl
+        self._disabled_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    async def get(self, key: str) -> Optional[np.ndarray]:
+        if not self.available:
+            return None
+        try:
+            raw = await get_redis().get(key)
+        except Exception as e:
+            self._on_error("get", e)
+            return None
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=np.float32)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        if not self.available or not keys:
+            return [None] * len(keys)
+        try:
+            raws = await get_redis().mget(keys)
+        except Exception as e:
+            self._on_error("mget", e)
+            return [None] * len(keys)
+        return [np.frombuffer(raw, dtype=np.float32) if raw is not None else None for raw in raws]
+
+    async def set(self, key: str, vector: np.ndarray):
+        if not self.available:
+            return
+        try:
+            await get_redis().set(key, vector.tobytes(), ex=self.ttl)
+        except Exception as e:
+            self._on_error("set", e)
+
+    async def set_many(self, items: Dict[str, np.ndarray]):
+        if not self.available or not items:
+            return
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for key, vector in items.items():
+                    pipe.set(key, vector.tobytes(), ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._on_error("set", e)
+
+    def _on_error(self, op: str, error: Exception):
+        self._disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+        logger.warning("Redis embedding cache %s failed, bypassing for %.0fs: %s", op, REDIS_RETRY_SECONDS, error)
+
+
+class EmbeddingCache:
+    """Two-tier query embedding cache with single-flight loading.
+
+    Lookups go local LRU -> Redis -> provider. Concurrent misses for the same
+    key share one in-flight load, so identical queries trigger one provider call.
+    """
+
+    def __init__(
+        self,
+        local: Optional[LocalEmbeddingCache] = None,
+        shared: Optional[RedisEmbeddingCache] = None,
+        identity: str = EMBEDDING_IDENTITY,
+    ):
+        self.local = local if local is not None else LocalEmbeddingCache()
+        self.shared = shared
+        self.identity = identity
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, text: str) -> List[float]:
+        """Return the embedding for ``text``, computing it at most once per key."""
+        normalized = normalize_text(text)
+        if not normalized:
+            raise ValueError("Cannot generate embedding for empty text")
+        key = cache_key(normalized, self.identity)
+
+        with observe_stage("query_embedding", "cache_lookup"):
+            vector = self.local.get(key)
+        if vector is not None:
+            CACHE_HITS.labels(cache_type="local").inc()
+            return vector.tolist()
+        CACHE_MISSES.labels(cache_type="local").inc()
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, normalized))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller does not cancel the load for the others
+        vector = await asyncio.shield(future)
+        return vector.tolist()
+
+    async def get_many(self, texts: List[str]) -> List[List[float]]:
+        """Return embeddings for ``texts``, computing all misses in one provider call."""
+        normalized = [normalize_text(t) for t in texts]
+        if any(not n for n in normalized):
+            raise ValueError("Cannot generate embedding for empty text")
+        keys = [cache_key(n, self.identity) for n in normalized]
+        with observe_stage("query_embedding", "cache_lookup"):
+            vectors: List[Optional[np.ndarray]] = [self.local.get(key) for key in keys]
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        CACHE_HITS.labels(cache_type="local").inc(len(texts) - len(missing))
+        CACHE_MISSES.labels(cache_type="local").inc(len(missing))
+
+        if missing and self.shared is not None:
+            with observe_stage("query_embedding", "redis_lookup"):
+                shared = await self.shared.get_many([keys[i] for i in missing])
+            for i, vector in zip(missing, shared):
+                if vector is not None:
+                    vectors[i] = vector
+                    self.local.set(keys[i], vector)
+            still_missing = [i for i in missing if vectors[i] is None]
+            CACHE_HITS.labels(cache_type="redis").inc(len(missing) - len(still_missing))
+            CACHE_MISSES.labels(cache_type="redis").inc(len(still_missing))
+            missing = still_missing
+
+        if missing:
+            unique = list(dict.fromkeys(normalized[i] for i in missing))
+            with observe_stage("query_embedding", "embedding"):
+                embeddings = await get_embeddings(unique)
+            computed = {
+                text: np.asarray(emb, dtype=np.float32)
+                for text, emb in zip(unique, embeddings)
+            }
+            fresh = {}
+            for i in missing:
+                vectors[i] = computed[normalized[i]]
+                fresh[keys[i]] = vectors[i]
+                self.local.set(keys[i], vectors[i])
+            if self.shared is not None:
+                await self.shared.set_many(fresh)
+
+        return [v.tolist() for v in vectors]
+
+    async def _load(self, key: str, normalized: str) -> np.ndarray:
+        if self.shared is not None:
+            with observe_stage("query_embedding", "redis_lookup"):
+                vector = await self.shared.get(key)
+            if vector is not None:
+                CACHE_HITS.labels(cache_type="redis").inc()
+                self.local.set(key, vector)
+                return vector
+            CACHE_MISSES.labels(cache_type="redis").inc()
+
+        with observe_stage("query_embedding", "embedding"):
+            vector = np.asarray(await get_embedding(normalized), dtype=np.float32)
+        self.local.set(key, vector)
+        if self.shared is not None:
+            await self.shared.set(key, vector)
+        return vector
+
+
+embedding_cache = EmbeddingCache(shared=RedisEmbeddingCache() if EMBEDDING_CACHE_REDIS else None)
+
+async def get_cached_embedding(text: str) -> List[float]:
+    return await embedding_cache.get(text)
+
+async def get_cached_embeddings(texts: List[str]) -> List[List[float]]:
+    return await embedding_cache.get_many(texts)
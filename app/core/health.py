@@ -1,72 +1,191 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
+from dotenv import load_dotenv
 from app.db.initdb import engine
-from app.utils.embeddings import get_embedding
-import redis
-import time
-import logging
+from app.core.metrics import HEALTH_PROBE_LATENCY, HEALTH_PROBE_UP
+from app.core.redis import get_redis
+from app.utils.embeddings import EMBEDDING_PROVIDER
+from app.utils.provider import get_provider_client
+
+load_dotenv()
+HEALTH_REFRESH_SECONDS = float(os.getenv("HEALTH_REFRESH_SECONDS", "10"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+# Cached results older than this are refreshed inline (e.g. the refresher is not running)
+HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", str(3 * HEALTH_REFRESH_SECONDS)))
+# Probes that must be healthy for /health/ready; Redis and the provider degrade gracefully
+HEALTH_READY_PROBES = [p.strip() for p in os.getenv("HEALTH_READY_PROBES", "database").split(",") if p.strip()]
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-async def check_database():
-    """Check database connectivity and pgvector extension."""
-    try:
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-            await conn.execute(text("SELECT 'test'::vector"))
-            return {"status": "healthy", "latency_ms": 0}
-    except Exception as e:
-        logging.error(f"Database health check failed: {str(e)}")
-        return {"status": "unhealthy", "error": str(e)}
-
-async def check_redis():
-    """Check Redis connectivity."""
-    try:
-        redis_url = "redis://localhost:6379"
-        r = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
-        r.ping()
-        return {"status": "healthy", "latency_ms": 0}
-    except Exception as e:
-        logging.error(f"Redis health check failed: {str(e)}")
-        return {"status": "unhealthy", "error": str(e)}
-
-async def check_embedding_service():
-    """Check embedding service."""
-    try:
-        start_time = time.time()
-        await get_embedding("test")
-        latency = (time.time() - start_time) * 1000
-        return {"status": "healthy", "latency_ms": round(latency, 2)}
-    except Exception as e:
-        logging.error(f"Embedding service health check failed: {str(e)}")
-        return {"status": "unhealthy", "error": str(e)}
+# A probe returns optional details and raises when the component is unhealthy
+Probe = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+async def check_database() -> Dict[str, Any]:
+    """Check database connectivity and the pgvector extension in one round trip."""
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+        version = result.scalar()
+    if version is None:
+        raise RuntimeError("pgvector extension is not installed")
+    return {"pgvector": version}
+
+async def check_redis() -> None:
+    """Ping Redis over the shared connection pool."""
+    await get_redis().ping()
+
+async def check_embedding_service() -> Dict[str, Any]:
+    """Check the embedding provider without computing (and paying for) an embedding."""
+    if EMBEDDING_PROVIDER == "local":
+        return {"provider": "local"}
+    client = get_provider_client()
+    state = client.breaker.state
+    if state == "open":
+        raise RuntimeError("circuit breaker is open")
+    await client.ping()
+    p50 = client.latency.percentile(50)
+    return {"provider": EMBEDDING_PROVIDER, "circuit": state, "p50_ms": round(p50 * 1000, 2) if p50 else None}
+
+PROBES: Dict[str, Probe] = {
+    "database": check_database,
+    "redis": check_redis,
+    "embedding_service": check_embedding_service,
+}
+
+
+class HealthMonitor:
+    """Runs health probes concurrently in the background and caches the results.
+
+    Each probe has its own timeout and its measured latency is exported as a
+    metric. Requests read the cached state, so health endpoints never wait
+    on the components themselves (except for an inline refresh when the
+    cache is empty or stale).
+    """
+
+    def __init__(
+        self,
+        probes: Optional[Dict[str, Probe]] = None,
+        interval: float = HEALTH_REFRESH_SECONDS,
+        timeout: float = HEALTH_PROBE_TIMEOUT,
+        stale_after: float = HEALTH_STALE_SECONDS,
+    ):
+        self.probes = probes if probes is not None else PROBES
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.checked_at: Optional[float] = None
+        self._checked_monotonic = 0.0
+        self._refreshing: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
 
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Health refresh failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """Run all probes now; concurrent callers share one run."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._probe_all())
+            self._refreshing.add_done_callback(lambda _: setattr(self, "_refreshing", None))
+        return await asyncio.shield(self._refreshing)
+
+    async def _probe_all(self) -> Dict[str, Dict[str, Any]]:
+        names = list(self.probes)
+        outcomes = await asyncio.gather(*(self._probe(name) for name in names))
+        self.results = dict(zip(names, outcomes))
+        self.checked_at = time.time()
+        self._checked_monotonic = time.monotonic()
+        return self.results
+
+    async def _probe(self, name: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(self.probes[name](), timeout=self.timeout)
+            result: Dict[str, Any] = {"status": "healthy"}
+            if details:
+                result.update(details)
+        except asyncio.TimeoutError:
+            result = {"status": "unhealthy", "error": f"timed out after {self.timeout:g}s"}
+        except Exception as e:
+            result = {"status": "unhealthy", "error": str(e)}
+        latency = time.perf_counter() - start
+        result["latency_ms"] = round(latency * 1000, 2)
+        HEALTH_PROBE_LATENCY.labels(probe=name).observe(latency)
+        HEALTH_PROBE_UP.labels(probe=name).set(1 if result["status"] == "healthy" else 0)
+        if result["status"] != "healthy":
+            logger.warning("Health probe %s failed: %s", name, result["error"])
+        return result
+
+    async def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Cached probe results, refreshed inline only when missing or stale."""
+        if self.checked_at is None or time.monotonic() - self._checked_monotonic > self.stale_after:
+            return await self.refresh()
+        return self.results
+
+    async def is_ready(self, required: List[str] = HEALTH_READY_PROBES) -> bool:
+        results = await self.snapshot()
+        return all(results.get(name, {}).get("status") == "healthy" for name in required)
+
+
+health_monitor = HealthMonitor()
+
+
+@router.get("")
 @router.get("/health")
 async def health_check():
     """
     Comprehensive health check endpoint.
-    Returns detailed status of all system components.
+    Returns the cached status and probe latency of all system components.
     """
-    results = {
-        "database": await check_database(),
-        "redis": await check_redis(),
-        "embedding_service": await check_embedding_service(),
-    }
-    
+    results = await health_monitor.snapshot()
     overall_status = all(v["status"] == "healthy" for v in results.values())
-    
+
     response = {
         "status": "healthy" if overall_status else "unhealthy",
         "timestamp": time.time(),
+        "checked_at": health_monitor.checked_at,
         "components": results
     }
-    
+
     if not overall_status:
         raise HTTPException(status_code=503, detail=response)
-        
+
     return response
 
+@router.get("/ready")
+async def readiness():
+    """Readiness check for load balancers: cached, so it costs no I/O per call."""
+    if not await health_monitor.is_ready():
+        raise HTTPException(status_code=503, detail={"status": "not_ready", "checked_at": health_monitor.checked_at})
+    return {"status": "ready", "checked_at": health_monitor.checked_at}
+
+@router.get("/live")
 @router.get("/health/live")
 async def liveness():
     """Quick liveness check."""
-    return {"status": "alive", "timestamp": time.time()}
\ No newline at end of file
+    return {"status": "alive", "timestamp": time.time()}
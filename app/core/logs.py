@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+# Records waiting for the writer thread; when full, new records are dropped rather than blocking
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of INFO/DEBUG records kept per logger, e.g. "app.requests=0.1"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+# Set per request by RequestLoggingMiddleware; copied onto every record logged in that context
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    rates = {}
+    for entry in spec.split(","):
+        name, _, rate = entry.strip().partition("=")
+        if name and rate:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO and lower records from high-volume loggers.
+
+    Records of one request are kept or dropped together (sampling keys on
+    the request id), so a sampled request is logged completely. Warnings
+    and errors are never sampled.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return (zlib.crc32(request_id.encode()) & 0xFFFF) < rate * 0x10000
+        return random.random() < rate
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them.
+
+    The stock QueueHandler formats the message on the calling thread; here
+    only the request id (a context variable, invisible to the writer
+    thread) is captured, and formatting happens on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Filters run after the request id is attached so sampling can key on it
+        record.request_id = request_id_var.get()
+        return super().handle(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Losing a log line is preferable to stalling the event loop
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request id and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sampling: str = LOG_SAMPLING):
+    """Route all logging through a bounded queue to a writer thread.
+
+    Calling code only builds the record and enqueues it; formatting and
+    stream I/O run on the QueueListener thread, so a slow log sink cannot
+    stall the event loop. Safe to call more than once.
+    """
+    global _listener
+    shutdown_logging()
+
+    stream = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(
+            "%(asctime)s - %(threadName)s %(filename)s:%(lineno)d - %(funcName)s() - %(levelname)s - %(message)s"
+        ))
+
+    handler = ContextQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(SamplingFilter(parse_sampling(sampling)))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Stop the writer thread after it has written every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
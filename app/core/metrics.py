@@ -1,10 +1,21 @@
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+)
 from fastapi import APIRouter
 from starlette.responses import Response
 
+# Set (before prometheus_client is imported) by the production launcher,
+# app/serve.py: each worker writes its samples to mmap'd files in this
+# directory and a scrape aggregates all of them.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
 metrics_router = APIRouter()
 
 # Request metrics
+# ``endpoint`` is the route template (e.g. /documents/{doc_id}), never the raw path
 REQUEST_COUNT = Counter(
     'http_requests_total',
     'Total HTTP requests count',
@@ -17,6 +28,25 @@ REQUEST_LATENCY = Histogram(
     ['method', 'endpoint']
 )
 
+# Gauges need a multiprocess_mode saying how per-worker values combine;
+# "livesum" only counts workers that are still alive.
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests currently being handled',
+    multiprocess_mode='livesum'
+)
+
+# Where request time goes. operation: search, batch_search, query_embedding,
+# create_document, bulk_ingest. stage: e.g. pool_wait, query_embedding,
+# cache_lookup, embedding, audit_write, vector_query, lexical_query,
+# hybrid_query, fallback_query, db_write, serialization
+STAGE_LATENCY = Histogram(
+    'request_stage_duration_seconds',
+    'Time spent in each stage of search and ingest requests',
+    ['operation', 'stage'],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
 # Search metrics
 SEARCH_REQUESTS = Counter(
     'search_requests_total',
@@ -41,6 +71,85 @@ EMBEDDING_COMPUTATION = Histogram(
     'Time taken to compute embeddings'
 )
 
+EMBEDDING_RETRIES = Counter(
+    'embedding_provider_retries_total',
+    'Embedding provider requests retried, by reason (HTTP status or transport)',
+    ['reason']
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    'embedding_batch_size',
+    'Number of texts sent per embedding provider request',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+)
+
+EMBEDDING_QUEUE_WAIT = Histogram(
+    'embedding_queue_wait_seconds',
+    'Time a text waits in the embedding coalescer before its batch is sent',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+EMBEDDING_JOBS = Counter(
+    'embedding_jobs_total',
+    'Embedding work queue outcomes per document',
+    ['outcome']
+)
+
+AUDIT_EVENTS = Counter(
+    'audit_events_total',
+    'Audit records by outcome (written, spilled, replayed, dropped)',
+    ['outcome']
+)
+
+# Health probes (app/core/health.py); "livemin" reports a probe down if any worker sees it down
+HEALTH_PROBE_LATENCY = Histogram(
+    'health_probe_duration_seconds',
+    'Latency of background health probes',
+    ['probe'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+HEALTH_PROBE_UP = Gauge(
+    'health_probe_up',
+    'Whether the last health probe succeeded (1) or failed (0)',
+    ['probe'],
+    multiprocess_mode='livemin'
+)
+
+# Database pools (app/db/routing.py); pool: primary, replicaN, copy
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled database connection',
+    ['pool'],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+DB_POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use',
+    'Pooled database connections currently checked out',
+    ['pool'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts_total',
+    'Checkouts that gave up after DB_POOL_TIMEOUT',
+    ['pool']
+)
+
+DB_READ_ROUTES = Counter(
+    'db_read_routes_total',
+    'Read-only sessions by target (replicaN or primary)',
+    ['target']
+)
+
+DB_REPLICA_LAG = Gauge(
+    'db_replica_lag_seconds',
+    'Replay lag of each read replica at its last check',
+    ['replica'],
+    multiprocess_mode='livemax'
+)
+
 # Cache metrics
 CACHE_HITS = Counter(
     'cache_hits_total',
@@ -54,10 +163,28 @@ CACHE_MISSES = Counter(
     ['cache_type']
 )
 
+@contextmanager
+def observe_stage(operation: str, stage: str):
+    """Record the duration of the enclosed block in STAGE_LATENCY."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(operation=operation, stage=stage).observe(time.perf_counter() - start)
+
 @metrics_router.get("/metrics")
 async def metrics():
-    """Endpoint to expose Prometheus metrics."""
+    """Endpoint to expose Prometheus metrics.
+
+    In multi-process mode the samples of all workers (including exited
+    ones, for counters and histograms) are merged at scrape time, so the
+    answer does not depend on which worker serves the scrape.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(
         generate_latest(),
         media_type=CONTENT_TYPE_LATEST
-    )
\ No newline at end of file
+    )
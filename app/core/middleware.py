@@ -1,101 +1,204 @@
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 import time
-from collections import defaultdict
-import asyncio
+import uuid
 import logging
-from .metrics import REQUEST_COUNT, REQUEST_LATENCY
-
-class RateLimiter:
-    def __init__(self, requests_per_minute: int = 60):
-        self.requests_per_minute = requests_per_minute
-        self.requests = defaultdict(list)
-        self._cleanup_task = asyncio.create_task(self._periodic_cleanup())
-        
-    async def is_allowed(self, client_ip: str) -> bool:
-        now = time.time()
-        minute_ago = now - 60
-        
-        self.requests[client_ip] = [req_time for req_time in self.requests[client_ip] if req_time > minute_ago]
-        
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
-            return False
-            
-        self.requests[client_ip].append(now)
-        return True
-    
-    async def _periodic_cleanup(self):
-        while True:
-            await asyncio.sleep(60)
-            now = time.time()
-            minute_ago = now - 60
-            for ip in list(self.requests.keys()):
-                self.requests[ip] = [req_time for req_time in self.requests[ip] if req_time > minute_ago]
-                if not self.requests[ip]:
-                    del self.requests[ip]
-
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .logs import request_id_var
+from .metrics import REQUEST_COUNT, REQUEST_LATENCY, REQUESTS_IN_PROGRESS
+from .ratelimit import RateLimiter, RateLimitRule
+
+# Raw ASGI middlewares: unlike BaseHTTPMiddleware they add no extra task or
+# response stream per request, only a wrapped ``send`` where they need the
+# response status or headers.
+
+logger = logging.getLogger(__name__)
+request_logger = logging.getLogger("app.requests")
+REQUEST_ID_MAX_LENGTH = 128
+
+
+def route_template(scope: Scope) -> str:
+    """Matched route path (e.g. /documents/{doc_id}) so metric labels stay bounded."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Count requests and observe their latency by method, route template and status."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        REQUESTS_IN_PROGRESS.inc()
         try:
-            response = await call_next(request)
-            
-            # Record metrics
-            REQUEST_COUNT.labels(
-                method=request.method,
-                endpoint=request.url.path,
-                status_code=response.status_code
-            ).inc()
-            
-            REQUEST_LATENCY.labels(
-                method=request.method,
-                endpoint=request.url.path
-            ).observe(time.time() - start_time)
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            logging.error(f"Request failed: {str(e)}")
-            REQUEST_COUNT.labels(
-                method=request.method,
-                endpoint=request.url.path,
-                status_code=500
-            ).inc()
+            logger.error("Request failed: %s", e)
+            REQUEST_COUNT.labels(method=method, endpoint=route_template(scope), status_code=500).inc()
             raise
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        # The router records the matched route in the (shared) scope
+        endpoint = route_template(scope)
+        REQUEST_COUNT.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+        REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(time.perf_counter() - start)
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting per client key, with per-route limits.
+
+    Every limited response carries RateLimit-* headers; rejected requests
+    get a 429 with Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp, requests_per_minute: Optional[int] = None, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        if limiter is None:
+            default = RateLimitRule("default", requests_per_minute, 60.0) if requests_per_minute is not None else None
+            limiter = RateLimiter(default=default)
+        self.limiter = limiter
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, requests_per_minute: int = 60):
-        super().__init__(app)
-        self.limiter = RateLimiter(requests_per_minute)
-    
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-        
-        if not await self.limiter.is_allowed(client_ip):
-            return JSONResponse(
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        decision = await self.limiter.check(
+            scope["method"],
+            scope["path"],
+            Headers(scope=scope),
+            client[0] if client else None
+        )
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not decision.allowed:
+            response = JSONResponse(
                 status_code=429,
                 content={
                     "detail": "Too many requests",
-                    "retry_after": "60 seconds"
-                }
+                    "retry_after": decision.retry_after
+                },
+                headers=decision.headers()
             )
-        
-        return await call_next(request)
+            await response(scope, receive, send)
+            return
+
+        limit_headers = decision.headers()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(limit_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ErrorHandlingMiddleware:
+    """Turn unhandled exceptions into a JSON 500 with an error id for log lookup."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
         try:
-            return await call_next(request)
-        except HTTPException as e:
+            await self.app(scope, receive, send_wrapper)
+        except HTTPException:
             raise
         except Exception as e:
-            logging.error(f"Unhandled error: {str(e)}", exc_info=True)
-            return JSONResponse(
+            logger.error("Unhandled error: %s", e, exc_info=True)
+            # Too late for an error response once the status line is out
+            if response_started:
+                raise
+            response = JSONResponse(
                 status_code=500,
                 content={
                     "detail": "Internal server error",
                     "error_id": str(time.time())
                 }
-            )
\ No newline at end of file
+            )
+            await response(scope, receive, send)
+
+
+class RequestLoggingMiddleware:
+    """Assign a request id and log one structured line per request.
+
+    The id comes from the X-Request-ID header (or is generated), is echoed
+    in the response and is attached to every record logged while handling
+    the request. Messages are formatted lazily on the log writer thread,
+    and high-volume ``app.requests`` lines can be sampled (LOG_SAMPLING).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:REQUEST_ID_MAX_LENGTH]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        start = time.perf_counter()
+        status_code = 500
+        method, path = scope["method"], scope["path"]
+        request_logger.debug("Incoming request: %s %s", method, path)
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            request_logger.error("Request failed: %s %s - (%.2fs) - Error: %s", method, path, time.perf_counter() - start, e)
+            raise
+        else:
+            if request_logger.isEnabledFor(logging.INFO):
+                duration_ms = (time.perf_counter() - start) * 1000
+                request_logger.info(
+                    "%s %s %d %.1fms", method, path, status_code, duration_ms,
+                    extra={"method": method, "path": path, "status": status_code, "duration_ms": round(duration_ms, 2)}
+                )
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,253 @@
+import os
+import time
+import math
+import hmac
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Tuple
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+
+load_dotenv()
+RATE_LIMIT = int(os.getenv("RATE_LIMIT", "60"))  # requests per RATE_LIMIT_PERIOD
+RATE_LIMIT_PERIOD = float(os.getenv("RATE_LIMIT_PERIOD", "60"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "0"))  # bucket size; 0 = RATE_LIMIT
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # memory | redis
+# Client identity, first available wins: api_key | user | ip. api_key and user
+# apply only to requests carrying the configured API_KEY; anything else
+# (unknown keys, a bare user header) is limited by IP
+RATE_LIMIT_KEY = [k.strip() for k in os.getenv("RATE_LIMIT_KEY", "ip").split(",") if k.strip()]
+RATE_LIMIT_USER_HEADER = os.getenv("RATE_LIMIT_USER_HEADER", "X-User-Id")
+API_KEY_NAME = os.getenv("API_KEY_NAME", "X-API-Key")
+API_KEY = os.getenv("API_KEY")
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+# Per-route limits, e.g. "POST /documents/bulk=5/60:10, /documents/search=120/60"
+# ([METHOD ]path-prefix=limit/period[:burst]; the longest matching prefix wins)
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "")
+RATE_LIMIT_EXEMPT = [p.strip() for p in os.getenv("RATE_LIMIT_EXEMPT", "/health,/metrics").split(",") if p.strip()]
+# In-process buckets kept before the least recently used are evicted
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# After a Redis error, limit in-process for this long instead of paying a timeout per request
+REDIS_RETRY_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitRule:
+    """``limit`` requests per ``period`` seconds, allowing bursts of up to ``burst``."""
+
+    def __init__(self, name: str, limit: int, period: float = 60.0, burst: int = 0, method: Optional[str] = None, prefix: str = "/"):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.burst = burst or limit
+        self.method = method
+        self.prefix = prefix
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+        return self.limit / self.period
+
+    @property
+    def policy(self) -> str:
+        # RateLimit-Policy header value
+        return f"{self.limit};w={int(self.period)};burst={self.burst}"
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and path.startswith(self.prefix)
+
+
+class RateLimitDecision:
+    """Outcome of one rate limit check, with the values for the RateLimit-* headers."""
+
+    def __init__(self, allowed: bool, rule: RateLimitRule, tokens: float):
+        self.allowed = allowed
+        self.rule = rule
+        self.remaining = int(tokens)
+        # Seconds until one more request is allowed / until the bucket is full again
+        self.retry_after = 0 if tokens >= 1 else math.ceil((1 - tokens) / rule.rate)
+        self.reset_after = math.ceil((rule.burst - tokens) / rule.rate)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.rule.burst),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset_after),
+            "RateLimit-Policy": self.rule.policy,
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, self.retry_after))
+        return headers
+
+
+def take_token(tokens: float, updated_at: float, now: float, rule: RateLimitRule) -> Tuple[bool, float]:
+    """Refill a token bucket up to ``now`` and try to take one token."""
+    tokens = min(float(rule.burst), tokens + max(0.0, now - updated_at) * rule.rate)
+    if tokens >= 1:
+        return True, tokens - 1
+    return False, tokens
+
+
+class MemoryBackend:
+    """Per-process token buckets: O(1) state per key, bounded by LRU eviction."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(rule.burst), now))
+        allowed, tokens = take_token(tokens, updated_at, now, rule)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            # An evicted key simply starts again with a full bucket
+            self._buckets.popitem(last=False)
+        return RateLimitDecision(allowed, rule, tokens)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Same algorithm as take_token, run atomically inside Redis so every replica
+# shares one bucket per key. Redis' clock is used so replicas need not agree
+# on time; tokens are returned as a string because Lua numbers are truncated
+# to integers in replies.
+TOKEN_BUCKET_LUA = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBackend:
+    """Token buckets shared by all replicas, updated by one atomic Lua script per request.
+
+    While Redis is unreachable, requests are limited by in-process buckets
+    instead of being rejected or left unlimited.
+    """
+
+    def __init__(self, prefix: str = "ratelimit", fallback: Optional[MemoryBackend] = None):
+        self.prefix = prefix
+        self.fallback = fallback if fallback is not None else MemoryBackend()
+        self._disabled_until = 0.0
+        self._script = None
+
+    async def hit(self, key: str, rule: RateLimitRule) -> RateLimitDecision:
+        if time.monotonic() < self._disabled_until:
+            return await self.fallback.hit(key, rule)
+        try:
+            client = get_redis()
+            if self._script is None or self._script.registered_client is not client:
+                self._script = client.register_script(TOKEN_BUCKET_LUA)
+            allowed, tokens = await self._script(keys=[f"{self.prefix}:{key}"], args=[rule.burst, rule.rate])
+        except Exception as e:
+            self._disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+            logger.warning("Redis rate limiter failed, limiting in-process for %.0fs: %s", REDIS_RETRY_SECONDS, e)
+            return await self.fallback.hit(key, rule)
+        return RateLimitDecision(bool(allowed), rule, float(tokens))
+
+
+def parse_route_rules(spec: str) -> List[RateLimitRule]:
+    """Parse RATE_LIMIT_ROUTES entries of the form ``[METHOD ]prefix=limit/period[:burst]``."""
+    rules = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            target, limits = entry.rsplit("=", 1)
+            method, _, prefix = target.strip().rpartition(" ")
+            limit, _, rest = limits.partition("/")
+            period, _, burst = rest.partition(":")
+            rules.append(RateLimitRule(
+                name=f"{method.upper() or 'ANY'} {prefix}",
+                limit=int(limit),
+                period=float(period or 60),
+                burst=int(burst or 0),
+                method=method.upper() or None,
+                prefix=prefix,
+            ))
+        except ValueError:
+            raise ValueError(f"Invalid RATE_LIMIT_ROUTES entry: {entry!r}")
+    return rules
+
+
+class RateLimiter:
+    """Chooses the rule and client key for a request and checks it against the backend."""
+
+    def __init__(
+        self,
+        default: Optional[RateLimitRule] = None,
+        routes: Optional[List[RateLimitRule]] = None,
+        backend=None,
+        key_sources: Optional[List[str]] = None,
+        exempt: Optional[List[str]] = None,
+        api_key: Optional[str] = API_KEY,
+    ):
+        self.api_key = api_key
+        self.default = default or RateLimitRule("default", RATE_LIMIT, RATE_LIMIT_PERIOD, RATE_LIMIT_BURST)
+        # Longest prefix first so the most specific rule wins
+        routes = parse_route_rules(RATE_LIMIT_ROUTES) if routes is None else routes
+        self.routes = sorted(routes, key=lambda r: (len(r.prefix), r.method is not None), reverse=True)
+        if backend is None:
+            backend = RedisBackend() if RATE_LIMIT_BACKEND == "redis" else MemoryBackend()
+        self.backend = backend
+        self.key_sources = key_sources or RATE_LIMIT_KEY
+        self.exempt = RATE_LIMIT_EXEMPT if exempt is None else exempt
+
+    def rule_for(self, method: str, path: str) -> Optional[RateLimitRule]:
+        if any(path.startswith(prefix) for prefix in self.exempt):
+            return None
+        for rule in self.routes:
+            if rule.matches(method, path):
+                return rule
+        return self.default
+
+    def authenticated(self, headers: Mapping[str, str]) -> bool:
+        """Whether the request carries the configured API key."""
+        value = headers.get(API_KEY_NAME.lower())
+        return bool(self.api_key and value) and hmac.compare_digest(value.encode(), self.api_key.encode())
+
+    def client_key(self, headers: Mapping[str, str], client_host: Optional[str]) -> str:
+        # Unauthenticated headers are client-chosen: keying on them would let
+        # anyone mint a fresh bucket per request and evict real ones
+        authenticated = self.authenticated(headers)
+        for source in self.key_sources:
+            if source == "api_key" and authenticated:
+                # Never keep raw credentials in limiter state
+                return "key:" + hashlib.sha256(self.api_key.encode()).hexdigest()[:32]
+            elif source == "user" and authenticated:
+                # Set by a trusted caller (e.g. a gateway) on behalf of its users
+                value = headers.get(RATE_LIMIT_USER_HEADER.lower())
+                if value:
+                    return "user:" + value
+            elif source == "ip":
+                forwarded = headers.get("x-forwarded-for") if RATE_LIMIT_TRUST_FORWARDED else None
+                host = forwarded.split(",")[0].strip() if forwarded else client_host
+                if host:
+                    return "ip:" + host
+        return "anonymous"
+
+    async def check(self, method: str, path: str, headers: Mapping[str, str], client_host: Optional[str]) -> Optional[RateLimitDecision]:
+        """Consume one token for this request; None when the path is exempt."""
+        rule = self.rule_for(method, path)
+        if rule is None or rule.limit <= 0:
+            return None
+        return await self.backend.hit(f"{rule.name}:{self.client_key(headers, client_host)}", rule)
@@ -0,0 +1,43 @@
+import os
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from redis import asyncio as aioredis
+
+load_dotenv()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+_client: Optional["aioredis.Redis"] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_redis() -> "aioredis.Redis":
+    """Return the shared async Redis client (one connection pool per event loop)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        # redis-py is slow to import; processes that never touch Redis skip it
+        from redis import asyncio as aioredis
+        _client = aioredis.from_url(
+            REDIS_URL,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+        _client_loop = loop
+    return _client
+
+async def close_redis():
+    """Close the shared Redis connection pool (called on application shutdown)."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+        logger.info("Redis connections closed")
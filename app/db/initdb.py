@@ -1,9 +1,10 @@
 import logging
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import text
 from dotenv import load_dotenv
+from app.db.routing import DATABASE_REPLICA_URLS, ReplicaRouter, create_pooled_engine
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,8 +17,14 @@ async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
-# Create async engine
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+async def get_read_session() -> AsyncSession:
+    """Session for read-only requests: a read replica when one is usable, else the primary."""
+    factory = await replica_router.session_factory()
+    async with factory() as session:
+        yield session
+
+# Primary engine; pool size, timeouts and statement cache come from DB_POOL_* settings
+engine = create_pooled_engine(DATABASE_URL, "primary")
 
 # Async session factory
 AsyncSessionLocal = sessionmaker(
@@ -26,32 +33,10 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
-Base = declarative_base()
+# Read replicas from DATABASE_REPLICA_URLS (none by default); writes always use the primary
+replica_router = ReplicaRouter.from_urls(DATABASE_REPLICA_URLS, AsyncSessionLocal)
 
-async def init_db():
-    try:
-        async with engine.begin() as conn:
-            try:
-                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
-                logging.info("Vector extension created successfully")
-            except Exception as e:
-                logging.error(f"Failed to create vector extension: {str(e)}")
-                raise
-        
-        # Verify the extension exists
-        async with engine.begin() as conn:
-            result = await conn.execute(text("SELECT * FROM pg_extension WHERE extname = 'vector';"))
-            if not result.scalar():
-                raise Exception("Vector extension not found after creation attempt")
-            logging.info("Vector extension verified")
-        
-        # Then create the tables
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-            logging.info("Database tables created")
-    except Exception as e:
-        logging.error(f"Database initialization failed: {str(e)}")
-        raise
+Base = declarative_base()
 
 async def test_connection():
     try:
@@ -0,0 +1,261 @@
+import os
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Union
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from dotenv import load_dotenv
+from app.db.initdb import engine
+from app.documents.models import SEARCH_TSV_EXPRESSION
+
+load_dotenv()
+# What the app does at startup when the database is behind this release's
+# schema: strict (refuse to start), warn (log and continue) or off
+DB_SCHEMA_CHECK = os.getenv("DB_SCHEMA_CHECK", "strict").lower()
+
+# Serializes migration runs across processes (session-level advisory lock)
+MIGRATION_LOCK_ID = 0x6D6967
+
+logger = logging.getLogger(__name__)
+
+MigrationStep = Union[str, Callable[[AsyncConnection], Awaitable[None]]]
+
+
+class Migration:
+    """One schema version: SQL statements and/or coroutines run in one transaction.
+
+    Steps are frozen DDL, never derived from the current models, so a version
+    builds the same schema whenever it runs. Databases created before
+    versioning already have some of these objects, so steps must be
+    idempotent (IF NOT EXISTS, CREATE OR REPLACE).
+    """
+
+    def __init__(self, version: int, description: str, steps: Sequence[MigrationStep]):
+        self.version = version
+        self.description = description
+        self.steps = steps
+
+    async def apply(self, conn: AsyncConnection):
+        for step in self.steps:
+            if isinstance(step, str):
+                await conn.execute(text(step))
+            else:
+                await step(conn)
+
+
+async def _partition_audit_logs(conn: AsyncConnection):
+    from app.db.partitions import is_partitioned
+    if await is_partitioned(conn):
+        return
+    if (await conn.execute(text("SELECT EXISTS (SELECT 1 FROM audit_logs)"))).scalar():
+        # Copying rows is too slow for a deploy step; the script does it in batches
+        logger.warning(
+            "audit_logs has rows and stays unpartitioned; "
+            "run python -m app.utils.scripts.audit_partitions --migrate"
+        )
+        return
+    await conn.execute(text("DROP TABLE audit_logs"))
+    await conn.execute(text("""
+        CREATE TABLE audit_logs (
+            id SERIAL NOT NULL,
+            hashed_user_id VARCHAR(128) NOT NULL,
+            action VARCHAR(255) NOT NULL,
+            timestamp TIMESTAMPTZ NOT NULL DEFAULT now(),
+            metadata JSONB,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """))
+    await conn.execute(text(
+        "CREATE INDEX ix_audit_logs_user_timestamp ON audit_logs (hashed_user_id, timestamp)"
+    ))
+
+
+# Append new versions at the end; never edit or reorder an applied one.
+# Version 2 is the schema of the first release. Versions 3-7 are the upgrades
+# that used to be re-run on every application start, and 8-10 the tables that
+# start-up created from the models; databases created before versioning pick
+# them up as no-ops.
+MIGRATIONS: List[Migration] = [
+    Migration(1, "pgvector extension", [
+        "CREATE EXTENSION IF NOT EXISTS vector",
+    ]),
+    Migration(2, "base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            id SERIAL PRIMARY KEY,
+            title VARCHAR(512) NOT NULL,
+            content TEXT NOT NULL,
+            embedding vector(1536),
+            created_at TIMESTAMPTZ DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_documents_id ON documents (id)",
+        """
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id SERIAL PRIMARY KEY,
+            hashed_user_id VARCHAR(128) NOT NULL,
+            action VARCHAR(255) NOT NULL,
+            timestamp TIMESTAMPTZ DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_audit_logs_id ON audit_logs (id)",
+        "CREATE INDEX IF NOT EXISTS ix_audit_logs_hashed_user_id ON audit_logs (hashed_user_id)",
+    ]),
+    Migration(3, "document filter columns", [
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS source VARCHAR(255)",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS language VARCHAR(16)",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS metadata JSONB",
+        "CREATE INDEX IF NOT EXISTS ix_documents_source ON documents (source)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_language ON documents (language)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_created_at ON documents (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_documents_metadata ON documents USING gin (metadata jsonb_path_ops)",
+    ]),
+    Migration(4, "full-text search column", [
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_TSV_EXPRESSION}) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_documents_search_tsv ON documents USING gin (search_tsv)",
+    ]),
+    Migration(5, "embedding status and work queue columns", [
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_status VARCHAR(16) NOT NULL DEFAULT 'pending'",
+        "CREATE INDEX IF NOT EXISTS ix_documents_embedding_unready ON documents (id) WHERE embedding_status <> 'ready'",
+        # Rows embedded before the status column existed (cheap afterwards: uses the partial index)
+        "UPDATE documents SET embedding_status = 'ready' WHERE embedding_status <> 'ready' AND embedding IS NOT NULL",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_lease_until TIMESTAMPTZ",
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_error TEXT",
+    ]),
+    Migration(6, "audit metadata column", [
+        "ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS metadata JSONB",
+    ]),
+    # Wake idle embedding workers (LISTEN embedding_jobs) once per inserting
+    # statement, so bulk COPY sends one notification rather than one per row
+    Migration(7, "embedding job notifications", [
+        """
+        CREATE OR REPLACE FUNCTION notify_embedding_jobs() RETURNS trigger AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM inserted_documents WHERE embedding_status = 'pending') THEN
+                PERFORM pg_notify('embedding_jobs', '');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE TRIGGER documents_notify_embedding_jobs
+        AFTER INSERT ON documents
+        REFERENCING NEW TABLE AS inserted_documents
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_embedding_jobs()
+        """,
+    ]),
+    Migration(8, "backfill checkpoints", [
+        """
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            name VARCHAR(64) PRIMARY KEY,
+            last_id BIGINT NOT NULL DEFAULT 0,
+            processed BIGINT NOT NULL DEFAULT 0,
+            failed BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ DEFAULT now()
+        )
+        """,
+    ]),
+    Migration(9, "admin jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS admin_jobs (
+            id BIGSERIAL PRIMARY KEY,
+            kind VARCHAR(32) NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'running',
+            params JSONB,
+            progress JSONB,
+            error TEXT,
+            cancel_requested BOOLEAN NOT NULL DEFAULT false,
+            owner VARCHAR(255),
+            created_at TIMESTAMPTZ DEFAULT now(),
+            heartbeat_at TIMESTAMPTZ DEFAULT now(),
+            finished_at TIMESTAMPTZ
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_admin_jobs_created_at ON admin_jobs (created_at)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_admin_jobs_running_kind ON admin_jobs (kind) WHERE status = 'running'",
+    ]),
+    # Fresh databases only: existing rows are converted by the audit_partitions script
+    Migration(10, "partitioned audit_logs", [_partition_audit_logs]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    """Highest applied migration version (0 for a database that was never migrated)."""
+    if (await conn.execute(text("SELECT to_regclass('schema_migrations')"))).scalar() is None:
+        return 0
+    return (await conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations"))).scalar()
+
+def pending_migrations(version: int, target: Optional[int] = None) -> List[Migration]:
+    return [
+        m for m in MIGRATIONS
+        if m.version > version and (target is None or m.version <= target)
+    ]
+
+async def ensure_managed_objects(conn: AsyncConnection):
+    """Objects that follow configuration rather than a version: ANN indexes and upcoming audit partitions."""
+    from app.db.vector_index import ensure_vector_index, ensure_quantized_index
+    from app.db.partitions import ensure_audit_partitions
+    await ensure_audit_partitions(conn)
+    await ensure_vector_index(conn)
+    await ensure_quantized_index(conn)
+
+async def migrate(target: Optional[int] = None, ensure: bool = True) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction.
+
+    Concurrent runs (e.g. several deploy jobs) wait on an advisory lock and
+    then find nothing left to do. Returns the versions applied.
+    """
+    applied = []
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+            await conn.commit()
+
+            for migration in pending_migrations(await current_version(conn), target):
+                logger.info("Applying migration %d: %s", migration.version, migration.description)
+                await migration.apply(conn)
+                await conn.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                    {"version": migration.version, "description": migration.description}
+                )
+                await conn.commit()
+                applied.append(migration.version)
+
+            if ensure and await current_version(conn) >= SCHEMA_VERSION:
+                await ensure_managed_objects(conn)
+                await conn.commit()
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            await conn.commit()
+    return applied
+
+async def check_schema(mode: str = DB_SCHEMA_CHECK) -> Optional[int]:
+    """Startup check: compare the database's schema version with this release (no DDL)."""
+    if mode == "off":
+        return None
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    if version < SCHEMA_VERSION:
+        message = (
+            f"Database schema is at version {version}, this release needs {SCHEMA_VERSION}; "
+            "run python -m app.utils.scripts.migrate"
+        )
+        if mode == "strict":
+            raise RuntimeError(message)
+        logger.warning(message)
+    elif version > SCHEMA_VERSION:
+        # Expected during a rolling deploy: the new release migrated first
+        logger.info("Database schema version %d is newer than this release (%d)", version, SCHEMA_VERSION)
+    return version
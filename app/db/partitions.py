@@ -0,0 +1,242 @@
+import os
+import re
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from dotenv import load_dotenv
+from app.db.initdb import engine
+
+load_dotenv()
+AUDIT_PARTITION_INTERVAL = os.getenv("AUDIT_PARTITION_INTERVAL", "month").lower()  # day | month
+# Future partitions kept ready beyond the current one, so inserts never lack a target
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+# Partitions whose whole range is older than this are detached and dropped (0 keeps everything)
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "365"))
+# Detach expired partitions but keep them as standalone tables (e.g. for export to cold storage)
+AUDIT_RETENTION_DROP = os.getenv("AUDIT_RETENTION_DROP", "true").lower() == "true"
+
+AUDIT_TABLE = "audit_logs"
+# audit_logs_p20261017 (daily) or audit_logs_p202610 (monthly)
+PARTITION_NAME = re.compile(rf"^{AUDIT_TABLE}_p(\d{{4}})(\d{{2}})(\d{{2}})?$")
+# Serializes maintenance across API replicas and workers
+MAINTENANCE_LOCK_ID = 0x617564
+
+logger = logging.getLogger(__name__)
+
+Range = Tuple[date, date]
+
+
+def period_start(day: date, interval: str = AUDIT_PARTITION_INTERVAL) -> date:
+    return day if interval == "day" else day.replace(day=1)
+
+def next_period(start: date, interval: str = AUDIT_PARTITION_INTERVAL) -> date:
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def partition_name(start: date, interval: str = AUDIT_PARTITION_INTERVAL) -> str:
+    suffix = start.strftime("%Y%m%d") if interval == "day" else start.strftime("%Y%m")
+    return f"{AUDIT_TABLE}_p{suffix}"
+
+def parse_partition_name(name: str) -> Optional[Range]:
+    """Return the ``[start, end)`` range encoded in a partition name, or None for foreign tables."""
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    year, month, day = match.groups()
+    if day is not None:
+        start = date(int(year), int(month), int(day))
+        return start, next_period(start, "day")
+    start = date(int(year), int(month), 1)
+    return start, next_period(start, "month")
+
+def planned_partitions(
+    first: date,
+    last: date,
+    existing: Dict[str, Range],
+    interval: str = AUDIT_PARTITION_INTERVAL,
+) -> List[Tuple[str, date, date]]:
+    """Partitions needed so every day in ``[first, last]`` has a target.
+
+    Ranges overlapping an existing partition are skipped, so switching the
+    interval keeps the old partitions and starts the new layout after them.
+    """
+    planned = []
+    start = period_start(first, interval)
+    while start <= last:
+        end = next_period(start, interval)
+        if not any(start < e_end and e_start < end for e_start, e_end in existing.values()):
+            planned.append((partition_name(start, interval), start, end))
+        start = end
+    return planned
+
+def expired_partitions(existing: Dict[str, Range], today: date, retention_days: int = AUDIT_RETENTION_DAYS) -> List[str]:
+    """Partitions whose entire range is older than the retention window."""
+    if retention_days <= 0:
+        return []
+    cutoff = today - timedelta(days=retention_days)
+    return sorted(name for name, (_, end) in existing.items() if end <= cutoff)
+
+def _bound(day: date) -> str:
+    # Explicit UTC so bounds do not depend on the session TimeZone
+    return f"{day.isoformat()} 00:00:00+00"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    result = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": AUDIT_TABLE}
+    )
+    return result.scalar() == "p"
+
+async def list_partitions(conn: AsyncConnection) -> Dict[str, Range]:
+    """Attached audit_logs partitions that follow the naming scheme, with their ranges."""
+    result = await conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+    """), {"table": AUDIT_TABLE})
+    partitions = {}
+    for (name,) in result.fetchall():
+        bounds = parse_partition_name(name)
+        if bounds is not None:
+            partitions[name] = bounds
+    return partitions
+
+async def ensure_audit_partitions(
+    conn: AsyncConnection,
+    since: Optional[date] = None,
+    ahead: int = AUDIT_PARTITIONS_AHEAD,
+) -> List[str]:
+    """Create missing partitions from ``since`` (default: today) through ``ahead`` periods.
+
+    Runs in the caller's transaction; returns the names of created partitions.
+    """
+    if not await is_partitioned(conn):
+        logger.warning("audit_logs is not partitioned; run python -m app.utils.scripts.audit_partitions --migrate")
+        return []
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+
+    today = datetime.now(timezone.utc).date()
+    last = period_start(today)
+    for _ in range(max(0, ahead)):
+        last = next_period(last)
+    planned = planned_partitions(since or today, last, await list_partitions(conn))
+    for name, start, end in planned:
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {AUDIT_TABLE} "
+            f"FOR VALUES FROM ('{_bound(start)}') TO ('{_bound(end)}')"
+        ))
+    if planned:
+        logger.info("Created audit partitions: %s", ", ".join(name for name, _, _ in planned))
+    return [name for name, _, _ in planned]
+
+async def apply_audit_retention(retention_days: int = AUDIT_RETENTION_DAYS, drop: bool = AUDIT_RETENTION_DROP) -> List[str]:
+    """Detach (and drop) partitions older than the retention window.
+
+    Whole partitions are removed, so retention never runs a bulk DELETE.
+    DETACH ... CONCURRENTLY only takes a SHARE UPDATE EXCLUSIVE lock on
+    audit_logs, so audit inserts keep flowing; it cannot run in a
+    transaction block, hence the autocommit connection.
+    """
+    today = datetime.now(timezone.utc).date()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await is_partitioned(conn):
+            return []
+        # An interrupted concurrent detach leaves the partition pending; finish it first
+        result = await conn.execute(text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:table) AND i.inhdetachpending
+        """), {"table": AUDIT_TABLE})
+        pending = {row[0] for row in result.fetchall()}
+
+        expired = expired_partitions(await list_partitions(conn), today, retention_days)
+        for name in expired:
+            if name in pending:
+                await conn.execute(text(f"ALTER TABLE {AUDIT_TABLE} DETACH PARTITION {name} FINALIZE"))
+            else:
+                await conn.execute(text(f"ALTER TABLE {AUDIT_TABLE} DETACH PARTITION {name} CONCURRENTLY"))
+            if drop:
+                await conn.execute(text(f"DROP TABLE {name}"))
+        if expired:
+            logger.info("%s expired audit partitions: %s", "Dropped" if drop else "Detached", ", ".join(expired))
+    return expired
+
+async def maintain_audit_partitions() -> Dict[str, List[str]]:
+    """Pre-create upcoming partitions and enforce retention."""
+    async with engine.begin() as conn:
+        created = await ensure_audit_partitions(conn)
+    removed = await apply_audit_retention()
+    return {"created": created, "removed": removed}
+
+async def migrate_audit_logs(batch_size: int = 50_000, keep_legacy: bool = False) -> int:
+    """Convert a plain audit_logs table into the partitioned layout.
+
+    The old table is renamed to audit_logs_legacy (with its indexes and id
+    sequence), the partitioned table is created from the model, partitions
+    are created back to the oldest row, and rows are copied in id-ordered
+    batches. Writers are blocked only for the rename; records written during
+    the copy go straight into the new table. Returns the number of rows copied.
+    """
+    from app.documents.models import AuditLog
+
+    legacy = f"{AUDIT_TABLE}_legacy"
+    async with engine.begin() as conn:
+        if await is_partitioned(conn):
+            logger.info("audit_logs is already partitioned")
+            return 0
+        await conn.execute(text(f"LOCK TABLE {AUDIT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        await conn.execute(text(f"ALTER TABLE {AUDIT_TABLE} RENAME TO {legacy}"))
+        # Free the index and sequence names for the new table
+        result = await conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": legacy}
+        )
+        for (index,) in result.fetchall():
+            await conn.execute(text(f"ALTER INDEX {index} RENAME TO {index}_legacy"))
+        await conn.execute(text(f"ALTER SEQUENCE IF EXISTS {AUDIT_TABLE}_id_seq RENAME TO {legacy}_id_seq"))
+
+        await conn.run_sync(lambda sync_conn: AuditLog.__table__.create(sync_conn))
+        result = await conn.execute(text(f"SELECT (min(timestamp) AT TIME ZONE 'UTC')::date, max(id) FROM {legacy}"))
+        oldest, max_id = result.first()
+        await ensure_audit_partitions(conn, since=oldest)
+        # New inserts get ids above every legacy row, so copied ids never collide
+        if max_id is not None:
+            await conn.execute(
+                text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :max_id)"),
+                {"table": AUDIT_TABLE, "max_id": max_id}
+            )
+
+    copied, after_id = 0, 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(text(f"""
+                WITH batch AS (
+                    SELECT id, hashed_user_id, action, coalesce(timestamp, now()) AS timestamp, metadata
+                    FROM {legacy}
+                    WHERE id > :after_id
+                    ORDER BY id
+                    LIMIT :limit
+                ), inserted AS (
+                    INSERT INTO {AUDIT_TABLE} (id, hashed_user_id, action, timestamp, metadata)
+                    SELECT * FROM batch
+                    RETURNING id
+                )
+                SELECT count(*), max(id) FROM inserted
+            """), {"after_id": after_id, "limit": batch_size})
+            count, last_id = result.first()
+        if not count:
+            break
+        copied += count
+        after_id = last_id
+        logger.info("Copied %d audit rows (through id %d)", copied, last_id)
+
+    if not keep_legacy:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE {legacy}"))
+    logger.info("Migrated %d audit rows into partitioned audit_logs", copied)
+    return copied
@@ -0,0 +1,210 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from dotenv import load_dotenv
+from app.core.metrics import (
+    DB_POOL_CHECKOUT_WAIT, DB_POOL_IN_USE, DB_POOL_TIMEOUTS, DB_READ_ROUTES, DB_REPLICA_LAG
+)
+
+load_dotenv()
+# Per-engine (so per worker process) pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # seconds; recycling also drops the statement cache
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Prepared statements kept per connection by the asyncpg dialect (0 disables, e.g. behind pgbouncer in transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# Comma-separated read replica URLs; empty means every read goes to the primary
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+DB_REPLICA_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_CHECK_TIMEOUT", "1"))
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received
+# (an idle primary would otherwise look like growing lag) or is not in recovery
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    pool_name = "primary"
+
+    @classmethod
+    def named(cls, name: str) -> type:
+        # A subclass per engine, so Pool.recreate() (engine.dispose) keeps the label
+        return type(f"InstrumentedQueuePool_{name}", (cls,), {"pool_name": name})
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(pool=self.pool_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(pool=self.pool_name).observe(time.perf_counter() - start)
+
+
+def create_pooled_engine(url: str, name: str, **overrides: Any) -> AsyncEngine:
+    """Create an async engine with the configured pool and per-pool metrics."""
+    options: Dict[str, Any] = {
+        "poolclass": InstrumentedQueuePool.named(name),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        # Search runs the same few statements; keeping them prepared skips parse/plan round trips
+        "connect_args": {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    }
+    options.update(overrides)
+    engine = create_async_engine(url, echo=False, **options)
+
+    in_use = DB_POOL_IN_USE.labels(pool=name)
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use.inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        in_use.dec()
+
+    return engine
+
+
+class Replica:
+    """A read replica engine and its last observed replication state."""
+
+    def __init__(self, name: str, engine: Optional[AsyncEngine] = None):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = (
+            sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False) if engine is not None else None
+        )
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None  # time.monotonic() of the last check
+        self._checking: Optional[asyncio.Future] = None
+
+    def usable(self, max_lag: float) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= max_lag
+
+    def mark_down(self):
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+    async def measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            return float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0)
+
+
+class ReplicaRouter:
+    """Routes read-only sessions to replicas round-robin, falling back to the primary.
+
+    A replica is skipped while its replay lag exceeds ``max_lag`` or its last
+    lag check failed; a disconnect on a replica connection marks it down
+    immediately. Lag is re-checked every ``check_interval`` in the
+    background, so routing itself does no I/O once a replica has been seen.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        primary: sessionmaker,
+        max_lag: float = DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval: float = DB_REPLICA_CHECK_SECONDS,
+        check_timeout: float = DB_REPLICA_CHECK_TIMEOUT,
+    ):
+        self.replicas = replicas
+        self.primary = primary
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._next = 0
+        for replica in replicas:
+            if replica.engine is not None:
+                self._watch_errors(replica)
+
+    @classmethod
+    def from_urls(cls, urls: List[str], primary: sessionmaker, **kwargs) -> "ReplicaRouter":
+        replicas = [Replica(f"replica{i}", create_pooled_engine(url, f"replica{i}")) for i, url in enumerate(urls)]
+        return cls(replicas, primary, **kwargs)
+
+    def _watch_errors(self, replica: Replica):
+        @event.listens_for(replica.engine.sync_engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect or isinstance(context.original_exception, OSError):
+                logger.warning("Replica %s unreachable, routing reads to the primary", replica.name)
+                replica.mark_down()
+
+    def _start_check(self, replica: Replica) -> asyncio.Future:
+        if replica._checking is None:
+            replica._checking = asyncio.ensure_future(self._check(replica))
+            replica._checking.add_done_callback(lambda _: setattr(replica, "_checking", None))
+        return replica._checking
+
+    async def check(self, replica: Replica):
+        """Measure one replica's lag; concurrent callers share one check."""
+        await asyncio.shield(self._start_check(replica))
+
+    async def _check(self, replica: Replica):
+        try:
+            replica.lag = await asyncio.wait_for(replica.measure_lag(), timeout=self.check_timeout)
+            replica.healthy = True
+            DB_REPLICA_LAG.labels(replica=replica.name).set(replica.lag)
+        except Exception as e:
+            replica.healthy = False
+            logger.warning("Replica %s lag check failed: %s", replica.name, e)
+        replica.checked_at = time.monotonic()
+        if replica.healthy and replica.lag > self.max_lag:
+            logger.warning("Replica %s is %.1fs behind, routing reads to the primary", replica.name, replica.lag)
+
+    async def pick(self) -> Optional[Replica]:
+        """Next usable replica in round-robin order, or None to use the primary."""
+        now = time.monotonic()
+        for replica in self.replicas:
+            if replica.checked_at is None:
+                # Never checked: wait for the first result instead of guessing
+                await self.check(replica)
+            elif now - replica.checked_at >= self.check_interval:
+                self._start_check(replica)
+
+        for offset in range(len(self.replicas)):
+            index = (self._next + offset) % len(self.replicas)
+            replica = self.replicas[index]
+            if replica.usable(self.max_lag):
+                self._next = index + 1
+                return replica
+        return None
+
+    async def session_factory(self) -> sessionmaker:
+        """Session factory for a read-only unit of work."""
+        if not self.replicas:
+            return self.primary
+        replica = await self.pick()
+        DB_READ_ROUTES.labels(target=replica.name if replica else "primary").inc()
+        return replica.sessionmaker if replica else self.primary
+
+    async def dispose(self):
+        for replica in self.replicas:
+            if replica.engine is not None:
+                await replica.engine.dispose()
@@ -0,0 +1,226 @@
+import os
+import math
+import logging
+from typing import Any, Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from dotenv import load_dotenv
+from app.db.initdb import engine
+
+load_dotenv()
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()  # hnsw | ivfflat | none
+VECTOR_INDEX_NAME = "documents_embedding_idx"
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "0"))  # 0 derives lists from the row count
+# IVFFlat centroids are trained on existing rows, so it is not built on (near) empty tables
+IVFFLAT_MIN_ROWS = int(os.getenv("IVFFLAT_MIN_ROWS", "1000"))
+# Quantized copy of the embedding used for a coarse candidate pass: none | binary | halfvec
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+# Candidates fetched from the quantized index per requested result before exact rerank
+VECTOR_RERANK_OVERSAMPLE = int(os.getenv("VECTOR_RERANK_OVERSAMPLE", "10"))
+EMBEDDING_COLUMN_DIM = 1536
+# pgvector >= 0.8: keep scanning the index until enough rows pass the filters (off disables)
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "relaxed_order").lower()
+
+# Generated column and index maintained for each quantization mode
+QUANTIZED_COLUMNS: Dict[str, Dict[str, str]] = {
+    "binary": {
+        "column": "embedding_bit",
+        "definition": f"bit({EMBEDDING_COLUMN_DIM}) GENERATED ALWAYS AS (binary_quantize(embedding)::bit({EMBEDDING_COLUMN_DIM})) STORED",
+        "index": "documents_embedding_bit_idx",
+        "opclass": "bit_hamming_ops",
+    },
+    "halfvec": {
+        "column": "embedding_half",
+        "definition": f"halfvec({EMBEDDING_COLUMN_DIM}) GENERATED ALWAYS AS (embedding::halfvec({EMBEDDING_COLUMN_DIM})) STORED",
+        "index": "documents_embedding_half_idx",
+        "opclass": "halfvec_cosine_ops",
+    },
+}
+
+INDEX_MAINTENANCE_WORK_MEM = os.getenv("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+INDEX_PARALLEL_WORKERS = int(os.getenv("INDEX_PARALLEL_WORKERS", "2"))
+
+# Recall/latency knob exposed on SearchRequest.recall
+RECALL_PROFILES: Dict[str, Dict[str, int]] = {
+    "fast": {
+        "ef_search": int(os.getenv("HNSW_EF_SEARCH_FAST", "20")),
+        "probes": int(os.getenv("IVFFLAT_PROBES_FAST", "1")),
+    },
+    "balanced": {
+        "ef_search": int(os.getenv("HNSW_EF_SEARCH_BALANCED", "40")),
+        "probes": int(os.getenv("IVFFLAT_PROBES_BALANCED", "10")),
+    },
+    "accurate": {
+        "ef_search": int(os.getenv("HNSW_EF_SEARCH_ACCURATE", "200")),
+        "probes": int(os.getenv("IVFFLAT_PROBES_ACCURATE", "40")),
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+
+def ivfflat_lists_for(row_count: int) -> int:
+    """pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) above that."""
+    if IVFFLAT_LISTS > 0:
+        return IVFFLAT_LISTS
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+def index_ddl(index_type: str, name: str, row_count: int = 0, concurrently: bool = False) -> str:
+    """Build the CREATE INDEX statement for the configured ANN index."""
+    concurrent = "CONCURRENTLY " if concurrently else ""
+    if index_type == "hnsw":
+        method, options = "hnsw", f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    elif index_type == "ivfflat":
+        method, options = "ivfflat", f"lists = {ivfflat_lists_for(row_count)}"
+    else:
+        raise ValueError(f"Unsupported vector index type: {index_type}")
+    return (
+        f"CREATE INDEX {concurrent}IF NOT EXISTS {name} ON documents "
+        f"USING {method} (embedding vector_cosine_ops) WITH ({options})"
+    )
+
+async def _estimated_rows(conn: AsyncConnection) -> int:
+    # reltuples avoids a full COUNT(*) scan; it is -1 for never-analyzed tables
+    result = await conn.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'documents'"))
+    estimate = result.scalar() or 0
+    if estimate < 0:
+        result = await conn.execute(text("SELECT count(*) FROM documents"))
+        estimate = result.scalar() or 0
+    return int(estimate)
+
+async def _set_build_params(conn: AsyncConnection):
+    await conn.execute(text("SELECT set_config('maintenance_work_mem', :mem, false)"), {"mem": INDEX_MAINTENANCE_WORK_MEM})
+    await conn.execute(
+        text("SELECT set_config('max_parallel_maintenance_workers', :workers, false)"),
+        {"workers": str(INDEX_PARALLEL_WORKERS)}
+    )
+
+async def ensure_vector_index(conn: AsyncConnection):
+    """Create the ANN index on documents.embedding if it does not exist yet."""
+    if VECTOR_INDEX_TYPE == "none":
+        return
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_indexes WHERE tablename = 'documents' AND indexname = :name"),
+        {"name": VECTOR_INDEX_NAME}
+    )
+    if result.scalar():
+        return
+    rows = await _estimated_rows(conn)
+    if VECTOR_INDEX_TYPE == "ivfflat" and rows < IVFFLAT_MIN_ROWS:
+        logger.info("Skipping ivfflat index on %d rows; rebuild it via the admin API after loading data", rows)
+        return
+    await conn.execute(text(index_ddl(VECTOR_INDEX_TYPE, VECTOR_INDEX_NAME, rows)))
+    logger.info("Created %s vector index %s (%d rows)", VECTOR_INDEX_TYPE, VECTOR_INDEX_NAME, rows)
+
+async def ensure_quantized_index(conn: AsyncConnection, mode: str = VECTOR_QUANTIZATION):
+    """Add the generated quantized column for ``mode`` and its HNSW index.
+
+    Postgres rewrites the table when a stored generated column is added, so
+    enabling quantization on a large existing table should happen in a
+    maintenance window.
+    """
+    if mode == "none":
+        return
+    spec = QUANTIZED_COLUMNS[mode]
+    await conn.execute(text(
+        f"ALTER TABLE documents ADD COLUMN IF NOT EXISTS {spec['column']} {spec['definition']}"
+    ))
+    await conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {spec['index']} ON documents "
+        f"USING hnsw ({spec['column']} {spec['opclass']}) "
+        f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    ))
+    logger.info("Quantized %s column %s and index ready", mode, spec["column"])
+
+def candidate_limit(limit: int) -> int:
+    """Rows to fetch from the quantized index for ``limit`` reranked results."""
+    return limit * max(1, VECTOR_RERANK_OVERSAMPLE)
+
+async def apply_search_params(session: AsyncSession, recall: str = "balanced", limit: int = 0, filtered: bool = False):
+    """Set per-transaction ANN search parameters for the given recall profile.
+
+    An HNSW scan returns at most ef_search rows, so it is raised to ``limit``
+    when more rows than that are requested. Filtered queries enable iterative
+    index scans so filters are applied during the scan instead of leaving a
+    tiny post-filtered candidate set.
+    """
+    profile = RECALL_PROFILES[recall]
+    params = {"ef_search": str(max(profile["ef_search"], limit)), "probes": str(profile["probes"])}
+    sql = "SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"
+    if filtered and VECTOR_ITERATIVE_SCAN != "off":
+        sql += (
+            ", set_config('hnsw.iterative_scan', :iterative, true)"
+            ", set_config('ivfflat.iterative_scan', 'relaxed_order', true)"
+        )
+        params["iterative"] = VECTOR_ITERATIVE_SCAN
+    await session.execute(text(sql), params)
+
+async def rebuild_vector_index(index_type: Optional[str] = None):
+    """Rebuild the ANN index without blocking writes.
+
+    A replacement index is built with CREATE INDEX CONCURRENTLY and swapped in,
+    so the index type and build parameters can change in the same operation.
+    """
+    index_type = (index_type or VECTOR_INDEX_TYPE).lower()
+    new_name = f"{VECTOR_INDEX_NAME}_new"
+    # Concurrent index builds cannot run inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await _set_build_params(conn)
+        # Leftover from an interrupted build: an invalid index that would never be used
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+        rows = await _estimated_rows(conn)
+        logger.info("Building %s vector index concurrently (%d rows)", index_type, rows)
+        await conn.execute(text(index_ddl(index_type, new_name, rows, concurrently=True)))
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME}"))
+        await conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {VECTOR_INDEX_NAME}"))
+        logger.info("Vector index %s rebuilt", VECTOR_INDEX_NAME)
+
+async def vector_index_status(conn: AsyncConnection) -> Dict[str, Any]:
+    """Report the ANN index definition, validity, size and any in-progress build."""
+    result = await conn.execute(text("""
+        SELECT c.relname, pg_relation_size(c.oid), i.indisvalid, pg_get_indexdef(c.oid)
+        FROM pg_class c
+        JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname IN (:name, :new_name)
+    """), {"name": VECTOR_INDEX_NAME, "new_name": f"{VECTOR_INDEX_NAME}_new"})
+    indexes = {
+        row[0]: {"size_bytes": row[1], "valid": row[2], "definition": row[3]}
+        for row in result.fetchall()
+    }
+
+    result = await conn.execute(text("""
+        SELECT p.phase, p.blocks_done, p.blocks_total, p.tuples_done, p.tuples_total
+        FROM pg_stat_progress_create_index p
+        JOIN pg_class c ON c.oid = p.relid
+        WHERE c.relname = 'documents'
+    """))
+    progress = None
+    row = result.first()
+    if row is not None:
+        blocks_done, blocks_total = row[1] or 0, row[2] or 0
+        tuples_done, tuples_total = row[3] or 0, row[4] or 0
+        done, total = (tuples_done, tuples_total) if tuples_total else (blocks_done, blocks_total)
+        progress = {
+            "phase": row[0],
+            "blocks_done": blocks_done,
+            "blocks_total": blocks_total,
+            "tuples_done": tuples_done,
+            "tuples_total": tuples_total,
+            "percent": round(100.0 * done / total, 1) if total else None,
+        }
+
+    current = indexes.get(VECTOR_INDEX_NAME)
+    return {
+        "name": VECTOR_INDEX_NAME,
+        "configured_type": VECTOR_INDEX_TYPE,
+        "exists": current is not None,
+        "valid": current["valid"] if current else False,
+        "size_bytes": current["size_bytes"] if current else 0,
+        "definition": current["definition"] if current else None,
+        "build_in_progress": progress,
+    }
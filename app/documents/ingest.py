@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from pgvector.asyncpg import register_vector
+from dotenv import load_dotenv
+from app.db.initdb import DATABASE_URL
+from app.db.routing import create_pooled_engine
+from app.core.metrics import DOCUMENT_COUNT, observe_stage
+from app.documents.models import EMBEDDING_PENDING, EMBEDDING_READY
+from app.documents.schemas import DocumentCreate
+from app.utils.embeddings import EMBEDDING_BATCH_MAX_SIZE, get_embeddings
+
+load_dotenv()
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", str(EMBEDDING_BATCH_MAX_SIZE)))
+BULK_EMBED_CONCURRENCY = int(os.getenv("BULK_EMBED_CONCURRENCY", "4"))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(1024 * 1024)))
+BULK_WRITE_POOL_SIZE = int(os.getenv("BULK_WRITE_POOL_SIZE", "4"))
+# Request bodies are spooled before ingest starts: in memory up to this size, then to a temp file
+BULK_SPOOL_MEMORY_BYTES = int(os.getenv("BULK_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024)))
+BULK_SPOOL_CHUNK_BYTES = 64 * 1024
+
+COPY_COLUMNS = ["id", "title", "content", "embedding", "source", "language", "metadata", "embedding_status"]
+
+logger = logging.getLogger(__name__)
+
+# (line number, parsed document)
+ParsedLine = Tuple[int, DocumentCreate]
+
+
+async def spool_body(stream: AsyncIterator[bytes], max_memory: int = BULK_SPOOL_MEMORY_BYTES) -> tempfile.SpooledTemporaryFile:
+    """Read a request body completely before the streamed response starts.
+
+    Once a StreamingResponse is running, the server's disconnect listener
+    consumes incoming ``http.request`` messages, so body chunks not read by
+    then are silently lost.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        async for chunk in stream:
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+async def iter_spooled(spool: tempfile.SpooledTemporaryFile, chunk_size: int = BULK_SPOOL_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """Yield a spooled body in chunks, closing (and deleting) the spool when done."""
+    try:
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+async def iter_ndjson_lines(stream: AsyncIterator[bytes], max_line_bytes: int = BULK_MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Split a byte stream into NDJSON lines with bounded memory.
+
+    Yields ``(line_number, line)``; ``line`` is None for a line longer than
+    ``max_line_bytes``, whose bytes are discarded instead of buffered. Blank
+    lines are skipped.
+    """
+    buffer = bytearray()
+    line_no = 0
+    oversized = False
+    async for chunk in stream:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            line_no += 1
+            if oversized:
+                yield line_no, None
+            else:
+                buffer += chunk[start:newline]
+                if len(buffer) > max_line_bytes:
+                    yield line_no, None
+                elif buffer.strip():
+                    yield line_no, bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = newline + 1
+    if oversized:
+        yield line_no + 1, None
+    elif buffer.strip():
+        yield line_no + 1, bytes(buffer)
+
+
+class BulkIngestor:
+    """Streamed NDJSON document ingest.
+
+    Lines are parsed incrementally into provider-sized batches. Up to
+    ``embed_concurrency`` batches are embedded concurrently while earlier
+    batches are written, each with one binary COPY in its own transaction.
+    Ids are preallocated from the documents sequence so every input line can
+    be reported with its id (or its error) without per-row round trips.
+    """
+
+    def __init__(self, batch_size: int = BULK_BATCH_SIZE, embed_concurrency: int = BULK_EMBED_CONCURRENCY):
+        self.batch_size = max(1, batch_size)
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.inserted = 0
+        self.failed = 0
+
+    async def run(self, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Ingest ``stream`` and yield NDJSON result lines, ending with a summary line."""
+        started = time.perf_counter()
+        pending: Deque[asyncio.Task] = deque()
+        batch: List[ParsedLine] = []
+        try:
+            async for line_no, raw in iter_ndjson_lines(stream):
+                parsed = self._parse(line_no, raw)
+                if isinstance(parsed, dict):
+                    self.failed += 1
+                    yield _ndjson(parsed)
+                    continue
+                batch.append(parsed)
+                if len(batch) >= self.batch_size:
+                    pending.append(asyncio.create_task(self._embed(batch)))
+                    batch = []
+                # Bound memory: wait for the oldest batch once enough are in flight
+                while len(pending) >= self.embed_concurrency:
+                    for result in await self._write(await pending.popleft()):
+                        yield _ndjson(result)
+
+            if batch:
+                pending.append(asyncio.create_task(self._embed(batch)))
+            while pending:
+                for result in await self._write(await pending.popleft()):
+                    yield _ndjson(result)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        elapsed = time.perf_counter() - started
+        yield _ndjson({
+            "summary": {
+                "inserted": self.inserted,
+                "failed": self.failed,
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(self.inserted / elapsed, 1) if elapsed > 0 else None,
+            }
+        })
+        logger.info("Bulk ingest finished: %d inserted, %d failed in %.2fs", self.inserted, self.failed, elapsed)
+
+    @staticmethod
+    def _parse(line_no: int, raw: Optional[bytes]):
+        if raw is None:
+            return {"line": line_no, "error": f"line exceeds {BULK_MAX_LINE_BYTES} bytes"}
+        try:
+            return line_no, DocumentCreate.model_validate_json(raw)
+        except ValidationError as e:
+            return {"line": line_no, "error": e.errors(include_url=False, include_context=False)[0]["msg"]}
+
+    @staticmethod
+    async def _embed(batch: List[ParsedLine]) -> Tuple[List[ParsedLine], Optional[List[list]]]:
+        try:
+            with observe_stage("bulk_ingest", "embedding"):
+                return batch, await get_embeddings([doc.content for _, doc in batch])
+        except Exception as e:
+            # Documents are still stored; their embeddings are filled in by the backfill
+            logger.error("Embedding failed for bulk batch of %d documents: %s", len(batch), e)
+            return batch, None
+
+    async def _write(self, embedded: Tuple[List[ParsedLine], Optional[List[list]]]) -> List[Dict[str, Any]]:
+        batch, embeddings = embedded
+        try:
+            with observe_stage("bulk_ingest", "db_write"):
+                ids = await _copy_documents(batch, embeddings)
+        except Exception as e:
+            logger.error("Bulk write failed for %d documents: %s", len(batch), e)
+            self.failed += len(batch)
+            return [{"line": line_no, "error": "database write failed"} for line_no, _ in batch]
+
+        self.inserted += len(batch)
+        DOCUMENT_COUNT.labels(status=EMBEDDING_READY if embeddings is not None else EMBEDDING_PENDING).inc(len(batch))
+        return [
+            {"line": line_no, "id": doc_id, "embedded": embeddings is not None}
+            for (line_no, _), doc_id in zip(batch, ids)
+        ]
+
+
+_copy_engine: Optional[AsyncEngine] = None
+
+def get_copy_engine() -> AsyncEngine:
+    """Engine whose connections carry pgvector's binary codec, used only for COPY.
+
+    The codec changes how vector parameters are bound, so it is kept off the
+    main pool where vectors are bound as text literals.
+    """
+    global _copy_engine
+    if _copy_engine is None:
+        _copy_engine = create_pooled_engine(DATABASE_URL, "copy", pool_size=BULK_WRITE_POOL_SIZE, max_overflow=0)
+
+        @event.listens_for(_copy_engine.sync_engine, "connect")
+        def _register_vector_codec(dbapi_connection, connection_record):
+            dbapi_connection.run_async(register_vector)
+    return _copy_engine
+
+async def dispose_copy_engine():
+    global _copy_engine
+    if _copy_engine is not None:
+        await _copy_engine.dispose()
+        _copy_engine = None
+
+async def _copy_documents(batch: List[ParsedLine], embeddings: Optional[List[list]]) -> List[int]:
+    async with get_copy_engine().begin() as conn:
+        result = await conn.execute(
+            text("SELECT nextval(pg_get_serial_sequence('documents', 'id')) FROM generate_series(1, :n)"),
+            {"n": len(batch)}
+        )
+        ids = [row[0] for row in result.fetchall()]
+
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+
+        records = [
+            (
+                doc_id,
+                doc.title,
+                doc.content,
+                embeddings[i] if embeddings is not None else None,
+                doc.source,
+                doc.language,
+                json.dumps(doc.metadata) if doc.metadata is not None else None,
+                EMBEDDING_READY if embeddings is not None else EMBEDDING_PENDING,
+            )
+            for i, (doc_id, (_, doc)) in enumerate(zip(ids, batch))
+        ]
+        await driver.copy_records_to_table("documents", records=records, columns=COPY_COLUMNS)
+    return ids
+
+
+def _ndjson(obj: Dict[str, Any]) -> bytes:
+    return json.dumps(obj).encode() + b"\n"
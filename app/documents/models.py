@@ -1,19 +1,68 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import BigInteger, Column, Computed, Integer, String, Text, DateTime, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from pgvector.sqlalchemy import Vector
 from app.db.initdb import Base
 
+# Title terms rank above content terms in ts_rank_cd
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+# documents.embedding_status lifecycle
+EMBEDDING_PENDING = "pending"
+EMBEDDING_READY = "ready"
+EMBEDDING_FAILED = "failed"
+
 class Document(Base):
     __tablename__ = "documents"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(512), nullable=False)
     content = Column(Text, nullable=False)
     embedding = Column(Vector(1536), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Typed, indexed filter fields plus free-form metadata ("metadata" is reserved on declarative models)
+    source = Column(String(255), nullable=True, index=True)
+    language = Column(String(16), nullable=True, index=True)
+    meta = Column("metadata", JSONB, nullable=True)
+    # Stored for the GIN index and ts_rank_cd; never needed on loaded ORM objects
+    search_tsv = deferred(Column(TSVECTOR, Computed(SEARCH_TSV_EXPRESSION, persisted=True)))
+    embedding_status = Column(String(16), nullable=False, server_default=EMBEDDING_PENDING)
+    # Work queue state (app/utils/work_queue.py): attempts so far, lease or retry-after
+    # time during which claims skip the row, and the last error
+    embedding_attempts = Column(Integer, nullable=False, server_default="0")
+    embedding_lease_until = Column(DateTime(timezone=True), nullable=True)
+    embedding_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_documents_metadata", "metadata", postgresql_using="gin", postgresql_ops={"metadata": "jsonb_path_ops"}),
+        Index("ix_documents_search_tsv", "search_tsv", postgresql_using="gin"),
+        # Small partial index: only documents still waiting for (or failed) embedding
+        Index("ix_documents_embedding_unready", "id", postgresql_where=text("embedding_status <> 'ready'")),
+    )
 
 class AuditLog(Base):
+    """Range-partitioned by timestamp; partitions are managed by app/db/partitions.py."""
     __tablename__ = "audit_logs"
-    id = Column(Integer, primary_key=True, index=True)
-    hashed_user_id = Column(String(128), nullable=False, index=True)
+    # The partition key must be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hashed_user_id = Column(String(128), nullable=False)
     action = Column(String(255), nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    meta = Column("metadata", JSONB, nullable=True)
+
+    __table_args__ = (
+        # Per-user lookups bounded by time touch only the matching partitions' indexes
+        Index("ix_audit_logs_user_timestamp", "hashed_user_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+class BackfillCheckpoint(Base):
+    """Progress of a resumable backfill: every document id <= last_id has been processed."""
+    __tablename__ = "backfill_checkpoints"
+    name = Column(String(64), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, server_default="0")
+    processed = Column(BigInteger, nullable=False, server_default="0")
+    failed = Column(BigInteger, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
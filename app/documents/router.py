@@ -1,35 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.initdb import get_session
-from app.documents.schemas import DocumentCreate, DocumentOut, SearchRequest, SearchResponse
+from app.db.initdb import get_read_session, get_session
+from app.documents.schemas import (
+    BatchSearchRequest, BatchSearchResponse, DocumentCreate, DocumentOut, SearchRequest, SearchResponse
+)
 from app.documents.service import DocumentService
+from app.documents.ingest import BulkIngestor, iter_spooled, spool_body
+from app.documents.models import EMBEDDING_PENDING
+
+# Default for POST /documents when the request does not pass ?mode=
+INGEST_MODE = os.getenv("INGEST_MODE", "sync").lower()
 
 router = APIRouter()
 
-@router.post("/documents", response_model=DocumentOut)
+@router.post("/documents", response_model=DocumentOut, response_model_exclude_none=True)
 async def create_document(
     payload: DocumentCreate,
+    response: Response,
+    mode: Literal["sync", "async"] = INGEST_MODE,
     session: AsyncSession = Depends(get_session)
 ):
     """
     Create a new document.
     
-    The document's embedding will be computed either immediately or in the background.
+    - `mode=sync`: the embedding is computed before the document is stored
+      (the stored document is returned; if the provider fails it is
+      stored as pending and embedded in the background).
+    - `mode=async`: the document is stored immediately and `202` is returned
+      with its id; the insert notifies the embedding workers, which embed
+      it from the Postgres work queue. Poll
+      `GET /documents/{id}/status` for `embedding_status`.
     """
     service = DocumentService(session)
-    return await service.create_document(payload)
+    doc = await service.create_document(payload, defer_embedding=mode == "async")
+    if mode == "async" and doc.embedding_status == EMBEDDING_PENDING:
+        response.status_code = 202
+    return doc
 
-@router.post("/documents/search", response_model=SearchResponse)
+@router.post("/documents/bulk")
+async def bulk_create_documents(request: Request):
+    """
+    Bulk-ingest documents from a streamed NDJSON body (one DocumentCreate per line).
+    
+    Returns an NDJSON stream with one `{"line", "id", "embedded"}` or
+    `{"line", "error"}` object per input line, followed by a `{"summary": ...}`
+    line with inserted/failed counts and rows per second. The body is spooled
+    (in memory up to `BULK_SPOOL_MEMORY_BYTES`, then to a temp file) before
+    ingest starts.
+    """
+    # The body must be read before the response starts streaming (see spool_body)
+    spool = await spool_body(request.stream())
+    ingestor = BulkIngestor()
+    return StreamingResponse(
+        ingestor.run(iter_spooled(spool)),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(spool.close)
+    )
+
+@router.get("/documents/{doc_id}", response_model=DocumentOut, response_model_exclude_none=True)
+async def get_document(
+    doc_id: int,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Fetch a document's full content, e.g. after a search with `fields` other than "full".
+    """
+    service = DocumentService(session)
+    return await service.get_document(doc_id)
+
+@router.get("/documents/{doc_id}/status", response_model=DocumentOut, response_model_exclude_none=True)
+async def get_document_status(
+    doc_id: int,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Embedding status of a document: pending, ready or failed.
+    
+    Read from the primary, so a document is visible as soon as it is created.
+    """
+    service = DocumentService(session)
+    return await service.get_embedding_status(doc_id)
+
+@router.post("/documents/search", response_model=SearchResponse, response_model_exclude_none=True)
 async def search_documents(
     req: SearchRequest,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Search for documents using vector similarity.
     
+    `fields` selects the projection per hit: "ids", "title", "snippet"
+    (title plus a short excerpt generated in SQL) or "full" (default).
+    
     The search will use:
     1. Vector similarity if embeddings are available
     2. Fallback to text search if vector search fails
     """
     service = DocumentService(session)
     return await service.search_documents(req)
+
+@router.post("/documents/search/batch", response_model=BatchSearchResponse, response_model_exclude_none=True)
+async def search_documents_batch(
+    req: BatchSearchRequest,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Run several vector searches in one request.
+    
+    All queries are embedded in a single provider call and searched in one SQL
+    statement. Results are returned per query in request order; a failing
+    query reports its own error without failing the batch.
+    """
+    service = DocumentService(session)
+    return await service.search_documents_batch(req)
@@ -1,22 +1,78 @@
-from pydantic import BaseModel
-from typing import Optional, List, Any
+import os
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List, Any, Dict, Literal
+
+SEARCH_MAX_TOP_K = int(os.getenv("SEARCH_MAX_TOP_K", "100"))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "64"))
+
+# Result projection: ids only, id + title, id + title + snippet, or full content
+SearchFields = Literal["ids", "title", "snippet", "full"]
 
 class DocumentCreate(BaseModel):
     title: str
     content: str
+    source: Optional[str] = Field(None, max_length=255)
+    language: Optional[str] = Field(None, max_length=16)
+    metadata: Optional[Dict[str, Any]] = None
 
 class DocumentOut(BaseModel):
     id: int
-    title: str
-    content: str
+    title: Optional[str] = None
+    content: Optional[str] = None
+    # Short excerpt around the best match, only for fields="snippet"
+    snippet: Optional[str] = None
     score: Optional[float] = None
+    # pending | ready | failed; set on create and single-document responses
+    embedding_status: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class SearchFilters(BaseModel):
+    """Filters applied inside the SQL vector query (all conditions must match)."""
+    source: Optional[List[str]] = None
+    language: Optional[List[str]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    # JSONB containment: documents whose metadata contains these key/value pairs
+    metadata: Optional[Dict[str, Any]] = None
+
 class SearchRequest(BaseModel):
     query: str
     user_id: Optional[str] = None
+    # vector: cosine distance; lexical: full-text rank; hybrid: reciprocal rank fusion of both
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+    # Recall/latency trade-off for the ANN index scan (hnsw.ef_search / ivfflat.probes)
+    recall: Literal["fast", "balanced", "accurate"] = "balanced"
+    top_k: int = Field(3, ge=1, le=SEARCH_MAX_TOP_K)
+    # Opaque keyset cursor returned as next_cursor by the previous page
+    cursor: Optional[str] = None
+    filters: Optional[SearchFilters] = None
+    # Columns returned per hit; fetch full content lazily with GET /documents/{id}
+    fields: SearchFields = "full"
 
 class SearchResponse(BaseModel):
     results: List[DocumentOut]
+    next_cursor: Optional[str] = None
+
+class BatchSearchQuery(BaseModel):
+    query: str
+    top_k: int = Field(3, ge=1, le=SEARCH_MAX_TOP_K)
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery] = Field(..., min_length=1, max_length=SEARCH_BATCH_MAX_QUERIES)
+    user_id: Optional[str] = None
+    recall: Literal["fast", "balanced", "accurate"] = "balanced"
+    # Applied to every query in the batch
+    filters: Optional[SearchFilters] = None
+    fields: SearchFields = "full"
+
+class BatchSearchResult(BaseModel):
+    """Results for one query, in request order; ``error`` is set if only this query failed."""
+    index: int
+    results: List[DocumentOut] = []
+    error: Optional[str] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchResult]
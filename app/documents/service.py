@@ -1,130 +1,580 @@
+import os
+import json
+import time
+import asyncio
+import base64
 import logging
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.documents.models import Document
-from app.documents.schemas import DocumentCreate, DocumentOut, SearchRequest, SearchResponse
-from app.utils.embeddings import get_embedding
-from app.utils.audit import record_audit
+from app.documents.models import EMBEDDING_PENDING, EMBEDDING_READY
+from app.documents.schemas import (
+    BatchSearchRequest, BatchSearchResponse, BatchSearchResult,
+    DocumentCreate, DocumentOut, SearchFields, SearchFilters, SearchRequest, SearchResponse
+)
+from app.utils.embeddings import get_embedding, to_pgvector
+from app.core.cache import get_cached_embedding, get_cached_embeddings
+from app.utils.audit import record_audit, record_audit_batch
+from app.core.metrics import DOCUMENT_COUNT, SEARCH_LATENCY, SEARCH_REQUESTS, observe_stage
+from app.db.vector_index import (
+    VECTOR_QUANTIZATION, QUANTIZED_COLUMNS, EMBEDDING_COLUMN_DIM, apply_search_params, candidate_limit
+)
 from fastapi import HTTPException
 
+# Hybrid search: reciprocal rank fusion of vector and full-text candidates
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # per side
+
+# Snippets (fields="snippet"): characters returned for vector hits, and the
+# document prefix scanned by ts_headline for query-term highlighting
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", "200"))
+SEARCH_SNIPPET_SCAN_CHARS = int(os.getenv("SEARCH_SNIPPET_SCAN_CHARS", "20000"))
+SEARCH_SNIPPET_MAX_WORDS = int(os.getenv("SEARCH_SNIPPET_MAX_WORDS", "35"))
+
+
+def _encode_cursor(distance: float, doc_id: int) -> str:
+    raw = json.dumps([distance, doc_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        distance, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(distance), int(doc_id)
+    except Exception:
+        raise HTTPException(400, "Invalid search cursor")
+
 class DocumentService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create_document(self, payload: DocumentCreate) -> DocumentOut:
-        """Create a new document and compute its embedding."""
-        doc = Document(title=payload.title, content=payload.content)
-        
-        emb_str = None
-        try:
-            embedding = await get_embedding(doc.content)
-            if isinstance(embedding, (list, tuple)):
-                try:
-                    emb_str = '[' + ','.join(str(float(x)) for x in embedding) + ']'
-                except Exception:
-                    emb_str = '[' + ','.join(str(x) for x in embedding) + ']'
-            else:
-                emb_str = str(embedding)
+    async def create_document(self, payload: DocumentCreate, defer_embedding: bool = False) -> DocumentOut:
+        """Create a new document with a single INSERT ... RETURNING.
 
-            logging.info("✅ Embedding computed successfully (prepared as string)")
-        except Exception as e:
-            logging.error(f"Direct embedding computation failed: {str(e)}")
+        The embedding is computed inline unless ``defer_embedding`` is set (or
+        the provider call fails); the document is then stored as ``pending``
+        and the insert trigger wakes the embedding workers.
+        """
+        embedding = None
+        if not defer_embedding:
             try:
-                from app.utils.tasks import precompute_embeddings
-                precompute_embeddings.apply_async(kwargs={'limit': 1}, countdown=1)
-                logging.info("Background embedding computation scheduled")
+                with observe_stage("create_document", "embedding"):
+                    embedding = await get_embedding(payload.content)
+                logging.debug("Embedding computed successfully")
             except Exception as e:
-                logging.error(f"Could not schedule background embedding computation: {str(e)}")
-                doc.embedding = None
+                logging.error(f"Direct embedding computation failed: {str(e)}")
+        status = EMBEDDING_READY if embedding is not None else EMBEDDING_PENDING
 
         try:
-            if emb_str is not None:
-                self.session.add(doc)
-                await self.session.commit()
-                await self.session.refresh(doc)
-
-                try:
-                    await self.session.execute(
-                        text("UPDATE documents SET embedding = :emb::vector WHERE id = :id"),
-                        {"emb": emb_str, "id": doc.id}
-                    )
-                    await self.session.commit()
-                    await self.session.refresh(doc)
-                    logging.info("Document saved and embedding updated via raw SQL")
-                except Exception as e:
-                    logging.error(f"Failed to update embedding via raw SQL: {str(e)}")
-            else:
-                self.session.add(doc)
+            await self._checkout("create_document")
+            with observe_stage("create_document", "db_write"):
+                result = await self.session.execute(
+                    text("""
+                        INSERT INTO documents (title, content, embedding, source, language, metadata, embedding_status)
+                        VALUES (
+                            :title, :content, CAST(:embedding AS vector), :source, :language,
+                            CAST(:metadata AS jsonb), :status
+                        )
+                        RETURNING id
+                    """),
+                    {
+                        "title": payload.title,
+                        "content": payload.content,
+                        "embedding": to_pgvector(embedding) if embedding is not None else None,
+                        "source": payload.source,
+                        "language": payload.language,
+                        "metadata": json.dumps(payload.metadata) if payload.metadata is not None else None,
+                        "status": status,
+                    }
+                )
+                doc_id = result.scalar_one()
                 await self.session.commit()
-                await self.session.refresh(doc)
-
-            logging.info(f"Document saved successfully. Has embedding: {doc.embedding is not None}")
+            DOCUMENT_COUNT.labels(status=status).inc()
+            logging.info("Document %s saved with embedding status %s", doc_id, status)
         except Exception as e:
             logging.error(f"Failed to save document: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to save document: {str(e)}")
 
-        return DocumentOut.from_orm(doc)
+        if defer_embedding:
+            return DocumentOut(id=doc_id, embedding_status=status)
+        return DocumentOut(id=doc_id, title=payload.title, content=payload.content, embedding_status=status)
+
+    async def _checkout(self, operation: str):
+        """Acquire the session's connection up front so pool wait is measured on its own."""
+        with observe_stage(operation, "pool_wait"):
+            await self.session.connection()
+
+    async def get_document(self, doc_id: int) -> DocumentOut:
+        """Fetch one document's title and content (without its embedding)."""
+        result = await self.session.execute(
+            text("SELECT id, title, content, embedding_status FROM documents WHERE id = :id"),
+            {"id": doc_id}
+        )
+        row = result.first()
+        if row is None:
+            raise HTTPException(404, "Document not found")
+        return DocumentOut(id=row.id, title=row.title, content=row.content, embedding_status=row.embedding_status)
+
+    async def get_embedding_status(self, doc_id: int) -> DocumentOut:
+        """Report whether a document's embedding is pending, ready or failed."""
+        result = await self.session.execute(
+            text("SELECT embedding_status FROM documents WHERE id = :id"),
+            {"id": doc_id}
+        )
+        status = result.scalar()
+        if status is None:
+            raise HTTPException(404, "Document not found")
+        return DocumentOut(id=doc_id, embedding_status=status)
 
     async def search_documents(self, req: SearchRequest) -> SearchResponse:
-        """Search for documents using vector similarity with fallback to text search."""
+        """Search for documents by vector similarity, full-text rank or both (hybrid).
+
+        Vector search falls back to full-text search if it fails.
+        """
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response, outcome = await self._search(req)
+            return response
+        finally:
+            SEARCH_REQUESTS.labels(status=outcome).inc()
+            SEARCH_LATENCY.observe(time.perf_counter() - started)
+
+    async def _search(self, req: SearchRequest) -> Tuple[SearchResponse, str]:
+        """Run one search; returns the response and its outcome ("ok" or "fallback")."""
         if not req.query:
             raise HTTPException(400, "query is required")
+        cursor = _decode_cursor(req.cursor) if req.cursor else None
 
-        try:
-            query_embedding = await get_embedding(req.query)
-        except Exception as e:
-            raise HTTPException(500, f"Could not generate embedding for search query: {str(e)}")
+        query_embedding = None
+        if req.mode != "lexical":
+            try:
+                with observe_stage("search", "query_embedding"):
+                    query_embedding = await get_cached_embedding(req.query)
+            except Exception as e:
+                raise HTTPException(500, f"Could not generate embedding for search query: {str(e)}")
 
-        await record_audit(self.session, req.user_id, action="search_documents", 
-                         metadata={"query_length": len(req.query)})
+        # Queued for the background audit writer; no commit on the search path
+        with observe_stage("search", "audit_write"):
+            await record_audit(req.user_id, action="search_documents",
+                               metadata={"query_length": len(req.query), "mode": req.mode})
 
+        # One extra row tells whether another page exists
+        limit = req.top_k + 1
+        outcome = "ok"
+        await self._checkout("search")
         try:
-            results = await self._vector_search(query_embedding)
+            with observe_stage("search", f"{req.mode}_query"):
+                if req.mode == "lexical":
+                    results = await self._lexical_search(req.query, limit, req.filters, cursor, req.fields)
+                else:
+                    scan_limit = max(limit, HYBRID_CANDIDATES) if req.mode == "hybrid" else self._scan_limit(limit)
+                    await apply_search_params(
+                        self.session, req.recall, scan_limit, filtered=bool(req.filters or cursor)
+                    )
+                    if req.mode == "hybrid":
+                        results = await self._hybrid_search(
+                            req.query, query_embedding, limit, req.filters, cursor, req.fields
+                        )
+                    else:
+                        results = await self._vector_search(query_embedding, limit, req.filters, cursor, req.fields)
         except Exception as e:
+            if req.mode == "lexical":
+                raise
             logging.error(f"Vector search failed: {str(e)}")
-            results = await self._fallback_text_search(req.query)
-
-        return SearchResponse(results=[DocumentOut(**r) for r in results])
-
-    async def _vector_search(self, query_embedding: list) -> list:
-        """Perform vector similarity search."""
-        sql = text("""
-            SELECT id, title, content, (embedding <=> :query_embedding::vector) as distance
-            FROM documents
-            WHERE embedding IS NOT NULL
-            ORDER BY distance ASC
-            LIMIT 3
+            # The failed statement aborted the transaction
+            await self.session.rollback()
+            with observe_stage("search", "fallback_query"):
+                results = await self._fallback_text_search(req.query, limit, req.filters, req.fields)
+            cursor = None
+            outcome = "fallback"
+
+        with observe_stage("search", "serialization"):
+            next_cursor = None
+            if len(results) > req.top_k:
+                results = results[:req.top_k]
+                # Fallback rank scores would be read as a distance bound when
+                # the client retries the requested mode with this cursor
+                if outcome != "fallback":
+                    next_cursor = _encode_cursor(results[-1]["score"], results[-1]["id"])
+            response = SearchResponse(results=[DocumentOut(**r) for r in results], next_cursor=next_cursor)
+        return response, outcome
+
+    async def search_documents_batch(self, req: BatchSearchRequest) -> BatchSearchResponse:
+        """Run many vector searches with one embedding call, one audit commit and one SQL statement.
+
+        Errors are reported per query: an invalid query or one whose embedding
+        fails does not fail the rest of the batch.
+        """
+        errors: Dict[int, str] = {}
+        valid = [i for i, q in enumerate(req.queries) if q.query.strip()]
+        for i, q in enumerate(req.queries):
+            if not q.query.strip():
+                errors[i] = "query is required"
+
+        embeddings: Dict[int, list] = {}
+        if valid:
+            with observe_stage("batch_search", "query_embedding"):
+                try:
+                    vectors = await get_cached_embeddings([req.queries[i].query for i in valid])
+                    embeddings = dict(zip(valid, vectors))
+                except Exception as e:
+                    # Retry individually so one bad input cannot fail the whole batch
+                    logging.warning(f"Batched query embedding failed, retrying per query: {str(e)}")
+                    vectors = await asyncio.gather(
+                        *(get_cached_embedding(req.queries[i].query) for i in valid),
+                        return_exceptions=True
+                    )
+                    for i, vector in zip(valid, vectors):
+                        if isinstance(vector, Exception):
+                            errors[i] = f"Could not generate embedding for search query: {str(vector)}"
+                        else:
+                            embeddings[i] = vector
+
+        with observe_stage("batch_search", "audit_write"):
+            await record_audit_batch(
+                req.user_id, action="search_documents",
+                metadata_list=[{"query_length": len(q.query), "mode": "vector", "batch": True} for q in req.queries]
+            )
+
+        hits: Dict[int, list] = {i: [] for i in embeddings}
+        if embeddings:
+            ordinals = list(embeddings)
+            max_k = max(req.queries[i].top_k for i in ordinals)
+            try:
+                await self._checkout("batch_search")
+                with observe_stage("batch_search", "vector_query"):
+                    await apply_search_params(self.session, req.recall, max_k, filtered=req.filters is not None)
+                    rows = await self._batch_vector_search(
+                        ordinals,
+                        [embeddings[i] for i in ordinals],
+                        [req.queries[i].top_k for i in ordinals],
+                        req.filters,
+                        req.fields
+                    )
+                with observe_stage("batch_search", "serialization"):
+                    for row in rows:
+                        hits[row["index"]].append(DocumentOut(**row["document"]))
+            except Exception as e:
+                logging.error(f"Batch vector search failed: {str(e)}")
+                await self.session.rollback()
+                for i in ordinals:
+                    errors[i] = "Vector search failed"
+
+        return BatchSearchResponse(results=[
+            BatchSearchResult(index=i, results=hits.get(i, []), error=errors.get(i))
+            for i in range(len(req.queries))
+        ])
+
+    async def _batch_vector_search(
+        self,
+        ordinals: List[int],
+        query_embeddings: List[list],
+        limits: List[int],
+        filters: Optional[SearchFilters] = None,
+        fields: SearchFields = "full",
+    ) -> List[Dict[str, Any]]:
+        """Nearest neighbours for several query vectors in one statement (unnest + LATERAL top-k)."""
+        conditions, params = self._filter_clause(filters)
+        where = " AND ".join(["embedding IS NOT NULL"] + conditions)
+        columns, projection_params = self._projection(fields)
+        params.update(projection_params)
+        params.update(
+            ordinals=ordinals,
+            vectors=[to_pgvector(e) for e in query_embeddings],
+            limits=limits,
+        )
+        sql = text(f"""
+            SELECT q.ord, h.id{columns}, h.distance AS score
+            FROM unnest(
+                CAST(:ordinals AS int[]), CAST(:vectors AS text[]), CAST(:limits AS int[])
+            ) AS q(ord, vec, k)
+            CROSS JOIN LATERAL (
+                SELECT id, (embedding <=> CAST(q.vec AS vector)) AS distance
+                FROM documents
+                WHERE {where}
+                ORDER BY distance
+                LIMIT q.k
+            ) h
+            JOIN documents d ON d.id = h.id
+            ORDER BY q.ord, h.distance, h.id
         """)
-        result = await self.session.execute(sql.bindparams(query_embedding=query_embedding))
-        rows = result.fetchall()
-
-        return [
-            {
-                "id": row[0],
-                "title": row[1],
-                "content": row[2],
-                "score": float(row[3]) if row[3] is not None else None
-            }
-            for row in rows
-        ]
-
-    async def _fallback_text_search(self, query: str) -> list:
-        """Perform text-based search as fallback."""
-        sql = text("""
-            SELECT id, title, content, 0 as distance
-            FROM documents
-            WHERE to_tsvector('english', content) @@ plainto_tsquery('english', :query)
-            LIMIT 3
+        result = await self.session.execute(sql, params)
+        return [{"index": doc.pop("ord"), "document": doc} for doc in self._rows_to_results(result.fetchall())]
+
+    @staticmethod
+    def _scan_limit(limit: int) -> int:
+        """Rows the ANN index scan must produce for ``limit`` results."""
+        return candidate_limit(limit) if VECTOR_QUANTIZATION != "none" else limit
+
+    @staticmethod
+    def _filter_clause(filters: Optional[SearchFilters]) -> Tuple[List[str], Dict[str, Any]]:
+        """Build SQL conditions for search filters.
+
+        The conditions go into the same WHERE clause as the index scan so the
+        scan itself skips non-matching rows.
+        """
+        conditions: List[str] = []
+        params: Dict[str, Any] = {}
+        if filters is None:
+            return conditions, params
+        if filters.source:
+            conditions.append("source = ANY(CAST(:f_source AS text[]))")
+            params["f_source"] = filters.source
+        if filters.language:
+            conditions.append("language = ANY(CAST(:f_language AS text[]))")
+            params["f_language"] = filters.language
+        if filters.created_after is not None:
+            conditions.append("created_at >= :f_created_after")
+            params["f_created_after"] = filters.created_after
+        if filters.created_before is not None:
+            conditions.append("created_at < :f_created_before")
+            params["f_created_before"] = filters.created_before
+        if filters.metadata:
+            conditions.append("metadata @> CAST(:f_metadata AS jsonb)")
+            params["f_metadata"] = json.dumps(filters.metadata)
+        return conditions, params
+
+    @staticmethod
+    def _cursor_condition(cursor: Tuple[float, int], score: str, doc_id: str, descending: bool) -> Tuple[str, Dict[str, Any]]:
+        """Keyset condition for rows after ``cursor`` in (score, id) order."""
+        op = "<" if descending else ">"
+        condition = f"({score} {op} :cursor_score OR ({score} = :cursor_score AND {doc_id} > :cursor_id))"
+        return condition, {"cursor_score": cursor[0], "cursor_id": cursor[1]}
+
+    @staticmethod
+    def _projection(fields: SearchFields, query: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Select-list columns (read from alias ``d``) for the requested projection.
+
+        Only the columns a projection needs are read, so result lists do not
+        detoast full content. Snippets are built in SQL: ts_headline over a
+        bounded prefix when there are query terms to highlight, otherwise the
+        leading characters of the document.
+        """
+        if fields == "ids":
+            return "", {}
+        if fields == "title":
+            return ", d.title", {}
+        if fields == "full":
+            return ", d.title, d.content", {}
+        if query is None:
+            return ", d.title, left(d.content, :snippet_chars) AS snippet", {"snippet_chars": SEARCH_SNIPPET_CHARS}
+        snippet = (
+            "ts_headline('english', left(d.content, :snippet_scan), "
+            "websearch_to_tsquery('english', :query), :headline_options) AS snippet"
+        )
+        return f", d.title, {snippet}", {
+            "snippet_scan": SEARCH_SNIPPET_SCAN_CHARS,
+            "headline_options": f"MaxWords={SEARCH_SNIPPET_MAX_WORDS}, MinWords={max(1, SEARCH_SNIPPET_MAX_WORDS // 2)}",
+        }
+
+    @staticmethod
+    def _rows_to_results(rows) -> list:
+        results = []
+        for row in rows:
+            result = dict(row._mapping)
+            if result.get("score") is not None:
+                result["score"] = float(result["score"])
+            results.append(result)
+        return results
+
+    async def _vector_search(
+        self,
+        query_embedding: list,
+        limit: int = 3,
+        filters: Optional[SearchFilters] = None,
+        cursor: Optional[Tuple[float, int]] = None,
+        fields: SearchFields = "full",
+        quantization: str = VECTOR_QUANTIZATION,
+    ) -> list:
+        """Perform vector similarity search; ``score`` is the cosine distance.
+
+        With quantization enabled, a coarse pass over the quantized column's
+        index selects an oversampled candidate set that is reranked by exact
+        cosine distance. Results are ordered by (distance, id) for stable
+        keyset pagination. Projected columns are read only for the final rows.
+        """
+        exact = "(embedding <=> CAST(:query_embedding AS vector))"
+        conditions, params = self._filter_clause(filters)
+        conditions.insert(0, "embedding IS NOT NULL")
+        if cursor is not None:
+            condition, cursor_params = self._cursor_condition(cursor, exact, "id", descending=False)
+            conditions.append(condition)
+            params.update(cursor_params)
+        where = " AND ".join(conditions)
+        columns, projection_params = self._projection(fields)
+        params.update(projection_params)
+        params.update(query_embedding=to_pgvector(query_embedding), limit=limit)
+
+        if quantization == "none":
+            # MATERIALIZED keeps the ANN scan ordered by distance alone (so the
+            # index is used) while the outer sort adds the id tie-breaker.
+            sql = text(f"""
+                WITH hits AS MATERIALIZED (
+                    SELECT id, {exact} as distance
+                    FROM documents
+                    WHERE {where}
+                    ORDER BY distance ASC
+                    LIMIT :limit
+                )
+                SELECT h.id{columns}, h.distance AS score
+                FROM hits h
+                JOIN documents d ON d.id = h.id
+                ORDER BY h.distance, h.id
+            """)
+        else:
+            column = QUANTIZED_COLUMNS[quantization]["column"]
+            if quantization == "binary":
+                coarse = f"{column} <~> binary_quantize(CAST(:query_embedding AS vector))"
+            else:
+                coarse = f"{column} <=> CAST(:query_embedding AS halfvec({EMBEDDING_COLUMN_DIM}))"
+            sql = text(f"""
+                WITH candidates AS (
+                    SELECT id
+                    FROM documents
+                    WHERE {where}
+                    ORDER BY {coarse}
+                    LIMIT :candidates
+                ),
+                hits AS MATERIALIZED (
+                    SELECT c.id, (e.embedding <=> CAST(:query_embedding AS vector)) as distance
+                    FROM candidates c
+                    JOIN documents e ON e.id = c.id
+                    ORDER BY distance, c.id
+                    LIMIT :limit
+                )
+                SELECT h.id{columns}, h.distance AS score
+                FROM hits h
+                JOIN documents d ON d.id = h.id
+                ORDER BY h.distance, h.id
+            """)
+            params["candidates"] = candidate_limit(limit)
+        result = await self.session.execute(sql, params)
+        return self._rows_to_results(result.fetchall())
+
+    async def _lexical_search(
+        self,
+        query: str,
+        limit: int = 3,
+        filters: Optional[SearchFilters] = None,
+        cursor: Optional[Tuple[float, int]] = None,
+        fields: SearchFields = "full",
+    ) -> list:
+        """Full-text search over the stored search_tsv column; ``score`` is ts_rank_cd."""
+        conditions, params = self._filter_clause(filters)
+        conditions.insert(0, "search_tsv @@ websearch_to_tsquery('english', :query)")
+        rank = "ts_rank_cd(search_tsv, websearch_to_tsquery('english', :query))"
+        if cursor is not None:
+            condition, cursor_params = self._cursor_condition(cursor, rank, "id", descending=True)
+            conditions.append(condition)
+            params.update(cursor_params)
+        columns, projection_params = self._projection(fields, query)
+        params.update(projection_params)
+        params.update(query=query, limit=limit)
+
+        # Ranking runs over all matches; snippets and content only for the top rows
+        sql = text(f"""
+            WITH hits AS MATERIALIZED (
+                SELECT id, {rank} as rank
+                FROM documents
+                WHERE {" AND ".join(conditions)}
+                ORDER BY rank DESC, id
+                LIMIT :limit
+            )
+            SELECT h.id{columns}, h.rank AS score
+            FROM hits h
+            JOIN documents d ON d.id = h.id
+            ORDER BY h.rank DESC, h.id
         """)
-        result = await self.session.execute(sql.bindparams(query=query))
-        rows = result.fetchall()
-
-        return [
-            {
-                "id": row[0],
-                "title": row[1],
-                "content": row[2],
-                "score": None
-            }
-            for row in rows
-        ]
\ No newline at end of file
+        result = await self.session.execute(sql, params)
+        return self._rows_to_results(result.fetchall())
+
+    async def _hybrid_search(
+        self,
+        query: str,
+        query_embedding: list,
+        limit: int = 3,
+        filters: Optional[SearchFilters] = None,
+        cursor: Optional[Tuple[float, int]] = None,
+        fields: SearchFields = "full",
+    ) -> list:
+        """Fuse vector and full-text candidates with reciprocal rank fusion.
+
+        Both candidate queries run as CTEs of a single statement; ``score`` is
+        the weighted RRF score sum(weight / (HYBRID_RRF_K + rank)).
+        """
+        conditions, params = self._filter_clause(filters)
+        lexical_where = " AND ".join(["search_tsv @@ websearch_to_tsquery('english', :query)"] + conditions)
+        vector_where = " AND ".join(["embedding IS NOT NULL"] + conditions)
+        cursor_sql = ""
+        if cursor is not None:
+            condition, cursor_params = self._cursor_condition(cursor, "f.score", "f.id", descending=True)
+            cursor_sql = f"WHERE {condition}"
+            params.update(cursor_params)
+        columns, projection_params = self._projection(fields, query)
+        params.update(projection_params)
+        params.update(
+            query=query,
+            query_embedding=to_pgvector(query_embedding),
+            candidates=max(limit, HYBRID_CANDIDATES),
+            rrf_k=HYBRID_RRF_K,
+            vector_weight=HYBRID_VECTOR_WEIGHT,
+            lexical_weight=HYBRID_LEXICAL_WEIGHT,
+            limit=limit,
+        )
+
+        sql = text(f"""
+            WITH vector_hits AS MATERIALIZED (
+                SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT id, (embedding <=> CAST(:query_embedding AS vector)) AS distance
+                    FROM documents
+                    WHERE {vector_where}
+                    ORDER BY distance
+                    LIMIT :candidates
+                ) v
+            ),
+            lexical_hits AS MATERIALIZED (
+                SELECT id, row_number() OVER (ORDER BY rank_cd DESC, id) AS rank
+                FROM (
+                    SELECT id, ts_rank_cd(search_tsv, websearch_to_tsquery('english', :query)) AS rank_cd
+                    FROM documents
+                    WHERE {lexical_where}
+                    ORDER BY rank_cd DESC, id
+                    LIMIT :candidates
+                ) l
+            ),
+            fused AS (
+                SELECT id, SUM(score) AS score
+                FROM (
+                    SELECT id, CAST(:vector_weight AS float8) / (:rrf_k + rank) AS score FROM vector_hits
+                    UNION ALL
+                    SELECT id, CAST(:lexical_weight AS float8) / (:rrf_k + rank) AS score FROM lexical_hits
+                ) ranked
+                GROUP BY id
+            ),
+            top AS MATERIALIZED (
+                SELECT f.id, f.score
+                FROM fused f
+                {cursor_sql}
+                ORDER BY f.score DESC, f.id
+                LIMIT :limit
+            )
+            SELECT t.id{columns}, t.score
+            FROM top t
+            JOIN documents d ON d.id = t.id
+            ORDER BY t.score DESC, t.id
+        """)
+        result = await self.session.execute(sql, params)
+        return self._rows_to_results(result.fetchall())
+
+    async def _fallback_text_search(
+        self,
+        query: str,
+        limit: int = 3,
+        filters: Optional[SearchFilters] = None,
+        fields: SearchFields = "full",
+    ) -> list:
+        """Perform text-based search as fallback (uses the search_tsv GIN index)."""
+        return await self._lexical_search(query, limit, filters, fields=fields)
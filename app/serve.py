@@ -0,0 +1,89 @@
+import os
+import glob
+import logging
+import argparse
+import multiprocessing
+from typing import Any, Dict
+
+# Nothing that imports prometheus_client may be imported at module level:
+# workers are forked from this process, and prometheus_client picks its
+# single- or multi-process value store once, when it is first imported.
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+BIND = os.getenv("BIND", "0.0.0.0:8000")
+METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/pharmoris-metrics")
+# Recycle workers after this many requests (+ jitter) to bound slow memory growth; 0 disables
+MAX_REQUESTS = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+GRACEFUL_TIMEOUT = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_metrics_dir(path: str):
+    """Create the multi-process metrics directory and remove files left by a previous run."""
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+def on_starting(server):
+    prepare_metrics_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+def child_exit(server, worker):
+    # Drops the dead worker's live gauges; its counters and histograms stay
+    # in the aggregate so totals never go backwards
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def on_exit(server):
+    prepare_metrics_dir(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def gunicorn_options(workers: int, bind: str) -> Dict[str, Any]:
+    return {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": "uvicorn_worker.UvicornWorker",
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS // 10,
+        # Each worker imports the app after the fork, so it gets its own
+        # event loop, database pool and metric files
+        "preload_app": False,
+        "on_starting": on_starting,
+        "child_exit": child_exit,
+        "on_exit": on_exit,
+    }
+
+def run(workers: int = WEB_CONCURRENCY, bind: str = BIND, metrics_dir: str = METRICS_DIR):
+    """Serve main:app with gunicorn and uvicorn workers in multi-process metrics mode."""
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options(workers, bind).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    logger.info("Starting %d workers on %s (metrics in %s)", workers, bind, metrics_dir)
+    Server().run()
+
+def main():
+    """Entry point for production serving."""
+    parser = argparse.ArgumentParser(
+        description="Run the API with several worker processes and aggregated Prometheus metrics."
+    )
+    parser.add_argument('--workers', '-w', type=int, default=WEB_CONCURRENCY, help="Worker processes")
+    parser.add_argument('--bind', '-b', default=BIND, help="Address to listen on")
+    parser.add_argument('--metrics-dir', default=METRICS_DIR, help="Directory for per-worker metric files")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    run(workers=args.workers, bind=args.bind, metrics_dir=args.metrics_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Fake OpenAI-compatible embeddings server for tests and local load runs.
+
+Run standalone with ``uvicorn app.tests.fake_provider:app --port 9000`` and set
+``EMBEDDING_API_BASE=http://localhost:9000/v1``.
+"""
+import asyncio
+import hashlib
+from typing import List, Union
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+app = FastAPI(title="Fake embeddings provider")
+
+# Behaviour knobs, adjusted by tests
+app.state.dim = 8
+app.state.delays: List[float] = []      # per-request delays, consumed in order
+app.state.failures: List[int] = []      # per-request status codes, consumed in order
+app.state.retry_after = None
+app.state.requests = 0
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: Union[str, List[str]]
+
+def _vector(text: str, dim: int) -> List[float]:
+    digest = hashlib.sha256(text.encode()).digest()
+    return [digest[i % len(digest)] / 255.0 for i in range(dim)]
+
+@app.post("/v1/embeddings")
+async def embeddings(req: EmbeddingRequest):
+    app.state.requests += 1
+    if app.state.delays:
+        await asyncio.sleep(app.state.delays.pop(0))
+    if app.state.failures:
+        status = app.state.failures.pop(0)
+        headers = {"Retry-After": str(app.state.retry_after)} if app.state.retry_after is not None else {}
+        return JSONResponse(status_code=status, content={"error": {"message": "fake failure"}}, headers=headers)
+
+    texts = [req.input] if isinstance(req.input, str) else req.input
+    data = [
+        {"object": "embedding", "index": i, "embedding": _vector(t, app.state.dim)}
+        for i, t in enumerate(texts)
+    ]
+    # Return items reversed to exercise index-based reordering
+    return {"object": "list", "model": req.model, "data": list(reversed(data))}
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "fake-embedding", "object": "model"}]}
@@ -121,4 +121,23 @@ async def test_unauthorized_access(client):
         "user_id": "test-user"
     }
     response = client.post("/documents/search", json=search_payload)
-    assert response.status_code == 401  # Unauthorized
\ No newline at end of file
+    assert response.status_code == 401  # Unauthorized
+
+@pytest.mark.asyncio
+async def test_async_document_creation(client, document_title, document_content, api_key_header):
+    """Test async ingest: 202 with the id, embedding status queryable afterwards"""
+    payload = {
+        "title": document_title,
+        "content": document_content
+    }
+    response = client.post("/documents?mode=async", json=payload, headers=api_key_header)
+    assert response.status_code == 202
+    created = response.json()
+    assert created["embedding_status"] == "pending"
+    assert "content" not in created
+
+    status_response = client.get(f"/documents/{created['id']}/status", headers=api_key_header)
+    assert status_response.status_code == 200
+    assert status_response.json()["embedding_status"] in ("pending", "ready", "failed")
+
+    assert client.get("/documents/0/status", headers=api_key_header).status_code == 404
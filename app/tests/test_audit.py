@@ -0,0 +1,195 @@
+import os
+import time
+import asyncio
+import pytest
+from app.utils import audit
+
+
+@pytest.mark.asyncio
+async def test_writer_batches_records_into_few_inserts(monkeypatch):
+    inserts = []
+
+    async def fake_insert(batch):
+        inserts.append(len(batch))
+
+    monkeypatch.setattr(audit, "_insert_records", fake_insert)
+    writer = audit.AuditWriter(flush_interval_ms=20, flush_max_rows=50)
+    for i in range(120):
+        await writer.record([audit._audit_record("u", "search_documents", {"i": i})])
+    await asyncio.sleep(0.1)
+    await writer.stop()
+
+    assert sum(inserts) == 120
+    assert len(inserts) <= 4
+
+
+@pytest.mark.asyncio
+async def test_writer_spills_when_db_fails_and_replays(monkeypatch, tmp_path):
+    spill = tmp_path / "audit.ndjson"
+    written = []
+    db_up = False
+
+    async def flaky_insert(batch):
+        if not db_up:
+            raise ConnectionError("database unavailable")
+        written.extend(batch)
+
+    monkeypatch.setattr(audit, "_insert_records", flaky_insert)
+    writer = audit.AuditWriter(flush_interval_ms=5, spill_path=str(spill))
+    await writer.record([audit._audit_record("u", "a", {"n": n}) for n in range(3)])
+    await writer.stop()
+    own_spill = tmp_path / f"audit.{os.getpid()}.ndjson"
+    assert len(own_spill.read_text().splitlines()) == 3
+
+    db_up = True
+    await writer._replay_spill()
+    assert [r[2] for r in written] == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+    assert [p.name for p in tmp_path.iterdir()] == ["audit.ndjson.lock"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_replays_claim_each_spill_file_once(monkeypatch, tmp_path):
+    spill = tmp_path / "audit.ndjson"
+    written = []
+
+    async def slow_insert(batch):
+        await asyncio.sleep(0.01)
+        written.extend(batch)
+
+    monkeypatch.setattr(audit, "_insert_records", slow_insert)
+    # Left by a worker that has exited, and by one that is still running
+    dead_pid = 2 ** 22 + 1
+    lines = "".join(f'["u", "a{n}", null, "2024-01-01T00:00:00+00:00"]\n' for n in range(5))
+    (tmp_path / f"audit.{dead_pid}.ndjson").write_text(lines)
+    (tmp_path / f"audit.{os.getppid()}.ndjson").write_text(lines)
+
+    workers = [audit.AuditWriter(spill_path=str(spill)) for _ in range(2)]
+    await asyncio.gather(*(w._replay_spill() for w in workers))
+    await asyncio.gather(*(w._replay_spill() for w in workers))
+
+    assert sorted(r[1] for r in written) == [f"a{n}" for n in range(5)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"audit.{os.getppid()}.ndjson", "audit.ndjson.lock"]
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_when_queue_full(monkeypatch):
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_insert(batch):
+        started.set()
+        await release.wait()
+
+    monkeypatch.setattr(audit, "_insert_records", slow_insert)
+    writer = audit.AuditWriter(queue_size=2, flush_interval_ms=1, policy="drop")
+    await writer.record([audit._audit_record("u", "a", None)])
+    await started.wait()
+    # Writer is stuck flushing; only two more records fit in the queue
+    await writer.record([audit._audit_record("u", "a", None) for _ in range(5)])
+    assert writer._queue.qsize() == 2
+    release.set()
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_writer_survives_spill_and_replay_errors(monkeypatch, tmp_path):
+    written = []
+    db_up = False
+
+    async def flaky_insert(batch):
+        if not db_up:
+            raise ConnectionError("database unavailable")
+        written.extend(batch)
+
+    async def broken_replay():
+        raise OSError("permission denied")
+
+    monkeypatch.setattr(audit, "_insert_records", flaky_insert)
+    # The spill directory does not exist, so spilling fails too
+    writer = audit.AuditWriter(flush_interval_ms=5, spill_path=str(tmp_path / "missing" / "audit.ndjson"))
+    monkeypatch.setattr(writer, "_replay_spill", broken_replay)
+
+    await writer.record([audit._audit_record("u", "a", None)])
+    await asyncio.sleep(0.05)
+    db_up = True
+    await writer.record([audit._audit_record("u", "b", None)])
+    await asyncio.sleep(0.05)
+
+    assert not writer._task.done()
+    assert [r[1] for r in written] == ["b"]
+    await writer.stop()
+
+
+def test_restart_on_a_new_loop_keeps_queued_records(monkeypatch, tmp_path):
+    written = []
+
+    async def fake_insert(batch):
+        written.extend(batch)
+
+    async def enqueue_then_abandon(writer):
+        writer.start()
+        writer._task.cancel()
+        await asyncio.sleep(0)
+        await writer.record([audit._audit_record("u", str(n), None) for n in range(3)])
+
+    async def restart_and_stop(writer):
+        writer.start()
+        await writer.stop()
+
+    monkeypatch.setattr(audit, "_insert_records", fake_insert)
+    writer = audit.AuditWriter(flush_interval_ms=5, spill_path=str(tmp_path / "audit.ndjson"))
+    asyncio.run(enqueue_then_abandon(writer))
+    asyncio.run(restart_and_stop(writer))
+    assert [r[1] for r in written] == ["0", "1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_missing_partition_is_created_and_batch_replayed(monkeypatch, tmp_path):
+    written = []
+    partitions = []
+
+    async def insert(batch):
+        if not partitions:
+            raise Exception('no partition of relation "audit_logs" found for row')
+        written.extend(batch)
+
+    async def create_partitions():
+        partitions.append("audit_logs_p202610")
+        return True
+
+    monkeypatch.setattr(audit, "_insert_records", insert)
+    monkeypatch.setattr(audit, "_create_audit_partitions", create_partitions)
+    monkeypatch.setattr(audit, "AUDIT_SPILL_REPLAY_SECONDS", 3600)
+    writer = audit.AuditWriter(flush_interval_ms=5, spill_path=str(tmp_path / "audit.ndjson"))
+    writer._last_replay = time.monotonic()
+
+    await writer._flush([audit._audit_record("u", "a", None)])
+    assert partitions and written == []
+    await writer._flush([audit._audit_record("u", "b", None)])
+    assert sorted(r[1] for r in written) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_replay_without_spill_files_takes_no_lock(monkeypatch, tmp_path):
+    (tmp_path / "audit.ndjson.lock").write_text("")
+    writer = audit.AuditWriter(spill_path=str(tmp_path / "audit.ndjson"))
+    monkeypatch.setattr(writer, "_lock_replay", lambda: pytest.fail("replay lock taken"))
+    await writer._replay_spill()
+
+
+@pytest.mark.asyncio
+async def test_replay_keeps_file_when_unreplayed_records_cannot_be_respilled(monkeypatch, tmp_path):
+    async def failing_insert(batch):
+        raise ConnectionError("database unavailable")
+
+    def failing_append(batch):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(audit, "_insert_records", failing_insert)
+    writer = audit.AuditWriter(spill_path=str(tmp_path / "audit.ndjson"))
+    monkeypatch.setattr(writer, "_append_spill", failing_append)
+    spill = tmp_path / f"audit.{os.getpid()}.ndjson"
+    spill.write_text('["u", "a", null, "2024-01-01T00:00:00+00:00"]\n')
+
+    await writer._replay_spill()
+    assert (tmp_path / f"audit.{os.getpid()}.ndjson.replay").exists()
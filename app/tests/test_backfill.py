@@ -0,0 +1,73 @@
+import asyncio
+import contextlib
+import pytest
+from app.utils import backfill
+
+
+class _FakeEngine:
+    @contextlib.asynccontextmanager
+    async def begin(self):
+        yield None
+
+
+@pytest.mark.asyncio
+async def test_backfill_walks_ids_and_checkpoints_in_order(monkeypatch):
+    pending = list(range(1, 11))
+    claims = []
+    checkpoints = []
+
+    async def fake_claim(conn, limit, after_id=None):
+        claims.append(after_id)
+        batch = [i for i in pending if i > after_id][:limit]
+        return [(i, f"doc {i}", 1) for i in batch]
+
+    async def fake_embed_and_store(claimed):
+        # Later batches finish first; the checkpoint must still advance in id order
+        await asyncio.sleep(0.01 * (20 - claimed[0][0]) / 10)
+        return [doc_id for doc_id, _, _ in claimed if doc_id == 4]
+
+    async def fake_count(self):
+        return len(pending)
+
+    async def fake_save(self):
+        checkpoints.append(self.last_id)
+
+    async def fake_load(self):
+        return 0
+
+    monkeypatch.setattr(backfill, "engine", _FakeEngine())
+    monkeypatch.setattr(backfill, "claim_batch", fake_claim)
+    monkeypatch.setattr(backfill, "embed_and_store", fake_embed_and_store)
+    monkeypatch.setattr(backfill.BackfillEngine, "_count_pending", fake_count)
+    monkeypatch.setattr(backfill.BackfillEngine, "_save_checkpoint", fake_save)
+    monkeypatch.setattr(backfill.BackfillEngine, "_load_checkpoint", fake_load)
+
+    progress = []
+    engine = backfill.BackfillEngine(batch_size=3, concurrency=2, on_progress=progress.append)
+    success_count, failed_ids = await engine.run()
+
+    assert claims == [0, 3, 6, 9, 10]
+    assert (success_count, failed_ids) == (9, [4])
+    assert checkpoints == [0, 3, 6, 9, 10]
+    assert progress[-1]["processed"] == 10 and progress[-1]["total"] == 10
+
+
+@pytest.mark.asyncio
+async def test_backfill_respects_limit(monkeypatch):
+    async def fake_claim(conn, limit, after_id=None):
+        return [(after_id + i + 1, "doc", 1) for i in range(limit)]
+
+    async def fake_embed_and_store(claimed):
+        return []
+
+    async def noop(self):
+        return 0
+
+    monkeypatch.setattr(backfill, "engine", _FakeEngine())
+    monkeypatch.setattr(backfill, "claim_batch", fake_claim)
+    monkeypatch.setattr(backfill, "embed_and_store", fake_embed_and_store)
+    monkeypatch.setattr(backfill.BackfillEngine, "_count_pending", lambda self: asyncio.sleep(0, 100))
+    monkeypatch.setattr(backfill.BackfillEngine, "_save_checkpoint", noop)
+
+    success_count, failed_ids = await backfill.BackfillEngine(batch_size=4, limit=10).run()
+    assert (success_count, failed_ids) == (10, [])
@@ -0,0 +1,59 @@
+import asyncio
+import numpy as np
+import pytest
+from app.core import cache
+from app.core.cache import EmbeddingCache, LocalEmbeddingCache, cache_key
+from app.utils.embeddings import EMBEDDING_IDENTITY, EMBEDDING_PROVIDER
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    calls = []
+
+    async def fake_get_embedding(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return [0.5, 0.25, 0.125]
+
+    monkeypatch.setattr(cache, "get_embedding", fake_get_embedding)
+    return calls
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_call_provider_once(provider_calls):
+    embedding_cache = EmbeddingCache()
+
+    results = await asyncio.gather(*(embedding_cache.get("aspirin dosage") for _ in range(10)))
+
+    assert provider_calls == ["aspirin dosage"]
+    assert all(r == [0.5, 0.25, 0.125] for r in results)
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_repeat_queries(provider_calls):
+    embedding_cache = EmbeddingCache()
+
+    await embedding_cache.get("aspirin  dosage")
+    await embedding_cache.get(" aspirin dosage ")
+
+    assert provider_calls == ["aspirin dosage"]
+
+def test_local_tier_is_bounded_and_stores_float32():
+    local = LocalEmbeddingCache(max_size=2, ttl=60)
+    for i in range(3):
+        local.set(f"k{i}", np.ones(4, dtype=np.float32) * i)
+
+    assert len(local) == 2
+    assert local.get("k0") is None
+    assert local.get("k2").dtype == np.float32
+
+def test_local_tier_expires_entries():
+    local = LocalEmbeddingCache(max_size=2, ttl=-1)
+    local.set("k", np.ones(4, dtype=np.float32))
+
+    assert local.get("k") is None
+
+def test_cache_key_includes_model():
+    assert cache_key("query", "model-a") != cache_key("query", "model-b")
+
+def test_cache_key_separates_providers_with_the_same_model_name():
+    assert cache_key("query", "openai:text-embedding-3-small:1536") != cache_key("query", "local:text-embedding-3-small:1536")
+    assert EMBEDDING_IDENTITY.startswith(f"{EMBEDDING_PROVIDER}:")
+    assert cache_key("query").startswith(f"emb:{EMBEDDING_IDENTITY}:")
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from app.utils.batching import EmbeddingCoalescer
+
+
+def make_fetch(calls):
+    async def fetch(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+    return fetch
+
+@pytest.mark.asyncio
+async def test_coalescer_batches_concurrent_callers():
+    """Concurrent callers share one provider request and get their own vector back"""
+    calls = []
+    coalescer = EmbeddingCoalescer(make_fetch(calls), max_batch_size=10, max_wait_ms=20)
+
+    results = await asyncio.gather(*(coalescer.submit("x" * n) for n in range(1, 6)))
+
+    assert len(calls) == 1
+    assert results == [[float(n)] for n in range(1, 6)]
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_at_max_batch_size():
+    calls = []
+    coalescer = EmbeddingCoalescer(make_fetch(calls), max_batch_size=2, max_wait_ms=1000)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(coalescer.submit(f"text {i}") for i in range(4))),
+        timeout=0.5
+    )
+
+    assert [len(c) for c in calls] == [2, 2]
+
+@pytest.mark.asyncio
+async def test_coalescer_deduplicates_identical_texts():
+    calls = []
+    coalescer = EmbeddingCoalescer(make_fetch(calls), max_batch_size=10, max_wait_ms=5)
+
+    a, b = await asyncio.gather(coalescer.submit("same"), coalescer.submit("same"))
+
+    assert calls == [["same"]]
+    assert a == b
+
+@pytest.mark.asyncio
+async def test_coalescer_propagates_errors_to_all_callers():
+    async def failing_fetch(texts):
+        raise RuntimeError("provider down")
+
+    coalescer = EmbeddingCoalescer(failing_fetch, max_batch_size=10, max_wait_ms=5)
+    results = await asyncio.gather(
+        coalescer.submit("a"), coalescer.submit("b"), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
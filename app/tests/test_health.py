@@ -0,0 +1,69 @@
+import time
+import asyncio
+import pytest
+from app.core.health import HealthMonitor
+
+
+def _probe(delay=0.0, fail=None, calls=None):
+    async def probe():
+        if calls is not None:
+            calls.append(time.monotonic())
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(fail)
+        return {"detail": "ok"}
+    return probe
+
+
+@pytest.mark.asyncio
+async def test_probes_run_concurrently_with_per_probe_timeouts():
+    monitor = HealthMonitor(probes={
+        "a": _probe(0.2),
+        "b": _probe(0.2),
+        "slow": _probe(5.0),
+        "broken": _probe(fail="connection refused"),
+    }, timeout=0.3)
+
+    start = time.perf_counter()
+    results = await monitor.refresh()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6  # bounded by the timeout, not the sum of the probes
+    assert results["a"]["status"] == "healthy" and results["a"]["detail"] == "ok"
+    assert results["a"]["latency_ms"] >= 150
+    assert results["slow"]["status"] == "unhealthy" and "timed out" in results["slow"]["error"]
+    assert results["broken"]["error"] == "connection refused"
+
+
+@pytest.mark.asyncio
+async def test_snapshot_serves_cache_until_stale_and_shares_refreshes():
+    calls = []
+    monitor = HealthMonitor(probes={"db": _probe(0.05, calls=calls)}, stale_after=60)
+
+    await asyncio.gather(*(monitor.snapshot() for _ in range(5)))
+    assert len(calls) == 1  # concurrent callers share one probe run
+
+    await monitor.snapshot()
+    assert len(calls) == 1
+
+    monitor.stale_after = 0
+    await monitor.snapshot()
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_readiness_only_considers_required_probes():
+    monitor = HealthMonitor(probes={"database": _probe(), "redis": _probe(fail="down")})
+    assert await monitor.is_ready(["database"])
+    assert not await monitor.is_ready(["database", "redis"])
+
+
+@pytest.mark.asyncio
+async def test_background_refresher_updates_results():
+    calls = []
+    monitor = HealthMonitor(probes={"db": _probe(calls=calls)}, interval=0.05)
+    monitor.start()
+    await asyncio.sleep(0.18)
+    await monitor.stop()
+    assert len(calls) >= 3
+    assert monitor.results["db"]["status"] == "healthy"
@@ -0,0 +1,90 @@
+import json
+import pytest
+from app.documents import ingest
+
+
+async def _stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_iter_ndjson_lines_splits_across_chunks_and_bounds_lines():
+    chunks = [b'{"a":1}\n{"b"', b':2}\n\n', b"x" * 50, b'\n{"c":3}']
+    lines = [item async for item in ingest.iter_ndjson_lines(_stream(chunks), max_line_bytes=20)]
+    assert lines == [(1, b'{"a":1}'), (2, b'{"b":2}'), (4, None), (5, b'{"c":3}')]
+
+
+@pytest.mark.asyncio
+async def test_bulk_ingestor_reports_every_line(monkeypatch):
+    batches = []
+
+    async def fake_embeddings(texts):
+        return [[0.0] for _ in texts]
+
+    async def fake_copy(batch, embeddings):
+        batches.append(len(batch))
+        return [line_no * 10 for line_no, _ in batch]
+
+    monkeypatch.setattr(ingest, "get_embeddings", fake_embeddings)
+    monkeypatch.setattr(ingest, "_copy_documents", fake_copy)
+
+    body = b"".join(b'{"title": "t%d", "content": "c%d"}\n' % (i, i) for i in range(5)) + b'{"title": "x"}\n'
+    ingestor = ingest.BulkIngestor(batch_size=2, embed_concurrency=2)
+    output = [json.loads(line) async for line in ingestor.run(_stream([body[:17], body[17:]]))]
+
+    assert batches == [2, 2, 1]
+    assert {r["line"]: r["id"] for r in output if "id" in r} == {1: 10, 2: 20, 3: 30, 4: 40, 5: 50}
+    assert [r["line"] for r in output if "error" in r] == [6]
+    assert output[-1]["summary"]["inserted"] == 5
+    assert output[-1]["summary"]["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_endpoint_stores_every_line_over_a_real_server(monkeypatch):
+    import socket
+    import asyncio
+    import httpx
+    import uvicorn
+    from fastapi import FastAPI
+    from app.documents.router import router
+
+    stored = []
+
+    async def fake_embeddings(texts):
+        await asyncio.sleep(0.001)  # let the server read ahead while a batch is in flight
+        return [[0.0] for _ in texts]
+
+    async def fake_copy(batch, embeddings):
+        stored.extend(line_no for line_no, _ in batch)
+        return [line_no for line_no, _ in batch]
+
+    monkeypatch.setattr(ingest, "get_embeddings", fake_embeddings)
+    monkeypatch.setattr(ingest, "_copy_documents", fake_copy)
+
+    app = FastAPI()
+    app.include_router(router)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    lines = 2000
+
+    async def body():
+        for i in range(lines):
+            yield b'{"title": "t%d", "content": "c%d"}\n' % (i, i)
+
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(f"http://127.0.0.1:{port}/documents/bulk", content=body())
+        summary = json.loads(response.text.splitlines()[-1])["summary"]
+    finally:
+        server.should_exit = True
+        await serving
+
+    assert sorted(stored) == list(range(1, lines + 1))
+    assert summary["inserted"] == lines and summary["failed"] == 0
@@ -0,0 +1,65 @@
+import asyncio
+import contextlib
+import pytest
+from app.admin import jobs
+from app.admin.jobs import JobContext, JobManager
+
+
+def test_cancel_runs_cooperative_hooks_once():
+    ctx = JobContext(1)
+    stops = []
+    ctx.on_cancel(lambda: stops.append("stop"))
+    ctx.cancel()
+    ctx.cancel()
+    assert ctx.cancel_requested
+    assert stops == ["stop"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_without_hooks_cancels_the_task():
+    ctx = JobContext(2)
+    ctx.task = asyncio.create_task(asyncio.sleep(10))
+    ctx.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await ctx.task
+
+
+def test_update_merges_progress():
+    ctx = JobContext(3)
+    ctx.update({"phase": "requeue", "requeued": 10})
+    ctx.update({"phase": "embed"})
+    assert ctx.progress == {"phase": "embed", "requeued": 10}
+
+
+@pytest.mark.asyncio
+async def test_shutdown_marks_jobs_still_running_as_cancelled(monkeypatch):
+    updates = []
+
+    class Conn:
+        async def execute(self, statement, params=None):
+            updates.append((str(statement), params))
+
+    class Engine:
+        @contextlib.asynccontextmanager
+        async def begin(self):
+            yield Conn()
+
+    async def slow_to_stop():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            await asyncio.sleep(10)  # still finishing its in-flight batch
+
+    monkeypatch.setattr(jobs, "engine", Engine())
+    monkeypatch.setattr(jobs, "ADMIN_JOB_HEARTBEAT_SECONDS", 0.01)
+    manager = JobManager()
+    ctx = JobContext(7)
+    ctx.on_cancel(lambda: None)
+    ctx.task = asyncio.create_task(slow_to_stop())
+    manager._running[7] = ctx
+
+    await manager.shutdown()
+    assert len(updates) == 1
+    statement, params = updates[0]
+    assert "status = 'running'" in statement and params == {"status": "cancelled", "ids": [7]}
+    ctx.task.cancel()
@@ -0,0 +1,33 @@
+import numpy as np
+from app.utils.local_embeddings import LocalEmbeddingEngine
+
+def cosine(a, b):
+    return float(np.dot(a, b))
+
+def test_embeddings_are_deterministic_and_normalized():
+    engine = LocalEmbeddingEngine(dim=256)
+    first = engine.embed(["aspirin reduces fever", "ibuprofen dosage"])
+    second = LocalEmbeddingEngine(dim=256).embed(["aspirin reduces fever", "ibuprofen dosage"])
+
+    assert first.shape == (2, 256)
+    assert first.dtype == np.float32
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+
+def test_similar_texts_get_similar_vectors():
+    engine = LocalEmbeddingEngine(dim=1536)
+    query, related, unrelated = engine.embed([
+        "recommended aspirin dosage for adults",
+        "adult dosage recommendations for aspirin",
+        "quarterly revenue grew in the european market",
+    ])
+
+    assert cosine(query, related) > 0.5
+    assert cosine(query, related) > cosine(query, unrelated) + 0.3
+
+def test_batch_matches_single_text_embedding():
+    engine = LocalEmbeddingEngine(dim=128)
+    batch = engine.embed(["alpha beta", "gamma", "!!!"])
+
+    for i, text in enumerate(["alpha beta", "gamma", "!!!"]):
+        np.testing.assert_allclose(batch[i], engine.embed([text])[0], rtol=1e-6)
@@ -0,0 +1,46 @@
+import json
+import queue
+import logging
+from app.core import logs
+
+
+def _record(name="app.requests", level=logging.INFO, msg="%s done", args=("search",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_queue_handler_defers_formatting_and_captures_request_id():
+    handler = logs.ContextQueueHandler(queue.Queue())
+    token = logs.request_id_var.set("req-1")
+    try:
+        handler.handle(_record())
+    finally:
+        logs.request_id_var.reset(token)
+
+    queued = handler.queue.get_nowait()
+    assert queued.args == ("search",)  # message not formatted on the caller
+    assert queued.request_id == "req-1"
+
+    line = json.loads(logs.JsonFormatter().format(queued))
+    assert line["message"] == "search done"
+    assert line["request_id"] == "req-1"
+
+
+def test_json_formatter_includes_extra_fields():
+    line = json.loads(logs.JsonFormatter().format(_record(status=200, duration_ms=1.5)))
+    assert line["status"] == 200 and line["duration_ms"] == 1.5
+    assert line["logger"] == "app.requests" and line["level"] == "INFO"
+
+
+def test_sampling_keeps_requests_whole_and_never_drops_warnings():
+    sampler = logs.SamplingFilter(logs.parse_sampling("app.requests=0.5"))
+    kept = 0
+    for i in range(200):
+        decisions = {sampler.filter(_record(request_id=f"r{i}")) for _ in range(3)}
+        assert len(decisions) == 1  # every line of a request shares the decision
+        kept += decisions.pop()
+    assert 50 < kept < 150
+
+    assert sampler.filter(_record(level=logging.WARNING, request_id="r0"))
+    assert sampler.filter(_record(name="app.documents"))
@@ -0,0 +1,31 @@
+import os
+import sys
+import subprocess
+import textwrap
+
+
+def test_scrape_aggregates_samples_from_all_workers(tmp_path):
+    # Multi-process mode is chosen when prometheus_client is first imported,
+    # so this runs in a fresh interpreter with forked "workers"
+    script = textwrap.dedent("""
+        import os, asyncio
+        from app.core import metrics
+
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                metrics.SEARCH_REQUESTS.labels(status="ok").inc()
+                metrics.REQUESTS_IN_PROGRESS.inc()
+                os._exit(0)
+            os.waitpid(pid, 0)
+        # The second worker exited: its counts stay, its live gauge does not
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+        body = asyncio.run(metrics.metrics()).body.decode()
+        print([l for l in body.splitlines() if l.startswith(("search_requests_total", "http_requests_in_progress"))])
+    """)
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    assert 'search_requests_total{status="ok"} 2.0' in result.stdout
+    assert "http_requests_in_progress 1.0" in result.stdout
@@ -0,0 +1,53 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.core.middleware import ErrorHandlingMiddleware, MetricsMiddleware, RequestLoggingMiddleware
+from app.core.metrics import REQUEST_COUNT
+
+
+@pytest.mark.asyncio
+async def test_unhandled_error_becomes_json_500_and_is_counted():
+    app = FastAPI()
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    app.add_middleware(ErrorHandlingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+    before = REQUEST_COUNT.labels(method="GET", endpoint="/boom", status_code=500)._value.get()
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/boom")
+        ok = await client.get("/ok")
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Internal server error"
+    assert ok.status_code == 200
+    assert REQUEST_COUNT.labels(method="GET", endpoint="/boom", status_code=500)._value.get() == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_labelled_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    before = REQUEST_COUNT.labels(method="GET", endpoint="/items/{item_id}", status_code=200)._value.get()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for item_id in range(3):
+            await client.get(f"/items/{item_id}")
+        await client.get("/nowhere")
+
+    assert REQUEST_COUNT.labels(method="GET", endpoint="/items/{item_id}", status_code=200)._value.get() == before + 3
+    assert REQUEST_COUNT.labels(method="GET", endpoint="unmatched", status_code=404)._value.get() >= 1
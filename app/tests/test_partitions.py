@@ -0,0 +1,34 @@
+from datetime import date
+from app.db import partitions
+
+
+def test_monthly_partitions_cover_current_and_ahead():
+    planned = partitions.planned_partitions(date(2026, 11, 17), date(2027, 2, 1), {}, "month")
+    assert [name for name, _, _ in planned] == [
+        "audit_logs_p202611", "audit_logs_p202612", "audit_logs_p202701", "audit_logs_p202702",
+    ]
+    assert planned[1][1:] == (date(2026, 12, 1), date(2027, 1, 1))
+
+
+def test_existing_partitions_are_skipped_when_switching_interval():
+    existing = {"audit_logs_p202610": partitions.parse_partition_name("audit_logs_p202610")}
+    planned = partitions.planned_partitions(date(2026, 10, 30), date(2026, 11, 2), existing, "day")
+    assert [name for name, _, _ in planned] == [
+        "audit_logs_p20261101", "audit_logs_p20261102",
+    ]
+
+
+def test_parse_partition_name():
+    assert partitions.parse_partition_name("audit_logs_p20261231") == (date(2026, 12, 31), date(2027, 1, 1))
+    assert partitions.parse_partition_name("audit_logs_p202602") == (date(2026, 2, 1), date(2026, 3, 1))
+    assert partitions.parse_partition_name("audit_logs_legacy") is None
+
+
+def test_only_fully_expired_partitions_are_removed():
+    existing = {
+        name: partitions.parse_partition_name(name)
+        for name in ("audit_logs_p202608", "audit_logs_p202609", "audit_logs_p202610")
+    }
+    # Cutoff 2026-09-17: September still holds retained rows
+    assert partitions.expired_partitions(existing, date(2026, 10, 17), retention_days=30) == ["audit_logs_p202608"]
+    assert partitions.expired_partitions(existing, date(2026, 10, 17), retention_days=0) == []
@@ -0,0 +1,21 @@
+from app.documents.schemas import DocumentOut
+from app.documents.service import DocumentService
+
+
+def test_projection_reads_only_requested_columns():
+    assert DocumentService._projection("ids") == ("", {})
+    assert DocumentService._projection("title")[0] == ", d.title"
+    assert "d.content" in DocumentService._projection("full")[0]
+
+    columns, params = DocumentService._projection("snippet")
+    assert "left(d.content, :snippet_chars) AS snippet" in columns
+    assert "ts_headline" not in columns
+
+    columns, params = DocumentService._projection("snippet", query="aspirin")
+    assert "ts_headline" in columns
+    assert "snippet_scan" in params and "headline_options" in params
+
+
+def test_ids_projection_serializes_without_content():
+    out = DocumentOut(id=7, score=0.25)
+    assert out.model_dump(exclude_none=True) == {"id": 7, "score": 0.25}
@@ -0,0 +1,107 @@
+import asyncio
+import httpx
+import pytest
+from app.tests import fake_provider
+from app.utils.provider import CircuitOpenError, EmbeddingProviderClient, RetryableProviderError
+
+MODEL = "fake-embedding"
+
+@pytest.fixture
+def fake():
+    app = fake_provider.app
+    app.state.delays = []
+    app.state.failures = []
+    app.state.retry_after = None
+    app.state.requests = 0
+    return app
+
+def make_client(fake, **kwargs):
+    options = dict(
+        base_url="http://fake/v1",
+        api_key="sk-test",
+        backoff_base=0.001,
+        hedge_percentile=0,
+        transport=httpx.ASGITransport(app=fake),
+    )
+    options.update(kwargs)
+    return EmbeddingProviderClient(**options)
+
+@pytest.mark.asyncio
+async def test_embed_returns_vectors_in_input_order(fake):
+    client = make_client(fake)
+    vectors = await client.embed(["a", "b", "c"], MODEL)
+    await client.close()
+
+    assert vectors == [fake_provider._vector(t, fake.state.dim) for t in ["a", "b", "c"]]
+
+@pytest.mark.asyncio
+async def test_embed_retries_throttled_requests(fake):
+    fake.state.failures = [429, 503]
+    fake.state.retry_after = 0
+    client = make_client(fake)
+
+    vectors = await client.embed(["a"], MODEL)
+    await client.close()
+
+    assert len(vectors) == 1
+    assert fake.state.requests == 3
+
+@pytest.mark.asyncio
+async def test_embed_does_not_retry_client_errors(fake):
+    fake.state.failures = [400]
+    client = make_client(fake)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.embed(["a"], MODEL)
+    await client.close()
+    assert fake.state.requests == 1
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures(fake):
+    fake.state.failures = [500] * 10
+    client = make_client(fake, max_retries=1, breaker_threshold=2, breaker_reset_seconds=60)
+
+    with pytest.raises(RetryableProviderError):
+        await client.embed(["a"], MODEL)
+    with pytest.raises(CircuitOpenError):
+        await client.embed(["a"], MODEL)
+    await client.close()
+    assert fake.state.requests == 2
+
+@pytest.mark.asyncio
+async def test_half_open_trial_ending_without_verdict_does_not_wedge_the_breaker(fake):
+    client = make_client(fake, max_retries=0, breaker_threshold=1, breaker_reset_seconds=0.01)
+    fake.state.failures = [500, 400]
+    with pytest.raises(RetryableProviderError):
+        await client.embed(["a"], MODEL)
+    await asyncio.sleep(0.02)
+
+    # Half-open trial fails with a non-retryable error: the circuit re-opens
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.embed(["a"], MODEL)
+    assert client.breaker.state == "open"
+    await asyncio.sleep(0.02)
+
+    # Half-open trial is cancelled: the next request may make the trial
+    fake.state.delays = [1.0]
+    trial = asyncio.ensure_future(client.embed(["a"], MODEL))
+    await asyncio.sleep(0.05)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert len(await client.embed(["a"], MODEL)) == 1
+    assert client.breaker.state == "closed"
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged(fake):
+    client = make_client(fake, hedge_percentile=50, hedge_min_samples=1)
+    client.latency.record(0.01)
+    fake.state.delays = [1.0, 0.0]
+
+    vectors = await asyncio.wait_for(client.embed(["a"], MODEL), timeout=0.5)
+    await client.close()
+
+    assert len(vectors) == 1
+    assert fake.state.requests == 2
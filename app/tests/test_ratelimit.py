@@ -0,0 +1,70 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.core.middleware import RateLimitMiddleware
+from app.core.ratelimit import MemoryBackend, RateLimiter, RateLimitRule, parse_route_rules, take_token
+
+
+def test_token_bucket_refills_at_rate():
+    rule = RateLimitRule("r", limit=60, period=60, burst=2)
+    allowed, tokens = take_token(0.0, 0.0, 0.5, rule)
+    assert not allowed and tokens == pytest.approx(0.5)
+    allowed, tokens = take_token(0.0, 0.0, 10.0, rule)
+    assert allowed and tokens == pytest.approx(1.0)  # capped at burst before taking one
+
+
+def test_route_rules_pick_longest_prefix():
+    rules = parse_route_rules("POST /documents/bulk=5/60:10, /documents=100/60")
+    assert rules[0].method == "POST" and rules[0].burst == 10
+    limiter = RateLimiter(default=RateLimitRule("default", 60), routes=rules, backend=MemoryBackend(), exempt=["/health"])
+    assert limiter.rule_for("POST", "/documents/bulk").limit == 5
+    assert limiter.rule_for("GET", "/documents/bulk").limit == 100
+    assert limiter.rule_for("GET", "/admin/jobs").name == "default"
+    assert limiter.rule_for("GET", "/health/ready") is None
+
+
+def test_client_key_prefers_api_key_and_hashes_it():
+    limiter = RateLimiter(backend=MemoryBackend(), key_sources=["api_key", "ip"], api_key="secret")
+    key = limiter.client_key({"x-api-key": "secret"}, "10.0.0.1")
+    assert key.startswith("key:") and "secret" not in key
+    assert limiter.client_key({}, "10.0.0.1") == "ip:10.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_unknown_keys_and_user_ids_share_the_ip_bucket():
+    limiter = RateLimiter(
+        default=RateLimitRule("default", limit=2), routes=[], backend=MemoryBackend(),
+        key_sources=["api_key", "user", "ip"], exempt=[], api_key="secret",
+    )
+    decisions = [
+        await limiter.check("GET", "/documents", {"x-api-key": f"guess-{n}", "x-user-id": f"u{n}"}, "10.0.0.1")
+        for n in range(10)
+    ]
+    assert [d.allowed for d in decisions] == [True, True] + [False] * 8
+
+    limiter.key_sources = ["user", "ip"]
+    assert limiter.client_key({"x-user-id": "u1"}, "10.0.0.1") == "ip:10.0.0.1"
+    assert limiter.client_key({"x-api-key": "secret", "x-user-id": "u1"}, "10.0.0.1") == "user:u1"
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_retry_after():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    limiter = RateLimiter(default=RateLimitRule("default", limit=2, period=60), routes=[], backend=MemoryBackend())
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/ping")
+        second = await client.get("/ping")
+        third = await client.get("/ping")
+
+    assert first.status_code == 200 and first.headers["RateLimit-Remaining"] == "1"
+    assert second.status_code == 200 and second.headers["RateLimit-Remaining"] == "0"
+    assert third.status_code == 429
+    assert third.headers["Retry-After"] == "30"
+    assert third.headers["RateLimit-Limit"] == "2"
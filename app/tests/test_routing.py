@@ -0,0 +1,53 @@
+import pytest
+from app.db.routing import Replica, ReplicaRouter
+
+
+class FakeReplica(Replica):
+    def __init__(self, name, lag=0.0, fail=False):
+        super().__init__(name)
+        self.sessionmaker = name
+        self.lag_value = lag
+        self.fail = fail
+        self.checks = 0
+
+    async def measure_lag(self):
+        self.checks += 1
+        if self.fail:
+            raise OSError("connection refused")
+        return self.lag_value
+
+
+@pytest.mark.asyncio
+async def test_reads_rotate_across_healthy_replicas():
+    router = ReplicaRouter([FakeReplica("r0"), FakeReplica("r1")], primary="primary", check_interval=60)
+    picks = [await router.session_factory() for _ in range(4)]
+    assert picks == ["r0", "r1", "r0", "r1"]
+
+
+@pytest.mark.asyncio
+async def test_lagging_or_unreachable_replicas_fall_back_to_primary():
+    lagging, down = FakeReplica("r0", lag=30.0), FakeReplica("r1", fail=True)
+    router = ReplicaRouter([lagging, down], primary="primary", max_lag=5, check_interval=60)
+    assert await router.session_factory() == "primary"
+
+    lagging.lag_value = 0.5
+    await router.check(lagging)
+    assert await router.session_factory() == "r0"
+
+    lagging.mark_down()  # e.g. a disconnect seen on one of its connections
+    assert await router.session_factory() == "primary"
+
+
+@pytest.mark.asyncio
+async def test_stale_lag_is_rechecked_in_the_background():
+    replica = FakeReplica("r0")
+    router = ReplicaRouter([replica], primary="primary", check_interval=0)
+    await router.session_factory()
+    assert replica.checks == 1
+
+    replica.lag_value = 30.0
+    assert await router.session_factory() == "r0"  # served from the last known state
+    assert replica._checking is not None
+    await router.check(replica)  # joins the check already in flight
+    assert replica.checks == 2
+    assert await router.pick() is None
@@ -0,0 +1,39 @@
+import pytest
+from app.documents import service
+from app.documents.schemas import SearchRequest
+from app.documents.service import DocumentService
+
+
+@pytest.mark.asyncio
+async def test_fallback_results_carry_no_cursor(monkeypatch):
+    class Session:
+        async def rollback(self):
+            pass
+
+    async def embedding(query):
+        return [0.0]
+
+    async def audit(*args, **kwargs):
+        pass
+
+    async def noop(*args, **kwargs):
+        pass
+
+    async def broken_vector_search(*args):
+        raise RuntimeError("index unavailable")
+
+    async def fallback(query, limit, filters, fields):
+        return [{"id": n, "score": 1.0 / (n + 1)} for n in range(limit)]
+
+    monkeypatch.setattr(service, "get_cached_embedding", embedding)
+    monkeypatch.setattr(service, "record_audit", audit)
+    monkeypatch.setattr(service, "apply_search_params", noop)
+    documents = DocumentService(Session())
+    monkeypatch.setattr(documents, "_checkout", noop)
+    monkeypatch.setattr(documents, "_vector_search", broken_vector_search)
+    monkeypatch.setattr(documents, "_fallback_text_search", fallback)
+
+    response, outcome = await documents._search(SearchRequest(query="aspirin", top_k=2))
+    assert outcome == "fallback"
+    assert [r.id for r in response.results] == [0, 1]
+    assert response.next_cursor is None
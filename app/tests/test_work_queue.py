@@ -0,0 +1,27 @@
+import pytest
+from app.utils import work_queue
+
+
+@pytest.mark.asyncio
+async def test_embed_claimed_isolates_failing_documents(monkeypatch):
+    calls = []
+
+    async def fake_embeddings(texts):
+        calls.append(list(texts))
+        if "bad" in texts:
+            raise ValueError("provider rejected input")
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(work_queue, "get_embeddings", fake_embeddings)
+    claimed = [(1, "good", 1), (2, "bad", 3), (3, "fine", 1)]
+    done, failed = await work_queue.embed_claimed(claimed)
+
+    assert calls[0] == ["good", "bad", "fine"]
+    assert done == [(1, [4.0]), (3, [4.0])]
+    assert failed == [((2, "bad", 3), "provider rejected input")]
+
+
+def test_retry_delay_backs_off_exponentially_up_to_cap(monkeypatch):
+    monkeypatch.setattr(work_queue, "EMBED_QUEUE_RETRY_BASE_SECONDS", 10.0)
+    monkeypatch.setattr(work_queue, "EMBED_QUEUE_RETRY_MAX_SECONDS", 60.0)
+    assert [work_queue.retry_delay(n) for n in (1, 2, 3, 4, 5)] == [10.0, 20.0, 40.0, 60.0, 60.0]
@@ -1,22 +1,367 @@
 import os
+import re
+import glob
 import hmac
+import fcntl
+import json
+import time
+import asyncio
 import hashlib
-from typing import Optional, Dict, Any
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.documents.models import AuditLog
-from app.db.initdb import AsyncSessionLocal
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import text
+from app.db.initdb import engine
+from app.db.partitions import ensure_audit_partitions
+from app.core.metrics import AUDIT_EVENTS
 from dotenv import load_dotenv
 
 load_dotenv()
 HMAC_KEY = os.getenv("HMAC_KEY", "replace_with_secure_key")
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+AUDIT_FLUSH_MAX_ROWS = int(os.getenv("AUDIT_FLUSH_MAX_ROWS", "500"))
+# When the queue is full: "drop" the new record at once, or "block" the caller
+# for up to AUDIT_BLOCK_TIMEOUT_MS (backpressure) before dropping it
+AUDIT_QUEUE_POLICY = os.getenv("AUDIT_QUEUE_POLICY", "drop").lower()
+AUDIT_BLOCK_TIMEOUT_MS = float(os.getenv("AUDIT_BLOCK_TIMEOUT_MS", "50"))
+# Append-only NDJSON file holding records that could not be written to the database
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "audit_spill.ndjson")
+AUDIT_SPILL_REPLAY_SECONDS = float(os.getenv("AUDIT_SPILL_REPLAY_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+# (hashed_user_id, action, metadata JSON, timestamp)
+AuditRecord = Tuple[str, str, str, datetime]
 
 def hash_user_id(user_id: str) -> str:
     if not user_id:
         return ""
     return hmac.new(HMAC_KEY.encode(), user_id.encode(), hashlib.sha256).hexdigest()
 
-async def record_audit(session: AsyncSession, user_id: Optional[str], action: str, metadata: Optional[Dict[str, Any]] = None):
+
+class AuditWriter:
+    """Buffered audit log writer that keeps database commits off the request path.
+
+    Records go into a bounded in-memory queue. A background task flushes them
+    as one multi-row INSERT every ``flush_interval_ms`` or as soon as
+    ``flush_max_rows`` are queued, on its own pooled connection. When the
+    database is unavailable, batches are appended to a local spill file that
+    is replayed once writes succeed again. Each process spills to its own
+    file (``audit_spill.<pid>.ndjson``); replay takes a file lock so only one
+    process at a time replays, and it also picks up files left by processes
+    that have exited.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        flush_interval_ms: float = AUDIT_FLUSH_INTERVAL_MS,
+        flush_max_rows: int = AUDIT_FLUSH_MAX_ROWS,
+        policy: str = AUDIT_QUEUE_POLICY,
+        spill_path: str = AUDIT_SPILL_PATH,
+    ):
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_max_rows = max(1, flush_max_rows)
+        self.policy = policy
+        self.spill_path = spill_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_replay = 0.0
+        # Batch taken off the queue but not yet written, flushed by stop() if cancelled
+        self._inflight: List[AuditRecord] = []
+
+    def start(self):
+        """Start the flush task on the running loop (also done lazily on first record)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        # Records left by a previous task (finished, or on a loop that went
+        # away) carry over to the new queue instead of being discarded
+        carried = self._inflight + (self._drain(self.queue_size) if self._queue is not None else [])
+        self._inflight = []
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._full = asyncio.Event()
+        for rec in carried[:self.queue_size]:
+            self._queue.put_nowait(rec)
+        if len(carried) > self.queue_size:
+            AUDIT_EVENTS.labels(outcome="dropped").inc(len(carried) - self.queue_size)
+            logger.warning(f"Audit queue full on restart, dropping {len(carried) - self.queue_size} records")
+        if self._queue.qsize() >= self.flush_max_rows:
+            self._full.set()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued (spilling if the database is down) and stop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        batch, self._inflight = self._inflight, []
+        while True:
+            batch.extend(self._drain(self.flush_max_rows - len(batch)))
+            if not batch:
+                break
+            await self._flush(batch)
+            batch = []
+
+    async def record(self, records: List[AuditRecord]):
+        self.start()
+        for rec in records:
+            try:
+                self._queue.put_nowait(rec)
+            except asyncio.QueueFull:
+                if self.policy != "block" or not await self._put_blocking(rec):
+                    AUDIT_EVENTS.labels(outcome="dropped").inc()
+                    logger.warning("Audit queue full, dropping record")
+                    continue
+            if self._queue.qsize() >= self.flush_max_rows:
+                self._full.set()
+
+    async def _put_blocking(self, rec: AuditRecord) -> bool:
+        try:
+            await asyncio.wait_for(self._queue.put(rec), AUDIT_BLOCK_TIMEOUT_MS / 1000.0)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _drain(self, limit: int) -> List[AuditRecord]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        try:
+            await self._replay_spill()
+        except Exception as e:
+            logger.error(f"Audit spill replay failed: {str(e)}")
+        while True:
+            # One failed iteration must not kill the writer: record() would
+            # then only fill the queue until every record is dropped
+            try:
+                await self._flush_next()
+            except Exception as e:
+                logger.error(f"Audit writer iteration failed: {str(e)}")
+                self._inflight = []
+
+    async def _flush_next(self):
+        self._inflight = [await self._queue.get()]
+        try:
+            await asyncio.wait_for(self._full.wait(), self.flush_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._full.clear()
+        self._inflight.extend(self._drain(self.flush_max_rows - 1))
+        await self._flush(self._inflight)
+        self._inflight = []
+
+    async def _flush(self, batch: List[AuditRecord]):
+        try:
+            await _insert_records(batch)
+            AUDIT_EVENTS.labels(outcome="written").inc(len(batch))
+        except Exception as e:
+            logger.error(f"Audit flush of {len(batch)} records failed, spilling to {self.spill_path}: {str(e)}")
+            if "no partition of relation" in str(e) and await _create_audit_partitions():
+                # Partition maintenance has not run (e.g. no Celery beat); the
+                # next successful flush replays this batch straight away
+                self._last_replay = float("-inf")
+            try:
+                await asyncio.to_thread(self._append_spill, batch)
+            except OSError as spill_error:
+                # Neither the database nor the disk took the batch (e.g. disk full)
+                AUDIT_EVENTS.labels(outcome="dropped").inc(len(batch))
+                logger.error(f"Audit spill failed, dropping {len(batch)} records: {str(spill_error)}")
+                return
+            AUDIT_EVENTS.labels(outcome="spilled").inc(len(batch))
+            return
+        if time.monotonic() - self._last_replay >= AUDIT_SPILL_REPLAY_SECONDS:
+            await self._replay_spill()
+
+    def _process_spill_path(self, pid: Optional[int] = None) -> str:
+        # Looked up on every call: gunicorn forks workers after import
+        root, ext = os.path.splitext(self.spill_path)
+        return f"{root}.{os.getpid() if pid is None else pid}{ext}"
+
+    def _append_spill(self, batch: List[AuditRecord]):
+        with open(self._process_spill_path(), "a", encoding="utf-8") as f:
+            for hashed, action, metadata, ts in batch:
+                f.write(json.dumps([hashed, action, metadata, ts.isoformat()]) + "\n")
+
+    def _has_spill_files(self) -> bool:
+        # Spill and .replay files only: the lock file outlives every replay
+        root, ext = os.path.splitext(self.spill_path)
+        return (
+            os.path.exists(self.spill_path)
+            or os.path.exists(self.spill_path + ".replay")
+            or bool(glob.glob(glob.escape(root) + ".*" + ext))
+            or bool(glob.glob(glob.escape(root) + ".*" + ext + ".replay"))
+        )
+
+    def _lock_replay(self) -> Optional[int]:
+        """Take the replay lock without waiting; None if another process holds it."""
+        fd = os.open(self.spill_path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _claim_spill_files(self) -> List[str]:
+        """Rename replayable spill files to ``.replay`` (caller holds the replay lock).
+
+        Claims this process's file, files of processes that no longer exist
+        and ``.replay`` files a crashed replay left behind. Files of live
+        processes are left to their owner, which may be appending to them.
+        """
+        root, ext = os.path.splitext(self.spill_path)
+        pattern = re.compile(re.escape(root) + r"\.(\d+)" + re.escape(ext) + "$")
+        claimed = glob.glob(glob.escape(root) + ".*" + ext + ".replay")
+        if os.path.exists(self.spill_path + ".replay"):
+            claimed.append(self.spill_path + ".replay")
+        candidates = [self.spill_path]  # written before spill files were per process
+        for path in glob.glob(glob.escape(root) + ".*" + ext):
+            match = pattern.match(path)
+            if match and (int(match.group(1)) == os.getpid() or not _pid_alive(int(match.group(1)))):
+                candidates.append(path)
+        for path in candidates:
+            try:
+                os.rename(path, path + ".replay")
+            except FileNotFoundError:
+                continue
+            claimed.append(path + ".replay")
+        return claimed
+
+    async def _replay_spill(self):
+        """Write spilled records back to the database, keeping whatever still fails."""
+        self._last_replay = time.monotonic()
+        if not await asyncio.to_thread(self._has_spill_files):
+            return
+        lock_fd = await asyncio.to_thread(self._lock_replay)
+        if lock_fd is None:
+            return
+        written = 0
+        try:
+            # New spills go to a fresh file while the claimed ones are replayed
+            for replay_path in await asyncio.to_thread(self._claim_spill_files):
+                written += await self._replay_file(replay_path)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+        if written:
+            AUDIT_EVENTS.labels(outcome="replayed").inc(written)
+            logger.info(f"Replayed {written} spilled audit records")
+
+    async def _replay_file(self, replay_path: str) -> int:
+        records = await asyncio.to_thread(_read_spill, replay_path)
+        written = 0
+        try:
+            for i in range(0, len(records), self.flush_max_rows):
+                await _insert_records(records[i:i + self.flush_max_rows])
+                written = i + len(records[i:i + self.flush_max_rows])
+        except Exception as e:
+            logger.error(f"Audit spill replay stopped after {written} records: {str(e)}")
+            try:
+                await asyncio.to_thread(self._append_spill, records[written:])
+            except OSError as spill_error:
+                # Keep the whole file for the next replay: re-inserting the
+                # records already written beats losing the rest
+                logger.error(f"Audit spill re-append failed, keeping {replay_path}: {str(spill_error)}")
+                return written
+        await asyncio.to_thread(os.remove, replay_path)
+        return written
+
+
+async def _create_audit_partitions() -> bool:
+    try:
+        async with engine.begin() as conn:
+            created = await ensure_audit_partitions(conn)
+    except Exception as e:
+        logger.error(f"Creating missing audit partitions failed: {str(e)}")
+        return False
+    logger.warning(f"Created missing audit partitions: {created}")
+    return True
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+def _read_spill(path: str) -> List[AuditRecord]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                hashed, action, metadata, ts = json.loads(line)
+                records.append((hashed, action, metadata, datetime.fromisoformat(ts)))
+            except (ValueError, TypeError):
+                # A torn last line from a crash mid-write
+                logger.warning("Skipping unreadable audit spill line")
+    return records
+
+async def _insert_records(batch: List[AuditRecord]):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("""
+                INSERT INTO audit_logs (hashed_user_id, action, metadata, timestamp)
+                SELECT * FROM unnest(
+                    CAST(:users AS text[]), CAST(:actions AS text[]),
+                    CAST(:metadata AS jsonb[]), CAST(:timestamps AS timestamptz[])
+                )
+            """),
+            {
+                "users": [r[0] for r in batch],
+                "actions": [r[1] for r in batch],
+                "metadata": [r[2] for r in batch],
+                "timestamps": [r[3] for r in batch],
+            }
+        )
+
+
+audit_writer = AuditWriter()
+
+def _audit_record(hashed: str, action: str, metadata: Optional[Dict[str, Any]]) -> AuditRecord:
+    return hashed, action, json.dumps(metadata or {}), datetime.now(timezone.utc)
+
+async def record_audit(user_id: Optional[str], action: str, metadata: Optional[Dict[str, Any]] = None):
+    """Queue one audit record; it is written asynchronously by the audit writer."""
+    hashed = hash_user_id(user_id) if user_id else ""
+    await audit_writer.record([_audit_record(hashed, action, metadata)])
+
+
+async def record_audit_batch(user_id: Optional[str], action: str, metadata_list: List[Optional[Dict[str, Any]]]):
+    """Queue several audit records for one user."""
     hashed = hash_user_id(user_id) if user_id else ""
-    log = AuditLog(hashed_user_id=hashed, action=action, metadata=metadata or {})
-    session.add(log)
-    await session.commit()
+    await audit_writer.record([_audit_record(hashed, action, metadata) for metadata in metadata_list])
+
+async def find_audit_logs(conn, user_id: str, since: datetime, until: datetime, limit: int = 100) -> List[Dict[str, Any]]:
+    """Audit records for one user in ``[since, until)``, newest first.
+
+    The time bounds let Postgres prune audit_logs partitions outside the
+    window, so only the matching partitions' (hashed_user_id, timestamp)
+    indexes are scanned.
+    """
+    result = await conn.execute(
+        text("""
+            SELECT id, action, metadata, timestamp
+            FROM audit_logs
+            WHERE hashed_user_id = :hashed AND timestamp >= :since AND timestamp < :until
+            ORDER BY timestamp DESC
+            LIMIT :limit
+        """),
+        {"hashed": hash_user_id(user_id), "since": since, "until": until, "limit": limit}
+    )
+    return [dict(row._mapping) for row in result.fetchall()]
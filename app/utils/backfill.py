@@ -1,59 +1,176 @@
 import os
-from typing import Optional, List, Tuple
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, List, Tuple
 from sqlalchemy import text
+from dotenv import load_dotenv
 from app.db.initdb import engine
-from app.utils.embeddings import get_embedding
-from sqlalchemy.ext.asyncio import AsyncConnection
-import logging
+from app.utils.work_queue import EMBED_QUEUE_BATCH_SIZE, claim_batch, embed_and_store
+
+load_dotenv()
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", str(EMBED_QUEUE_BATCH_SIZE)))
+# Batches being embedded at the same time
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "4"))
+BACKFILL_CHECKPOINT = "embeddings"
 
 logger = logging.getLogger(__name__)
 
+
+class BackfillEngine:
+    """Resumable embedding backfill over pending documents.
+
+    Ids are walked with a keyset cursor (``id > last claimed id``), so a
+    document that keeps failing is never re-selected by the same run. Each
+    batch is claimed through the embedding work queue, embedded with up to
+    ``concurrency`` batches in flight and written with a single set-based
+    UPDATE in its own short transaction. Batches are retired in id order and
+    the checkpoint only advances past fully processed batches, so ``resume``
+    continues exactly where a previous run stopped.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        concurrency: int = BACKFILL_CONCURRENCY,
+        limit: Optional[int] = None,
+        checkpoint: str = BACKFILL_CHECKPOINT,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.limit = limit
+        self.checkpoint = checkpoint
+        self.on_progress = on_progress
+        self.total = 0
+        self.succeeded = 0
+        self.failed_ids: List[int] = []
+        self.last_id = 0
+        self._started = 0.0
+        self._stopping = False
+
+    def stop(self):
+        """Stop claiming new batches; in-flight batches finish and are checkpointed."""
+        self._stopping = True
+
+    async def run(self, resume: bool = False) -> Tuple[int, List[int]]:
+        """Process pending documents; returns (success_count, failed_ids)."""
+        self.last_id = await self._load_checkpoint() if resume else 0
+        if not resume:
+            await self._save_checkpoint()
+        self.total = await self._count_pending()
+        if self.limit:
+            self.total = min(self.total, self.limit)
+        logger.info(f"Backfill starting after id={self.last_id}: ~{self.total} pending documents")
+
+        self._started = time.perf_counter()
+        cursor = self.last_id
+        claimed_count = 0
+        inflight: Deque[Tuple[int, int, asyncio.Task]] = deque()
+        try:
+            while not self._stopping and (not self.limit or claimed_count < self.limit):
+                size = self.batch_size if not self.limit else min(self.batch_size, self.limit - claimed_count)
+                async with engine.begin() as conn:
+                    claimed = await claim_batch(conn, size, after_id=cursor)
+                if not claimed:
+                    break
+                cursor = claimed[-1][0]
+                claimed_count += len(claimed)
+                inflight.append((cursor, len(claimed), asyncio.create_task(embed_and_store(claimed))))
+                while len(inflight) >= self.concurrency:
+                    await self._retire(*inflight.popleft())
+            while inflight:
+                await self._retire(*inflight.popleft())
+        finally:
+            for _, _, task in inflight:
+                task.cancel()
+
+        logger.info(f"Backfill finished: {self.succeeded} succeeded, {len(self.failed_ids)} failed")
+        return self.succeeded, self.failed_ids
+
+    def progress(self) -> Dict[str, Any]:
+        """Processed/total counts, throughput and estimated time remaining."""
+        processed = self.succeeded + len(self.failed_ids)
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total - processed)
+        return {
+            "processed": processed,
+            "succeeded": self.succeeded,
+            "failed": len(self.failed_ids),
+            "total": self.total,
+            "last_id": self.last_id,
+            "docs_per_second": round(rate, 1),
+            "eta_seconds": round(remaining / rate, 1) if rate > 0 else None,
+        }
+
+    async def _retire(self, last_id: int, count: int, task: asyncio.Task):
+        failed = await task
+        self.succeeded += count - len(failed)
+        self.failed_ids.extend(failed)
+        self.last_id = last_id
+        await self._save_checkpoint()
+
+        progress = self.progress()
+        logger.info(
+            f"Backfill {progress['processed']}/{progress['total']} documents, "
+            f"{progress['docs_per_second']} docs/s, ETA {progress['eta_seconds']}s (last id {last_id})"
+        )
+        if self.on_progress is not None:
+            self.on_progress(progress)
+
+    async def _count_pending(self) -> int:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT count(*) FROM documents WHERE embedding_status = 'pending' AND id > :after_id"),
+                {"after_id": self.last_id}
+            )
+            return result.scalar() or 0
+
+    async def _load_checkpoint(self) -> int:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT last_id FROM backfill_checkpoints WHERE name = :name"),
+                {"name": self.checkpoint}
+            )
+            return result.scalar() or 0
+
+    async def _save_checkpoint(self):
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("""
+                    INSERT INTO backfill_checkpoints (name, last_id, processed, failed, updated_at)
+                    VALUES (:name, :last_id, :processed, :failed, now())
+                    ON CONFLICT (name) DO UPDATE
+                    SET last_id = EXCLUDED.last_id, processed = EXCLUDED.processed,
+                        failed = EXCLUDED.failed, updated_at = now()
+                """),
+                {
+                    "name": self.checkpoint,
+                    "last_id": self.last_id,
+                    "processed": self.succeeded + len(self.failed_ids),
+                    "failed": len(self.failed_ids),
+                }
+            )
+
+
 async def update_document_embeddings(
-    conn: AsyncConnection,
-    batch_size: int = 10,
-    limit: Optional[int] = None
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    limit: Optional[int] = None,
+    concurrency: int = BACKFILL_CONCURRENCY,
+    resume: bool = False,
 ) -> Tuple[int, List[int]]:
-    """Update embeddings for documents where they are NULL.
+    """Update embeddings for documents that are still pending.
     
     Args:
-        conn: SQLAlchemy async connection
         batch_size: How many documents to process per batch
         limit: Optional maximum number of documents to process
+        concurrency: Batches embedded at the same time
+        resume: Continue after the last checkpoint instead of from the lowest id
     
     Returns:
         Tuple of (success_count, failed_ids)
     """
-    success_count = 0
-    failed_ids = []
-    
-    # Select ids and content for documents missing embeddings
-    sel_sql = "SELECT id, content FROM documents WHERE embedding IS NULL LIMIT :limit"
-    while True:
-        params = {"limit": limit or batch_size}
-        result = await conn.execute(text(sel_sql), params)
-        rows = result.fetchall()
-        if not rows:
-            logger.info("No more documents with null embeddings.")
-            break
-            
-        for row in rows:
-            doc_id = row[0]
-            content = row[1]
-            try:
-                emb = await get_embedding(content)
-                if isinstance(emb, (list, tuple)):
-                    emb_str = '[' + ','.join(str(float(x)) for x in emb) + ']'
-                else:
-                    emb_str = str(emb)
-                upd_sql = text("UPDATE documents SET embedding = :emb::vector WHERE id = :id")
-                await conn.execute(upd_sql, {"emb": emb_str, "id": doc_id})
-                success_count += 1
-                logger.info(f"Updated embedding for doc id={doc_id}")
-            except Exception as e:
-                logger.error(f"Failed to compute/update embedding for id={doc_id}: {e}")
-                failed_ids.append(doc_id)
-                
-        if limit and (success_count + len(failed_ids)) >= limit:
-            break
-            
-    return success_count, failed_ids
\ No newline at end of file
+    backfill = BackfillEngine(batch_size=batch_size, concurrency=concurrency, limit=limit)
+    return await backfill.run(resume=resume)
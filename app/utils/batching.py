@@ -0,0 +1,110 @@
+import asyncio
+import time
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+from app.core.metrics import EMBEDDING_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+BatchFetch = Callable[[Sequence[str]], Awaitable[List[List[float]]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for batch caps."""
+    return max(1, len(text) // 4)
+
+
+class EmbeddingCoalescer:
+    """Coalesce concurrent single-text embedding requests into batched calls.
+
+    Callers are queued until either ``max_wait_ms`` elapses, ``max_batch_size``
+    texts are pending or the estimated token count would exceed ``max_tokens``.
+    The pending batch is then sent through ``fetch`` as one request and the
+    resulting vectors are fanned back out to each waiting caller.
+    """
+
+    def __init__(
+        self,
+        fetch: BatchFetch,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_tokens: int = 100_000,
+    ):
+        self.fetch = fetch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_tokens = max(1, max_tokens)
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: set = set()
+
+    async def submit(self, text: str) -> List[float]:
+        """Queue ``text`` for the next batch and wait for its embedding."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (e.g. Celery's asyncio.run per task) cannot
+            # reuse futures or timers created on a previous one.
+            self._reset(loop)
+
+        tokens = estimate_tokens(text)
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush()
+
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_batch_size or self.max_wait == 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _reset(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._pending = []
+        self._pending_tokens = 0
+        self._timer = None
+        self._inflight = set()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending
+        self._pending = []
+        self._pending_tokens = 0
+        if not batch:
+            return
+        task = self._loop.create_task(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            EMBEDDING_QUEUE_WAIT.observe(now - enqueued_at)
+
+        # Identical texts within a window are only sent once.
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+
+        try:
+            vectors = await self.fetch(unique_texts)
+            if len(vectors) != len(unique_texts):
+                raise ValueError(
+                    f"Provider returned {len(vectors)} embeddings for {len(unique_texts)} inputs"
+                )
+        except Exception as e:
+            logger.error("Batched embedding request failed for %d texts: %s", len(unique_texts), e)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
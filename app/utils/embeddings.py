@@ -1,57 +1,104 @@
 import os
-import hashlib
-import random
+import time
+import asyncio
 import logging
 from typing import List, Sequence
 from dotenv import load_dotenv
+from app.core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_COMPUTATION
+from app.utils.batching import EmbeddingCoalescer
+from app.utils.provider import get_provider_client
+from app.utils.local_embeddings import LocalEmbeddingEngine
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1536"))
+# "openai" (any OpenAI-compatible API) or "local" (offline feature hashing)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai" if OPENAI_API_KEY else "local").lower()
+# Vector space produced by this configuration; the local engine reuses
+# EMBEDDING_MODEL as its name, so the provider must be part of it
+EMBEDDING_IDENTITY = f"{EMBEDDING_PROVIDER}:{EMBEDDING_MODEL}:{EMBEDDING_DIM}"
+# Local batches larger than this are embedded in a worker thread to keep the event loop free
+LOCAL_EMBEDDING_INLINE_MAX = int(os.getenv("LOCAL_EMBEDDING_INLINE_MAX", "16"))
 
+# Coalescing of concurrent get_embedding() callers into one provider request
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
 
-def _fallback_embedding(text: str, dim=EMBEDDING_DIM) -> List[float]:
-    h = hashlib.sha256(text.encode()).digest()
-    rnd = random.Random(int.from_bytes(h[:8], "big"))
-    return [rnd.random() for _ in range(dim)]
 
-async def get_embedding(text: str) -> List[float]:
-    """Get embeddings for text, with fallback to deterministic random vectors."""
-    if not text:
-        raise ValueError("Cannot generate embedding for empty text")
+_local_engine = LocalEmbeddingEngine(EMBEDDING_DIM)
 
-    if OPENAI_API_KEY:
-        try:
-            import httpx
-            headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
-            url = f"https://api.openai.com/v1/embeddings"
-            payload = {"model": EMBEDDING_MODEL, "input": text}
-            
-            logging.info(f"Requesting embedding using model {EMBEDDING_MODEL}")
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                r = await client.post(url, json=payload, headers=headers)
-                r.raise_for_status()
-                data = r.json()
-                emb = data["data"][0]["embedding"]
-                
-                if len(emb) != EMBEDDING_DIM:
-                    raise ValueError(f"Received embedding dimension {len(emb)} does not match expected {EMBEDDING_DIM}")
-                
-                logging.info("Successfully generated embedding using OpenAI API")
-                return emb
-        except httpx.HTTPError as e:
-            logging.error(f"HTTP error during embedding request: {str(e)}")
-            raise
-        except Exception as e:
-            logging.error(f"Error generating embedding: {str(e)}")
-            raise
-    else:
-        logging.warning("OPENAI_API_KEY not set: using fallback embeddings (dev only)")
+def _local_embeddings(texts: Sequence[str]) -> List[List[float]]:
+    return _local_engine.embed(texts).tolist()
+
+def to_pgvector(embedding: Sequence[float]) -> str:
+    """Format an embedding as a pgvector text literal, e.g. ``[0.1,0.2]``."""
+    return '[' + ','.join(str(float(x)) for x in embedding) + ']'
+
+async def _request_embeddings(texts: Sequence[str]) -> List[List[float]]:
+    """Send one embeddings request for ``texts`` and return vectors in input order."""
+    EMBEDDING_BATCH_SIZE.observe(len(texts))
+    start = time.perf_counter()
+    try:
+        return await _compute_embeddings(texts)
+    finally:
+        EMBEDDING_COMPUTATION.observe(time.perf_counter() - start)
+
+async def _compute_embeddings(texts: Sequence[str]) -> List[List[float]]:
+    if EMBEDDING_PROVIDER == "local":
         try:
-            emb = _fallback_embedding(text)
-            logging.info("Generated fallback embedding")
-            return emb
+            if len(texts) > LOCAL_EMBEDDING_INLINE_MAX:
+                return await asyncio.to_thread(_local_embeddings, texts)
+            return _local_embeddings(texts)
         except Exception as e:
-            logging.error(f"Error generating fallback embedding: {str(e)}")
+            logging.error(f"Error generating local embedding: {str(e)}")
             raise
+
+    try:
+        logging.debug("Requesting %d embeddings using model %s", len(texts), EMBEDDING_MODEL)
+        embeddings = await get_provider_client().embed(texts, EMBEDDING_MODEL)
+        for emb in embeddings:
+            if len(emb) != EMBEDDING_DIM:
+                raise ValueError(f"Received embedding dimension {len(emb)} does not match expected {EMBEDDING_DIM}")
+        return embeddings
+    except Exception as e:
+        logging.error(f"Error generating embedding: {str(e)}")
+        raise
+
+_coalescer = EmbeddingCoalescer(
+    _request_embeddings,
+    max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+    max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS,
+    max_tokens=EMBEDDING_BATCH_MAX_TOKENS,
+)
+
+async def get_embeddings(texts: Sequence[str]) -> List[List[float]]:
+    """Get embeddings for many texts, sending them in provider-sized batches.
+
+    Args:
+        texts: Non-empty texts to embed
+
+    Returns:
+        One embedding per input text, in input order
+    """
+    if any(not text for text in texts):
+        raise ValueError("Cannot generate embedding for empty text")
+    if not texts:
+        return []
+
+    chunks = [
+        texts[i:i + EMBEDDING_BATCH_MAX_SIZE]
+        for i in range(0, len(texts), EMBEDDING_BATCH_MAX_SIZE)
+    ]
+    results = await asyncio.gather(*(_request_embeddings(chunk) for chunk in chunks))
+    return [emb for chunk in results for emb in chunk]
+
+async def get_embedding(text: str) -> List[float]:
+    """Get embeddings for text from the configured provider (remote API or local engine).
+
+    Concurrent callers are coalesced into a single batched provider request.
+    """
+    if not text:
+        raise ValueError("Cannot generate embedding for empty text")
+    return await _coalescer.submit(text)
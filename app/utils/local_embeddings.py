@@ -0,0 +1,104 @@
+import re
+import zlib
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Relative weight of each feature family in the hashed vector
+UNIGRAM_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.5
+CHAR_NGRAM_WEIGHT = 0.25
+
+_BIGRAM_MULTIPLIER = np.uint64(1000003)
+_HASH_MASK = np.uint64(0xFFFFFFFF)
+
+
+class LocalEmbeddingEngine:
+    """Deterministic feature-hashing embedder for offline and air-gapped use.
+
+    Each text is tokenized into lowercase word unigrams, word bigrams and
+    character n-grams of every word. Features are hashed into ``dim`` buckets
+    with a hashed sign, accumulated for the whole batch with a single
+    ``np.bincount`` and L2-normalized. Texts sharing words or word pieces get
+    similar vectors, so search quality and load can be measured without a
+    remote provider.
+    """
+
+    def __init__(self, dim: int, char_ngram: int = 3, token_cache_size: int = 200_000):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self.token_cache_size = token_cache_size
+        self._token_cache: Dict[str, Tuple[int, np.ndarray]] = {}
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` into a ``(len(texts), dim)`` float32 matrix."""
+        n = len(texts)
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        hashes: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        rows: List[int] = []
+        for row, text in enumerate(texts):
+            row_hashes, row_weights = self._features(text)
+            hashes.append(row_hashes)
+            weights.append(row_weights)
+            rows.append(len(row_hashes))
+
+        all_hashes = np.concatenate(hashes)
+        all_weights = np.concatenate(weights)
+        row_index = np.repeat(np.arange(n, dtype=np.int64), rows)
+
+        buckets = (all_hashes % np.uint64(self.dim)).astype(np.int64)
+        # Bit 31 of the hash decides the sign, so collisions tend to cancel out
+        signs = np.where((all_hashes >> np.uint64(31)) & np.uint64(1), -1.0, 1.0)
+        flat = np.bincount(
+            row_index * self.dim + buckets,
+            weights=all_weights * signs,
+            minlength=n * self.dim,
+        )
+        matrix = flat.reshape(n, self.dim).astype(np.float32)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        tokens = TOKEN_RE.findall(text.lower())
+        if not tokens:
+            # Texts without word characters still get a stable non-zero vector
+            tokens = [text]
+
+        entries = [self._token_features(token) for token in tokens]
+        token_hashes = np.fromiter((h for h, _ in entries), dtype=np.uint64, count=len(entries))
+        char_hashes = np.concatenate([grams for _, grams in entries])
+
+        parts = [token_hashes, char_hashes]
+        part_weights = [
+            np.full(len(token_hashes), UNIGRAM_WEIGHT),
+            np.full(len(char_hashes), CHAR_NGRAM_WEIGHT),
+        ]
+        if len(token_hashes) > 1:
+            bigrams = ((token_hashes[:-1] * _BIGRAM_MULTIPLIER) ^ token_hashes[1:]) & _HASH_MASK
+            parts.append(bigrams)
+            part_weights.append(np.full(len(bigrams), BIGRAM_WEIGHT))
+
+        return np.concatenate(parts), np.concatenate(part_weights)
+
+    def _token_features(self, token: str) -> Tuple[int, np.ndarray]:
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        padded = f"<{token}>"
+        n = self.char_ngram
+        grams = [padded[i:i + n] for i in range(max(1, len(padded) - n + 1))]
+        entry = (
+            zlib.crc32(token.encode()),
+            np.array([zlib.crc32(g.encode(), 0x9E3779B9) for g in grams], dtype=np.uint64),
+        )
+        if len(self._token_cache) >= self.token_cache_size:
+            self._token_cache.clear()
+        self._token_cache[token] = entry
+        return entry
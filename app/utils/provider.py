@@ -0,0 +1,330 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from app.core.metrics import EMBEDDING_RETRIES
+from app.utils.batching import estimate_tokens
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+EMBEDDING_API_BASE = os.getenv("EMBEDDING_API_BASE", "https://api.openai.com/v1")
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "30"))
+EMBEDDING_MAX_CONNECTIONS = int(os.getenv("EMBEDDING_MAX_CONNECTIONS", "20"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "4"))
+EMBEDDING_BACKOFF_BASE = float(os.getenv("EMBEDDING_BACKOFF_BASE", "0.5"))
+EMBEDDING_BACKOFF_MAX = float(os.getenv("EMBEDDING_BACKOFF_MAX", "20"))
+EMBEDDING_BREAKER_THRESHOLD = int(os.getenv("EMBEDDING_BREAKER_THRESHOLD", "5"))
+EMBEDDING_BREAKER_RESET_SECONDS = float(os.getenv("EMBEDDING_BREAKER_RESET_SECONDS", "30"))
+EMBEDDING_HEDGE_PERCENTILE = float(os.getenv("EMBEDDING_HEDGE_PERCENTILE", "95"))  # 0 disables
+EMBEDDING_HEDGE_MIN_SAMPLES = int(os.getenv("EMBEDDING_HEDGE_MIN_SAMPLES", "20"))
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when the provider circuit breaker rejects a request."""
+
+
+class RetryableProviderError(RuntimeError):
+    """A provider failure worth retrying (throttling, 5xx or network error)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, reason: str = "error"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        # HTTP status or "transport", used as the retry metric label
+        self.reason = reason
+
+
+class TokenRateLimiter:
+    """Token bucket enforcing a client-side tokens-per-minute budget."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        if self.capacity <= 0:
+            return
+        # Requests larger than the whole bucket wait for a full bucket
+        tokens = min(float(tokens), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial request."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError("Embedding provider circuit is open")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let another request make the half-open trial (e.g. this one was cancelled)."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            logger.warning("Embedding provider circuit opened after %d failures", self.failures)
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies."""
+
+    def __init__(self, size: int = 500):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100.0))
+        return ordered[index]
+
+
+class EmbeddingProviderClient:
+    """Long-lived client for an OpenAI-compatible embeddings API.
+
+    Keeps a keep-alive connection pool, limits concurrency and tokens per
+    minute, retries throttled/failed requests with jittered backoff, trips a
+    circuit breaker when the provider keeps failing and hedges slow requests
+    with a duplicate once they exceed the configured latency percentile.
+    """
+
+    def __init__(
+        self,
+        base_url: str = EMBEDDING_API_BASE,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        timeout: float = EMBEDDING_TIMEOUT,
+        max_connections: int = EMBEDDING_MAX_CONNECTIONS,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        tokens_per_minute: int = EMBEDDING_TOKENS_PER_MINUTE,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        backoff_base: float = EMBEDDING_BACKOFF_BASE,
+        backoff_max: float = EMBEDDING_BACKOFF_MAX,
+        breaker_threshold: int = EMBEDDING_BREAKER_THRESHOLD,
+        breaker_reset_seconds: float = EMBEDDING_BREAKER_RESET_SECONDS,
+        hedge_percentile: float = EMBEDDING_HEDGE_PERCENTILE,
+        hedge_min_samples: int = EMBEDDING_HEDGE_MIN_SAMPLES,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.transport = transport
+        self.rate_limiter = TokenRateLimiter(tokens_per_minute)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self.latency = LatencyTracker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    async def start(self):
+        if self._client is not None:
+            return
+        # Imported on first use so processes that never call the provider skip it
+        import httpx
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60.0,
+            ),
+            transport=self.transport,
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def ping(self):
+        """Cheap reachability/auth check (GET /models): no embedding is computed or billed."""
+        if self._client is None:
+            await self.start()
+        response = await self._client.get("/models")
+        response.raise_for_status()
+
+    async def embed(self, texts: Sequence[str], model: str) -> List[List[float]]:
+        """Embed ``texts`` with ``model``, returning vectors in input order."""
+        if self._client is None:
+            await self.start()
+
+        payload = {"model": model, "input": list(texts)}
+        await self.rate_limiter.acquire(sum(estimate_tokens(t) for t in texts))
+
+        attempt = 0
+        while True:
+            self.breaker.check()
+            try:
+                data = await self._hedged_post(payload)
+            except RetryableProviderError as e:
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e.retry_after)
+                attempt += 1
+                EMBEDDING_RETRIES.labels(reason=e.reason).inc()
+                logger.warning("Embedding request failed (%s); retry %d in %.2fs", e, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                # Non-retryable (e.g. 400/401): a half-open trial still failed
+                self.breaker.record_failure()
+                raise
+            finally:
+                # Cancellation (a losing hedge, a client disconnect) gives no verdict;
+                # without this a half-open breaker would never admit another trial
+                self.breaker.release_trial()
+
+            self.breaker.record_success()
+            items = sorted(data["data"], key=lambda item: item["index"])
+            return [item["embedding"] for item in items]
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: spreads retries from many callers over the window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile <= 0 or len(self.latency.samples) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _hedged_post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        primary = asyncio.ensure_future(self._post(payload))
+        tasks = {primary}
+        try:
+            delay = self._hedge_delay()
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                logger.debug("Embedding request exceeded p%.0f (%.3fs); sending hedge", self.hedge_percentile, delay)
+                tasks.add(asyncio.ensure_future(self._post(payload)))
+
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import httpx
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = await self._client.post("/embeddings", json=payload)
+            except httpx.TransportError as e:
+                raise RetryableProviderError(f"transport error: {e!r}", reason="transport") from e
+
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableProviderError(
+                f"provider returned {response.status_code}",
+                retry_after=_parse_retry_after(response.headers.get("Retry-After")),
+                reason=str(response.status_code),
+            )
+        response.raise_for_status()
+        self.latency.record(time.perf_counter() - start)
+        return response.json()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+_client: Optional[EmbeddingProviderClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_provider_client() -> EmbeddingProviderClient:
+    """Return the process-wide provider client for the running event loop.
+
+    Connection pools and asyncio primitives are bound to an event loop, so a
+    caller on a new loop (e.g. a Celery task using asyncio.run) gets a new client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = EmbeddingProviderClient()
+        _client_loop = loop
+    return _client
+
+async def stop_provider_client():
+    """Close the provider connection pool (called on application shutdown)."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.close()
+        _client = None
+        _client_loop = None
+        logger.info("Embedding provider client closed")
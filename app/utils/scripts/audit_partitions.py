@@ -0,0 +1,49 @@
+import logging
+import os
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from app.db.initdb import engine
+from app.db.partitions import AUDIT_RETENTION_DAYS, maintain_audit_partitions, migrate_audit_logs
+
+load_dotenv()
+
+async def run(migrate: bool, batch_size: int, keep_legacy: bool):
+    """Migrate audit_logs to the partitioned layout if asked, then run partition maintenance."""
+    try:
+        if migrate:
+            copied = await migrate_audit_logs(batch_size=batch_size, keep_legacy=keep_legacy)
+            logging.info(f"Copied {copied} audit rows into partitioned audit_logs")
+        result = await maintain_audit_partitions()
+    finally:
+        await engine.dispose()
+    logging.info(f"Created partitions: {result['created'] or 'none'}")
+    logging.info(f"Removed partitions older than {AUDIT_RETENTION_DAYS} days: {result['removed'] or 'none'}")
+
+def main():
+    """Entry point for the CLI script."""
+    parser = argparse.ArgumentParser(
+        description="Maintain the time-partitioned audit_logs table (suitable for cron)."
+    )
+    parser.add_argument(
+        '--migrate',
+        action='store_true',
+        help="Convert an existing unpartitioned audit_logs table first"
+    )
+    parser.add_argument(
+        '--batch-size', '-b',
+        type=int,
+        default=50_000,
+        help="Rows copied per transaction during --migrate"
+    )
+    parser.add_argument(
+        '--keep-legacy',
+        action='store_true',
+        help="Keep the old table as audit_logs_legacy after --migrate"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    asyncio.run(run(migrate=args.migrate, batch_size=args.batch_size, keep_legacy=args.keep_legacy))
+
+if __name__ == '__main__':
+    main()
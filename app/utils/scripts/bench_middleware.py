@@ -0,0 +1,165 @@
+import os
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from typing import Callable, Dict, List
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.metrics import REQUEST_COUNT, REQUEST_LATENCY
+from app.core.middleware import ErrorHandlingMiddleware, MetricsMiddleware, RateLimitMiddleware, RequestLoggingMiddleware
+from app.core.ratelimit import MemoryBackend, RateLimiter, RateLimitRule
+
+# Large enough that the limiter never rejects, so every request takes the full path
+BENCH_RATE_LIMIT = 10**9
+
+
+# The BaseHTTPMiddleware stack the ASGI middlewares replaced, kept here as the baseline
+class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        try:
+            response = await call_next(request)
+            REQUEST_COUNT.labels(method=request.method, endpoint=request.url.path, status_code=response.status_code).inc()
+            REQUEST_LATENCY.labels(method=request.method, endpoint=request.url.path).observe(time.time() - start_time)
+            return response
+        except Exception as e:
+            logging.error(f"Request failed: {str(e)}")
+            REQUEST_COUNT.labels(method=request.method, endpoint=request.url.path, status_code=500).inc()
+            raise
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, limiter: RateLimiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next):
+        decision = await self.limiter.check(request.method, request.url.path, request.headers, request.client.host if request.client else None)
+        if decision is None:
+            return await call_next(request)
+        if not decision.allowed:
+            return JSONResponse(status_code=429, content={"detail": "Too many requests"}, headers=decision.headers())
+        response = await call_next(request)
+        response.headers.update(decision.headers())
+        return response
+
+class LegacyErrorHandlingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logging.error(f"Unhandled error: {str(e)}", exc_info=True)
+            return JSONResponse(status_code=500, content={"detail": "Internal server error", "error_id": str(time.time())})
+
+
+def _limiter() -> RateLimiter:
+    return RateLimiter(default=RateLimitRule("default", BENCH_RATE_LIMIT), routes=[], backend=MemoryBackend(), exempt=[])
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+def _cors(app: FastAPI):
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+def build_bare() -> FastAPI:
+    return _app()
+
+def build_base_http() -> FastAPI:
+    app = _app()
+    app.add_middleware(LegacyErrorHandlingMiddleware)
+    app.add_middleware(LegacyMetricsMiddleware)
+    app.add_middleware(LegacyRateLimitMiddleware, limiter=_limiter())
+    _cors(app)
+    log = logging.getLogger()
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        log.info(f"Incoming request: {request.method} {request.url}")
+        response = await call_next(request)
+        duration = time.time() - start_time
+        log.info(f"Request completed: {request.method} {request.url} - {response.status_code} ({duration:.2f}s)")
+        return response
+
+    return app
+
+def build_asgi() -> FastAPI:
+    app = _app()
+    app.add_middleware(ErrorHandlingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(RateLimitMiddleware, limiter=_limiter())
+    _cors(app)
+    app.add_middleware(RequestLoggingMiddleware)
+    return app
+
+STACKS: Dict[str, Callable[[], FastAPI]] = {
+    "bare": build_bare,
+    "base_http": build_base_http,
+    "asgi": build_asgi,
+}
+
+
+async def _measure(app: FastAPI, requests: int, concurrency: int) -> Dict[str, float]:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(min(200, requests)):
+            await client.get("/ping")
+
+        latencies: List[float] = []
+        per_worker = max(1, requests // concurrency)
+
+        async def worker():
+            for _ in range(per_worker):
+                start = time.perf_counter()
+                response = await client.get("/ping")
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"Unexpected status {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "p50_us": statistics.median(latencies) * 1e6,
+        "mean_us": statistics.mean(latencies) * 1e6,
+        "rps": len(latencies) / elapsed,
+    }
+
+async def bench(requests: int, concurrency: int, stacks: List[str]):
+    """Compare per-request overhead and throughput of each middleware stack on a trivial route."""
+    results = {name: await _measure(STACKS[name](), requests, concurrency) for name in stacks}
+    bare = results.get("bare")
+    print(f"{requests} requests, concurrency={concurrency} (in-process ASGI transport, no network)")
+    print(f"{'stack':<10} {'p50 us':>9} {'mean us':>9} {'overhead us':>12} {'req/s':>9}")
+    for name, r in results.items():
+        overhead = f"{r['mean_us'] - bare['mean_us']:>12.1f}" if bare else f"{'-':>12}"
+        print(f"{name:<10} {r['p50_us']:>9.1f} {r['mean_us']:>9.1f} {overhead} {r['rps']:>9.0f}")
+
+def main():
+    """Entry point for the benchmark script."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark middleware overhead: BaseHTTPMiddleware stack vs raw ASGI middlewares."
+    )
+    parser.add_argument('--requests', '-n', type=int, default=5000, help="Requests per stack")
+    parser.add_argument('--concurrency', '-c', type=int, default=1, help="Concurrent clients")
+    parser.add_argument('--stacks', nargs='+', default=list(STACKS), choices=list(STACKS))
+    args = parser.parse_args()
+    # Request logs are formatted and written as in production, but to /dev/null
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), handlers=[handler])
+    asyncio.run(bench(args.requests, args.concurrency, args.stacks))
+
+if __name__ == '__main__':
+    main()
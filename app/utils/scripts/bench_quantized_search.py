@@ -0,0 +1,98 @@
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from typing import List, Set, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.db.initdb import AsyncSessionLocal, engine
+from app.db.vector_index import RECALL_PROFILES, apply_search_params, candidate_limit, ensure_quantized_index
+from app.documents.service import DocumentService
+
+load_dotenv()
+
+async def _sample_queries(count: int) -> List[list]:
+    """Use stored embeddings with small noise as queries so no provider calls are needed."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            text("SELECT embedding::text FROM documents WHERE embedding IS NOT NULL ORDER BY random() LIMIT :n"),
+            {"n": count}
+        )
+        vectors = [[float(x) for x in row[0].strip("[]").split(",")] for row in result.fetchall()]
+    return [[x + random.gauss(0, 0.01) for x in v] for v in vectors]
+
+async def _run(query: list, k: int, mode: str, recall: str) -> Tuple[Set[int], float]:
+    async with AsyncSessionLocal() as session:
+        service = DocumentService(session)
+        if mode == "exact":
+            # Disable index scans so the baseline is a true exact nearest-neighbour search
+            await session.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+            await session.execute(text("SELECT set_config('enable_bitmapscan', 'off', true)"))
+            quantization, scan_limit = "none", k
+        elif mode == "ann":
+            quantization, scan_limit = "none", k
+        else:
+            quantization, scan_limit = mode, candidate_limit(k)
+        await apply_search_params(session, recall, scan_limit)
+
+        start = time.perf_counter()
+        rows = await service._vector_search(query, k, fields="ids", quantization=quantization)
+        elapsed = time.perf_counter() - start
+        await session.rollback()
+    return {r["id"] for r in rows}, elapsed
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+async def bench(queries: int, k: int, modes: List[str], recall: str):
+    """Compare recall@k and latency of each search mode against exact search."""
+    for mode in modes:
+        if mode != "ann":
+            async with engine.begin() as conn:
+                await ensure_quantized_index(conn, mode)
+
+    sample = await _sample_queries(queries)
+    if not sample:
+        print("No documents with embeddings found.")
+        return
+
+    exact_ids, exact_latency = [], []
+    for q in sample:
+        ids, elapsed = await _run(q, k, "exact", recall)
+        exact_ids.append(ids)
+        exact_latency.append(elapsed)
+
+    print(f"{len(sample)} queries, k={k}, recall profile={recall}")
+    print(f"{'mode':<10} {'recall@k':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print(f"{'exact':<10} {1.0:>9.3f} {statistics.median(exact_latency) * 1000:>9.2f} "
+          f"{_percentile(exact_latency, 95) * 1000:>9.2f} {_percentile(exact_latency, 99) * 1000:>9.2f}")
+
+    for mode in modes:
+        recalls, latency = [], []
+        for q, truth in zip(sample, exact_ids):
+            ids, elapsed = await _run(q, k, mode, recall)
+            recalls.append(len(ids & truth) / max(1, len(truth)))
+            latency.append(elapsed)
+        print(f"{mode:<10} {statistics.mean(recalls):>9.3f} {statistics.median(latency) * 1000:>9.2f} "
+              f"{_percentile(latency, 95) * 1000:>9.2f} {_percentile(latency, 99) * 1000:>9.2f}")
+
+def main():
+    """Entry point for the benchmark script."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark quantized two-stage vector search (recall@k and latency) against exact search."
+    )
+    parser.add_argument('--queries', '-q', type=int, default=100, help="Number of sampled queries")
+    parser.add_argument('--k', '-k', type=int, default=10, help="Results per query")
+    parser.add_argument(
+        '--modes', nargs='+', default=["ann", "binary", "halfvec"],
+        choices=["ann", "binary", "halfvec"],
+        help="Search modes to compare (missing quantized columns are created)"
+    )
+    parser.add_argument('--recall', choices=list(RECALL_PROFILES), default="balanced")
+    args = parser.parse_args()
+    asyncio.run(bench(args.queries, args.k, args.modes, args.recall))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+# Polling granularity for the first successful response
+POLL_INTERVAL = 0.005
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_for(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before answering")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(POLL_INTERVAL)
+    raise RuntimeError(f"No successful response from {url} within {timeout}s")
+
+def time_to_first_request(path: str, timeout: float) -> float:
+    """Seconds from spawning a uvicorn process to its first 200 response on ``path``."""
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        _wait_for(f"http://127.0.0.1:{port}{path}", process, timeout)
+        return time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+
+def time_import() -> float:
+    """Seconds for a fresh interpreter to import the application module."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], check=True)
+    return time.perf_counter() - started
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+def bench(runs: int, path: str, timeout: float):
+    """Measure process start to first successful request, and the share spent importing the app."""
+    results = {
+        "import main": _summary([time_import() for _ in range(runs)]),
+        f"first GET {path}": _summary([time_to_first_request(path, timeout) for _ in range(runs)]),
+    }
+    print(f"{runs} runs, fresh process each")
+    print(f"{'phase':<24} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for name, r in results.items():
+        print(f"{name:<24} {r['median_ms']:>10.1f} {r['min_ms']:>8.1f} {r['max_ms']:>8.1f}")
+
+def main():
+    """Entry point for the benchmark script."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark API startup: time from process start to the first successful request."
+    )
+    parser.add_argument('--runs', '-n', type=int, default=5, help="Processes started per measurement")
+    parser.add_argument('--path', default="/health/live", help="Path polled until it returns 200")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Seconds to wait for one server")
+    args = parser.parse_args()
+    bench(args.runs, args.path, args.timeout)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import logging
+import os
+import signal
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from app.db.initdb import engine
+from app.utils.work_queue import EMBED_QUEUE_BATCH_SIZE, EmbeddingWorker, drain, requeue_failed
+
+load_dotenv()
+EMBED_WORKER_CONCURRENCY = int(os.getenv("EMBED_WORKER_CONCURRENCY", "2"))
+
+async def run_worker(concurrency: int, batch_size: int, once: bool, requeue: bool):
+    """Consume the embedding work queue until interrupted (or until empty with ``once``)."""
+    try:
+        if requeue:
+            async with engine.begin() as conn:
+                count = await requeue_failed(conn)
+            logging.info(f"Requeued {count} dead-lettered documents")
+        if once:
+            success_count, failed_ids = await drain(batch_size=batch_size)
+            logging.info(f"Embedded {success_count} documents, {len(failed_ids)} failed")
+            return
+
+        worker = EmbeddingWorker(concurrency=concurrency, batch_size=batch_size)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+    finally:
+        await engine.dispose()
+
+def main():
+    """Entry point for the CLI script."""
+    parser = argparse.ArgumentParser(
+        description="Embed pending documents from the Postgres work queue. "
+                    "Run as many workers as needed; claims never overlap."
+    )
+    parser.add_argument(
+        '--concurrency', '-c',
+        type=int,
+        default=EMBED_WORKER_CONCURRENCY,
+        help="Concurrent claim loops in this process"
+    )
+    parser.add_argument(
+        '--batch-size', '-b',
+        type=int,
+        default=EMBED_QUEUE_BATCH_SIZE,
+        help="Documents claimed per batch"
+    )
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help="Drain the queue and exit instead of waiting for new documents"
+    )
+    parser.add_argument(
+        '--requeue-failed',
+        action='store_true',
+        help="Move dead-lettered documents back to pending before starting"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    asyncio.run(run_worker(args.concurrency, args.batch_size, args.once, args.requeue_failed))
+
+if __name__ == '__main__':
+    main()
@@ -4,24 +4,27 @@ import asyncio
 import argparse
 from dotenv import load_dotenv
 from app.db.initdb import engine
-from app.utils.backfill import update_document_embeddings
+from app.utils.backfill import BACKFILL_BATCH_SIZE, BACKFILL_CONCURRENCY, update_document_embeddings
 
 load_dotenv()
-BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "10"))
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", str(BACKFILL_BATCH_SIZE)))
 
-async def fill_embeddings(limit=None):
+async def fill_embeddings(limit=None, batch_size=BATCH_SIZE, concurrency=BACKFILL_CONCURRENCY, resume=False):
     """CLI wrapper for embedding backfill operation."""
-    async with engine.begin() as conn:
+    try:
         success_count, failed_ids = await update_document_embeddings(
-            conn=conn,
-            batch_size=BATCH_SIZE,
-            limit=limit
+            batch_size=batch_size,
+            limit=limit,
+            concurrency=concurrency,
+            resume=resume
         )
-        logging.info(f"\nProcessed {success_count + len(failed_ids)} documents:")
-        logging.info(f"- {success_count} succeeded")
-        logging.info(f"- {len(failed_ids)} failed")
-        if failed_ids:
-            logging.debug(f"Failed document IDs: {failed_ids}")
+    finally:
+        await engine.dispose()
+    logging.info(f"\nProcessed {success_count + len(failed_ids)} documents:")
+    logging.info(f"- {success_count} succeeded")
+    logging.info(f"- {len(failed_ids)} failed")
+    if failed_ids:
+        logging.debug(f"Failed document IDs: {failed_ids}")
 
 def main():
     """Entry point for the CLI script."""
@@ -34,8 +37,28 @@ def main():
         default=None,
         help="Maximum number of documents to process"
     )
+    parser.add_argument(
+        '--batch-size', '-b',
+        type=int,
+        default=BATCH_SIZE,
+        help="Documents per embedding request and UPDATE"
+    )
+    parser.add_argument(
+        '--concurrency', '-c',
+        type=int,
+        default=BACKFILL_CONCURRENCY,
+        help="Batches embedded at the same time"
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help="Continue after the last checkpoint instead of starting from the lowest id"
+    )
     args = parser.parse_args()
-    asyncio.run(fill_embeddings(limit=args.limit))
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    asyncio.run(fill_embeddings(
+        limit=args.limit, batch_size=args.batch_size, concurrency=args.concurrency, resume=args.resume
+    ))
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
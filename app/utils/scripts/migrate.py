@@ -0,0 +1,60 @@
+import logging
+import os
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from app.db.initdb import engine
+from app.db.migrations import MIGRATIONS, SCHEMA_VERSION, current_version, migrate
+
+load_dotenv()
+
+async def status():
+    """Log the database's schema version and the migrations still to apply."""
+    try:
+        async with engine.connect() as conn:
+            version = await current_version(conn)
+    finally:
+        await engine.dispose()
+    logging.info(f"Database schema version {version}, this release: {SCHEMA_VERSION}")
+    for migration in MIGRATIONS:
+        if migration.version > version:
+            logging.info(f"Pending: {migration.version} {migration.description}")
+
+async def run(target: int, ensure: bool):
+    """Apply pending migrations, then create configured indexes and partitions."""
+    try:
+        applied = await migrate(target=target, ensure=ensure)
+    finally:
+        await engine.dispose()
+    logging.info(f"Applied migrations: {applied or 'none'}")
+
+def main():
+    """Entry point for the CLI script."""
+    parser = argparse.ArgumentParser(
+        description="Bring the database schema up to date. Run once per deploy, before starting the API."
+    )
+    parser.add_argument(
+        '--status',
+        action='store_true',
+        help="Only report the current version and pending migrations"
+    )
+    parser.add_argument(
+        '--target', '-t',
+        type=int,
+        default=None,
+        help="Stop after this version (default: latest)"
+    )
+    parser.add_argument(
+        '--skip-ensure',
+        action='store_true',
+        help="Do not create the configured vector indexes and upcoming audit partitions"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    if args.status:
+        asyncio.run(status())
+    else:
+        asyncio.run(run(target=args.target, ensure=not args.skip_ensure))
+
+if __name__ == '__main__':
+    main()
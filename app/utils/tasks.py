@@ -1,31 +1,52 @@
 import os
+import logging
 from celery import Celery
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
-from ..db.initdb import AsyncSessionLocal
-from app.documents.models import Document
-from .embeddings import get_embedding
+from ..db.initdb import engine
+from ..db.partitions import maintain_audit_partitions
+from .work_queue import drain, process_batch
 
 CELERY_BROKER = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 CELERY_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER)
 
 celery = Celery("worker", broker=CELERY_BROKER, backend=CELERY_BACKEND)
+# Run the worker with --beat (or a separate `celery beat`) to schedule these
+celery.conf.beat_schedule = {
+    "maintain-audit-partitions": {
+        "task": "app.utils.tasks.maintain_audit_partitions_task",
+        "schedule": float(os.getenv("AUDIT_PARTITION_MAINTENANCE_SECONDS", "3600")),
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+def _run(coro):
+    """Run a coroutine on a fresh event loop (Celery is sync).
+
+    Pooled asyncpg connections are bound to the loop that opened them, so the
+    pool is disposed before the loop closes.
+    """
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+    return asyncio.run(runner())
 
 @celery.task(bind=True)
 def precompute_embeddings(self, limit=100):
-    # Celery is sync; we run asyncio inside it to access async DB
-    asyncio.run(_precompute(limit))
-
-async def _precompute(limit=100):
-    async with AsyncSessionLocal() as session:
-        q = select(Document).where(Document.embedding.is_(None)).limit(limit)
-        result = await session.execute(q)
-        docs = result.scalars().all()
-        for d in docs:
-            emb = await get_embedding(d.content)
-            # use raw UPDATE with engine to ensure vector is stored correctly:
-            # SQLAlchemy supports setting Vector via column assignment
-            d.embedding = emb
-            session.add(d)
-        await session.commit()
+    # Claims through the embedding work queue, so concurrent tasks and
+    # embedding workers never embed the same document twice
+    success_count, failed_ids = _run(drain(limit))
+    logger.info(f"Precomputed {success_count} embeddings ({len(failed_ids)} failed)")
+
+@celery.task(bind=True)
+def embed_document(self, doc_id: int):
+    """Embed one pending document now (skipped if a worker already holds its lease)."""
+    _run(process_batch(1, doc_ids=[doc_id]))
+
+@celery.task(bind=True)
+def maintain_audit_partitions_task(self):
+    """Pre-create upcoming audit_logs partitions and drop expired ones."""
+    result = _run(maintain_audit_partitions())
+    logger.info(f"Audit partitions created: {result['created']}, removed: {result['removed']}")
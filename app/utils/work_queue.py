@@ -0,0 +1,309 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from dotenv import load_dotenv
+from app.db.initdb import engine
+from app.core.metrics import EMBEDDING_JOBS
+from app.utils.embeddings import EMBEDDING_BATCH_MAX_SIZE, get_embeddings, to_pgvector
+
+load_dotenv()
+EMBED_QUEUE_BATCH_SIZE = int(os.getenv("EMBED_QUEUE_BATCH_SIZE", str(EMBEDDING_BATCH_MAX_SIZE)))
+# A claimed document is invisible to other workers until its lease expires
+EMBED_QUEUE_LEASE_SECONDS = float(os.getenv("EMBED_QUEUE_LEASE_SECONDS", "300"))
+# Attempts before a document is dead-lettered (embedding_status = 'failed')
+EMBED_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMBED_QUEUE_MAX_ATTEMPTS", "5"))
+EMBED_QUEUE_RETRY_BASE_SECONDS = float(os.getenv("EMBED_QUEUE_RETRY_BASE_SECONDS", "10"))
+EMBED_QUEUE_RETRY_MAX_SECONDS = float(os.getenv("EMBED_QUEUE_RETRY_MAX_SECONDS", "3600"))
+# Safety net when a notification is missed; also picks up expired leases and due retries
+EMBED_QUEUE_POLL_SECONDS = float(os.getenv("EMBED_QUEUE_POLL_SECONDS", "30"))
+# Channel notified by the documents insert trigger (migration 7 in app/db/migrations.py)
+EMBED_QUEUE_CHANNEL = "embedding_jobs"
+
+logger = logging.getLogger(__name__)
+
+# (id, content, attempts including the current one)
+ClaimedDocument = Tuple[int, str, int]
+
+_CLAIM_SQL = """
+    WITH claimable AS (
+        SELECT id
+        FROM documents
+        WHERE embedding_status = 'pending'
+          AND (embedding_lease_until IS NULL OR embedding_lease_until < now())
+          {id_filter}
+        ORDER BY id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE documents d
+    SET embedding_lease_until = now() + make_interval(secs => :lease),
+        embedding_attempts = d.embedding_attempts + 1
+    FROM claimable c
+    WHERE d.id = c.id
+    RETURNING d.id, d.content, d.embedding_attempts
+"""
+
+async def claim_batch(
+    conn: AsyncConnection,
+    limit: int = EMBED_QUEUE_BATCH_SIZE,
+    lease_seconds: float = EMBED_QUEUE_LEASE_SECONDS,
+    doc_ids: Optional[Sequence[int]] = None,
+    after_id: Optional[int] = None,
+) -> List[ClaimedDocument]:
+    """Lease up to ``limit`` pending documents, lowest ids first.
+
+    ``FOR UPDATE SKIP LOCKED`` lets concurrent workers claim disjoint rows
+    without waiting on each other; the lease keeps the rows claimed after the
+    claiming transaction commits, and expires if the worker dies.
+    ``after_id`` restricts the claim to ids above a keyset cursor.
+    """
+    params = {"limit": limit, "lease": lease_seconds}
+    id_filter = ""
+    if doc_ids is not None:
+        id_filter = "AND id = ANY(CAST(:doc_ids AS int[]))"
+        params["doc_ids"] = list(doc_ids)
+    if after_id is not None:
+        id_filter += " AND id > :after_id"
+        params["after_id"] = after_id
+    result = await conn.execute(text(_CLAIM_SQL.format(id_filter=id_filter)), params)
+    return sorted(((row[0], row[1], row[2]) for row in result.fetchall()), key=lambda row: row[0])
+
+async def complete_batch(conn: AsyncConnection, doc_ids: Sequence[int], embeddings: Sequence[Sequence[float]]) -> int:
+    """Store embeddings for claimed documents in one statement and mark them ready."""
+    if not doc_ids:
+        return 0
+    result = await conn.execute(
+        text("""
+            UPDATE documents d
+            SET embedding = CAST(v.emb AS vector),
+                embedding_status = 'ready',
+                embedding_lease_until = NULL,
+                embedding_error = NULL
+            FROM unnest(CAST(:ids AS int[]), CAST(:embs AS text[])) AS v(id, emb)
+            WHERE d.id = v.id AND d.embedding_status = 'pending'
+        """),
+        {"ids": list(doc_ids), "embs": [to_pgvector(e) for e in embeddings]}
+    )
+    EMBEDDING_JOBS.labels(outcome="ready").inc(result.rowcount)
+    return result.rowcount
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff before attempt ``attempts + 1``."""
+    return min(EMBED_QUEUE_RETRY_MAX_SECONDS, EMBED_QUEUE_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+async def fail_batch(conn: AsyncConnection, failed: Sequence[Tuple[ClaimedDocument, str]]) -> List[int]:
+    """Record failed attempts with their errors; documents out of attempts are dead-lettered.
+
+    Returns the ids that were dead-lettered.
+    """
+    if not failed:
+        return []
+    dead = [doc_id for (doc_id, _, attempts), _ in failed if attempts >= EMBED_QUEUE_MAX_ATTEMPTS]
+    await conn.execute(
+        text("""
+            UPDATE documents d
+            SET embedding_status = CASE WHEN d.embedding_attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+                embedding_lease_until = now() + make_interval(secs => v.delay),
+                embedding_error = v.error
+            FROM unnest(CAST(:ids AS int[]), CAST(:delays AS float8[]), CAST(:errors AS text[])) AS v(id, delay, error)
+            WHERE d.id = v.id AND d.embedding_status = 'pending'
+        """),
+        {
+            "ids": [doc_id for (doc_id, _, _), _ in failed],
+            "delays": [retry_delay(attempts) for (_, _, attempts), _ in failed],
+            "errors": [error[:1000] for _, error in failed],
+            "max_attempts": EMBED_QUEUE_MAX_ATTEMPTS,
+        }
+    )
+    EMBEDDING_JOBS.labels(outcome="retry").inc(len(failed) - len(dead))
+    EMBEDDING_JOBS.labels(outcome="dead_letter").inc(len(dead))
+    if dead:
+        logger.warning("Dead-lettered documents after %d attempts: %s", EMBED_QUEUE_MAX_ATTEMPTS, dead)
+    return dead
+
+async def requeue_failed(conn: AsyncConnection, doc_ids: Optional[Sequence[int]] = None) -> int:
+    """Move dead-lettered documents back to pending with a fresh attempt budget."""
+    params = {}
+    id_filter = ""
+    if doc_ids is not None:
+        id_filter = "AND id = ANY(CAST(:doc_ids AS int[]))"
+        params["doc_ids"] = list(doc_ids)
+    result = await conn.execute(text(f"""
+        UPDATE documents
+        SET embedding_status = 'pending', embedding_attempts = 0,
+            embedding_lease_until = NULL, embedding_error = NULL
+        WHERE embedding_status = 'failed' {id_filter}
+    """), params)
+    if result.rowcount:
+        await conn.execute(text("SELECT pg_notify(:channel, '')"), {"channel": EMBED_QUEUE_CHANNEL})
+    return result.rowcount
+
+async def requeue_documents(
+    conn: AsyncConnection,
+    after_id: int = 0,
+    limit: int = 10000,
+    source: Optional[str] = None,
+) -> Tuple[int, Optional[int]]:
+    """Mark the next ``limit`` non-pending documents after ``after_id`` for re-embedding.
+
+    Existing embeddings stay searchable until they are replaced. Returns the
+    number of documents requeued and the last id (None when nothing is left).
+    """
+    params: Dict[str, Any] = {"after_id": after_id, "limit": limit}
+    source_filter = ""
+    if source is not None:
+        source_filter = "AND source = :source"
+        params["source"] = source
+    result = await conn.execute(text(f"""
+        WITH batch AS (
+            SELECT id FROM documents
+            WHERE id > :after_id AND embedding_status <> 'pending' {source_filter}
+            ORDER BY id
+            LIMIT :limit
+        )
+        UPDATE documents d
+        SET embedding_status = 'pending', embedding_attempts = 0,
+            embedding_lease_until = NULL, embedding_error = NULL
+        FROM batch b
+        WHERE d.id = b.id
+        RETURNING d.id
+    """), params)
+    ids = [row[0] for row in result.fetchall()]
+    if not ids:
+        return 0, None
+    await conn.execute(text("SELECT pg_notify(:channel, '')"), {"channel": EMBED_QUEUE_CHANNEL})
+    return len(ids), max(ids)
+
+async def process_batch(
+    limit: int = EMBED_QUEUE_BATCH_SIZE,
+    doc_ids: Optional[Sequence[int]] = None,
+) -> Tuple[int, List[int]]:
+    """Claim, embed and store one batch.
+
+    The claim and the result are committed separately, so no row locks are
+    held while the provider call is in flight.
+
+    Returns:
+        Tuple of (claimed_count, failed_ids)
+    """
+    async with engine.begin() as conn:
+        claimed = await claim_batch(conn, limit, doc_ids=doc_ids)
+    if not claimed:
+        return 0, []
+    return len(claimed), await embed_and_store(claimed)
+
+async def embed_and_store(claimed: Sequence[ClaimedDocument]) -> List[int]:
+    """Embed claimed documents and write all outcomes in one short transaction.
+
+    Returns the ids that failed.
+    """
+    done, failed = await embed_claimed(claimed)
+    async with engine.begin() as conn:
+        await complete_batch(conn, [doc_id for doc_id, _ in done], [emb for _, emb in done])
+        await fail_batch(conn, failed)
+    return [doc_id for (doc_id, _, _), _ in failed]
+
+async def embed_claimed(
+    claimed: Sequence[ClaimedDocument],
+) -> Tuple[List[Tuple[int, List[float]]], List[Tuple[ClaimedDocument, str]]]:
+    """Embed claimed documents in one provider call.
+
+    If the batch call fails, documents are retried individually so one bad
+    input only fails itself. Returns ``(done, failed)``: (id, embedding) pairs
+    and (claimed document, error) pairs.
+    """
+    try:
+        embeddings = await get_embeddings([content for _, content, _ in claimed])
+        return [(doc_id, emb) for (doc_id, _, _), emb in zip(claimed, embeddings)], []
+    except Exception as e:
+        if len(claimed) == 1:
+            return [], [(claimed[0], str(e))]
+        logger.warning("Batch embedding failed for %d documents, retrying individually: %s", len(claimed), e)
+
+    results = await asyncio.gather(
+        *(get_embeddings([content]) for _, content, _ in claimed),
+        return_exceptions=True
+    )
+    done, failed = [], []
+    for doc, result in zip(claimed, results):
+        if isinstance(result, BaseException):
+            failed.append((doc, str(result)))
+        else:
+            done.append((doc[0], result[0]))
+    return done, failed
+
+async def drain(limit: Optional[int] = None, batch_size: int = EMBED_QUEUE_BATCH_SIZE) -> Tuple[int, List[int]]:
+    """Process claimable documents until none are left (or ``limit`` were claimed).
+
+    Returns:
+        Tuple of (success_count, failed_ids)
+    """
+    success_count = 0
+    failed_ids: List[int] = []
+    while limit is None or success_count + len(failed_ids) < limit:
+        size = batch_size if limit is None else min(batch_size, limit - success_count - len(failed_ids))
+        claimed, failed = await process_batch(size)
+        if not claimed:
+            break
+        success_count += claimed - len(failed)
+        failed_ids.extend(failed)
+    return success_count, failed_ids
+
+
+class EmbeddingWorker:
+    """Long-running queue consumer.
+
+    Each worker runs ``concurrency`` claim loops. When the queue is empty they
+    sleep until a NOTIFY on ``EMBED_QUEUE_CHANNEL`` (sent by the documents
+    insert trigger) or the poll interval, so idle workers cost no queries.
+    """
+
+    def __init__(self, concurrency: int = 1, batch_size: int = EMBED_QUEUE_BATCH_SIZE):
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def run(self):
+        async with engine.connect() as listen_conn:
+            raw = await listen_conn.get_raw_connection()
+            driver = raw.driver_connection
+            await driver.add_listener(EMBED_QUEUE_CHANNEL, self._on_notify)
+            logger.info("Embedding worker listening on %s (concurrency=%d)", EMBED_QUEUE_CHANNEL, self.concurrency)
+            try:
+                await asyncio.gather(*(self._loop(i) for i in range(self.concurrency)))
+            finally:
+                await driver.remove_listener(EMBED_QUEUE_CHANNEL, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._wakeup.set()
+
+    async def _loop(self, slot: int):
+        while not self._stopping.is_set():
+            # Cleared before claiming, so a notify that races an empty claim still wakes us
+            self._wakeup.clear()
+            try:
+                started = time.perf_counter()
+                claimed, failed = await process_batch(self.batch_size)
+            except Exception as e:
+                logger.error("Embedding worker %d batch error: %s", slot, e)
+                claimed, failed = 0, []
+                await asyncio.sleep(1.0)
+            if claimed:
+                logger.info(
+                    "Worker %d embedded %d documents (%d failed) in %.2fs",
+                    slot, claimed - len(failed), len(failed), time.perf_counter() - started
+                )
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMBED_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
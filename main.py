@@ -1,16 +1,20 @@
 import logging
 import os
-import asyncio
-import time
-from fastapi import FastAPI, Request
-from sqlalchemy import text
+from fastapi import FastAPI
 from api import router
-from app.db.initdb import engine, Base
+from app.db.initdb import engine, replica_router
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.middleware import MetricsMiddleware, RateLimitMiddleware, ErrorHandlingMiddleware
+from app.core.middleware import MetricsMiddleware, RateLimitMiddleware, ErrorHandlingMiddleware, RequestLoggingMiddleware
 from app.core.metrics import metrics_router
-from app.core.health import router as health_router
+from app.core.health import router as health_router, health_monitor
+from app.db.migrations import check_schema
+from app.utils.provider import stop_provider_client
+from app.core.redis import close_redis
+from app.documents.ingest import dispose_copy_engine
+from app.admin.jobs import job_manager
+from app.utils.audit import audit_writer
+from app.core.logs import setup_logging
 
 load_dotenv()
 app = FastAPI(
@@ -30,22 +34,14 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Configure logging
-log_level = os.getenv("LOG_LEVEL", "INFO")
-logger = logging.getLogger()
-logger.setLevel(log_level)
-
-formatter = logging.Formatter(
-    "%(asctime)s - %(threadName)s %(filename)s:%(lineno)d - %(funcName)s() - %(levelname)s - %(message)s"
-)
-stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
+# Configure logging: JSON records written by a background thread (LOG_FORMAT, LOG_SAMPLING)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Add middleware in correct order
 app.add_middleware(ErrorHandlingMiddleware)  # First to catch all errors
 app.add_middleware(MetricsMiddleware)        # Then collect metrics
-app.add_middleware(RateLimitMiddleware, requests_per_minute=int(os.getenv("RATE_LIMIT", "60")))
+app.add_middleware(RateLimitMiddleware)        # Limits and backend from RATE_LIMIT_* settings
 app.add_middleware(
     CORSMiddleware,
     allow_origins=os.getenv("ALLOWED_ORIGINS", "*").split(","),
@@ -53,41 +49,51 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestLoggingMiddleware)  # Outermost: logs every request, including rejected ones
 
 # Include routers
 app.include_router(router)
 app.include_router(metrics_router, prefix="/metrics", tags=["monitoring"])
 app.include_router(health_router, prefix="/health", tags=["monitoring"])
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Middleware to log incoming requests and response times."""
-    start_time = time.time()
-    logger.info(f"Incoming request: {request.method} {request.url}")
-    try:
-        response = await call_next(request)
-        duration = time.time() - start_time
-        logger.info(f"Request completed: {request.method} {request.url} - {response.status_code} ({duration:.2f}s)")
-        return response
-    except Exception as e:
-        duration = time.time() - start_time
-        logger.error(f"Request failed: {request.method} {request.url} - ({duration:.2f}s) - Error: {str(e)}")
-        raise
-
-    process_time = (time.time() - start_time) * 1000
-    formatted_time = f"{process_time:.2f} ms"
-    logger.info(f"Completed {request.method} {request.url} in {formatted_time}")
-    return response
-
-
 @app.on_event("startup")
 async def startup():
-    from app.db.initdb import init_db
-    await init_db()
+    # Schema changes are applied by `python -m app.utils.scripts.migrate`, not by every worker
+    await check_schema()
+    audit_writer.start()
+    health_monitor.start()  # Probes run in the background; health endpoints read the cache
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup resources on application shutdown."""
+    try:
+        await health_monitor.stop()
+    except Exception as e:
+        logger.error(f"Error stopping health monitor: {str(e)}")
+    try:
+        await job_manager.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping admin jobs: {str(e)}")
+    try:
+        await audit_writer.stop()
+    except Exception as e:
+        logger.error(f"Error flushing audit log: {str(e)}")
+    try:
+        await stop_provider_client()
+    except Exception as e:
+        logger.error(f"Error closing embedding provider client: {str(e)}")
+    try:
+        await dispose_copy_engine()
+    except Exception as e:
+        logger.error(f"Error closing bulk ingest connections: {str(e)}")
+    try:
+        await close_redis()
+    except Exception as e:
+        logger.error(f"Error closing Redis connections: {str(e)}")
+    try:
+        await replica_router.dispose()
+    except Exception as e:
+        logger.error(f"Error closing replica connections: {str(e)}")
     try:
         if engine:
             await engine.dispose()